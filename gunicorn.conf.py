@@ -0,0 +1,31 @@
+"""
+Gunicorn settings (picked up automatically from the working directory)
+
+The application is preloaded in the master, which compiles templates, builds
+the URL resolver and fills the shared caches once before forking, so every
+worker inherits that state. Each worker then warms its own in-process state
+(local cache tier, autocomplete index) before it accepts requests.
+"""
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:%s' % os.environ.get('PORT', '8000'))
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'True').lower() == 'true'
+warm_up_enabled = os.environ.get('WARM_UP', 'True').lower() == 'true'
+
+
+def when_ready(server):
+    """Master, after the preloaded app is imported and before any worker is forked"""
+    if preload_app and warm_up_enabled:
+        from portfolio.warmup import warm_up
+
+        warm_up(render=True, log=server.log.info)
+
+
+def post_worker_init(worker):
+    """Worker, after loading the app and before it accepts connections"""
+    if warm_up_enabled:
+        from portfolio.warmup import warm_up
+
+        # Pages were already rendered once by the master when preloading
+        warm_up(render=not preload_app, log=worker.log.info)
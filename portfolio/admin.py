@@ -1,8 +1,13 @@
 from django.contrib import admin
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
 from django.utils.html import format_html
 from django.utils.safestring import mark_safe
 from unfold.admin import ModelAdmin
-from .models import ContactSubmission
+from .models import AdminJob, ArchivedContactSubmission, ContactSubmission, PendingContactNotification
+from . import jobs, notifications, retention, rollups
+from .admin_changelist import EstimatedCountChangeList, EstimatedCountPaginator, estimated_count
 
 
 @admin.register(ContactSubmission)
@@ -19,6 +24,9 @@ class ContactSubmissionAdmin(ModelAdmin):
     readonly_fields = ['created_at']
     list_per_page = 25
     date_hierarchy = 'created_at'
+    paginator = EstimatedCountPaginator
+    # EstimatedCountChangeList fills in "N total" without an exact COUNT(*)
+    show_full_result_count = False
     
     fieldsets = (
         ('Contact Information', {
@@ -65,21 +73,149 @@ class ContactSubmissionAdmin(ModelAdmin):
                 '<span style="color: #ef4444; font-weight: bold;">⏳ Pending</span>'
             )
     response_status.short_description = 'Status'
+
+    def get_changelist(self, request, **kwargs):
+        return EstimatedCountChangeList
     
     actions = ['mark_as_responded', 'mark_as_pending']
     
     def mark_as_responded(self, request, queryset):
-        updated = queryset.update(is_responded=True)
-        self.message_user(
-            request,
-            f'{updated} contact submission(s) marked as responded.'
-        )
+        self.set_responded(request, queryset, True, 'responded')
     mark_as_responded.short_description = "Mark selected submissions as responded"
     
     def mark_as_pending(self, request, queryset):
-        updated = queryset.update(is_responded=False)
+        self.set_responded(request, queryset, False, 'pending')
+    mark_as_pending.short_description = "Mark selected submissions as pending"
+
+    def set_responded(self, request, queryset, value, label):
+        """Update small selections inline and hand large ones to a chunked background job"""
+        count, _ = estimated_count(queryset, jobs.INLINE_LIMIT)
+        if count <= jobs.INLINE_LIMIT:
+            updated = rollups.set_responded(queryset, value)
+            self.message_user(
+                request,
+                f'{updated} contact submission(s) marked as {label}.'
+            )
+            return
+        job = jobs.submit(
+            queryset.model, jobs.admin_selection(self, request, queryset), 'set_responded', f'Mark contact submissions as {label}', user=request.user, value=value,
+        )
         self.message_user(
             request,
-            f'{updated} contact submission(s) marked as pending.'
+            format_html(
+                'Marking {} contact submission(s) as {} in the background. <a href="{}">Follow progress</a>',
+                job.total, label, reverse('admin:portfolio_adminjob_changelist'),
+            )
         )
-    mark_as_pending.short_description = "Mark selected submissions as pending"
+
+
+@jobs.register('set_responded')
+def set_responded_job(queryset, value):
+    return rollups.set_responded(queryset, value)
+
+
+@admin.register(ArchivedContactSubmission)
+class ArchivedContactSubmissionAdmin(ModelAdmin):
+    list_display = ['name', 'email', 'company', 'service', 'created_at', 'archived_at']
+    list_filter = ['service', 'created_at']
+    search_fields = ['name', 'email', 'company']
+    list_per_page = 25
+    date_hierarchy = 'created_at'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ['restore']
+
+    def get_changelist(self, request, **kwargs):
+        return EstimatedCountChangeList
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def restore(self, request, queryset):
+        restored = retention.restore(queryset)
+        self.message_user(
+            request,
+            f'{restored} contact submission(s) restored from the archive.'
+        )
+    restore.short_description = "Restore selected submissions"
+
+
+class GivenUpFilter(admin.SimpleListFilter):
+    title = 'delivery'
+    parameter_name = 'given_up'
+
+    def lookups(self, request, model_admin):
+        return [('yes', 'Given up'), ('no', 'Still queued')]
+
+    def queryset(self, request, queryset):
+        if self.value() == 'yes':
+            return queryset.filter(attempts__gte=notifications.MAX_ATTEMPTS)
+        if self.value() == 'no':
+            return queryset.filter(attempts__lt=notifications.MAX_ATTEMPTS)
+        return queryset
+
+
+@admin.register(PendingContactNotification)
+class PendingContactNotificationAdmin(ModelAdmin):
+    list_display = ['submission_link', 'created_at', 'attempts', 'last_error']
+    list_filter = [GivenUpFilter]
+    readonly_fields = ['submission_id', 'created_at', 'attempts', 'last_error']
+    fields = readonly_fields
+    actions = ['retry']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def submission_link(self, obj):
+        url = reverse('admin:portfolio_contactsubmission_change', args=[obj.submission_id])
+        return format_html('<a href="{}">Submission {}</a>', url, obj.submission_id)
+    submission_link.short_description = 'Submission'
+
+    def retry(self, request, queryset):
+        """Put given-up notifications back in the queue of the next digest"""
+        retried = queryset.update(attempts=0, last_error='')
+        self.message_user(request, f'{retried} notification(s) will go out with the next digest.')
+    retry.short_description = "Retry selected notifications"
+
+
+@admin.register(AdminJob)
+class AdminJobAdmin(ModelAdmin):
+    list_display = ['description', 'status_display', 'progress_display', 'created_by', 'created_at', 'finished_at']
+    list_filter = ['status']
+    readonly_fields = ['description', 'status', 'total', 'done', 'error', 'created_by', 'created_at', 'finished_at']
+    fields = readonly_fields
+    change_list_template = 'admin/portfolio/adminjob/change_list.html'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def status_display(self, obj):
+        """Status, with pending or running jobs that stopped moving shown as interrupted"""
+        if obj.status in (AdminJob.PENDING, AdminJob.RUNNING) and obj.updated_at < timezone.now() - jobs.STALE_AFTER:
+            return 'Interrupted'
+        return obj.get_status_display()
+    status_display.short_description = 'Status'
+
+    def progress_display(self, obj):
+        """Unfold progress bar with processed / total"""
+        return render_to_string('unfold/components/progress.html', {
+            'description': f'{obj.done:,} / {obj.total:,}',
+            'value': obj.progress,
+        })
+    progress_display.short_description = 'Progress'
+
+    def changelist_view(self, request, extra_context=None):
+        extra_context = extra_context or {}
+        # Reload the list every few seconds while a job is still moving; stalled jobs wait for run_admin_jobs
+        extra_context['refresh'] = jobs.active(AdminJob.objects.all()).exists()
+        return super().changelist_view(request, extra_context)
+
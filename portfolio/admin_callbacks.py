@@ -1,22 +1,40 @@
 """
 Admin callbacks for Unfold admin interface
 """
+import json
+
 from django.utils.translation import gettext_lazy as _
 
 
 def dashboard_callback(request, context):
     """Dashboard callback for Unfold admin"""
+    from portfolio import rollups
     from portfolio.models import ContactSubmission
     
     # Get recent contact submissions
     recent_contacts = ContactSubmission.objects.filter(is_responded=False)[:5]
-    total_contacts = ContactSubmission.objects.count()
-    unresponded_contacts = ContactSubmission.objects.filter(is_responded=False).count()
+    # Counts and charts come from the daily rollups, never from scans of the submissions
+    stats = rollups.dashboard(days=30)
     
     context.update({
         "recent_contacts": recent_contacts,
-        "total_contacts": total_contacts,
-        "unresponded_contacts": unresponded_contacts,
+        "total_contacts": stats["total"],
+        "unresponded_contacts": stats["unresponded"],
+        "contact_stats": stats,
+        "contact_trend_chart": json.dumps({
+            "labels": stats["labels"],
+            "datasets": [
+                {"label": str(_("Received")), "data": stats["received"], "borderColor": "#22c55e"},
+                {"label": str(_("Responded")), "data": stats["responded"], "borderColor": "#3b82f6"},
+            ],
+        }),
+        "contact_service_chart": json.dumps({
+            "labels": [row["label"] for row in stats["breakdowns"]["service"]],
+            "datasets": [
+                {"label": str(_("Submissions")), "data": [row["submissions"] for row in stats["breakdowns"]["service"]]},
+                {"label": str(_("Responded")), "data": [row["responded"] for row in stats["breakdowns"]["service"]]},
+            ],
+        }),
         "dashboard_title": "Fintaa Software House Dashboard",
     })
     return context
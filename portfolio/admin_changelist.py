@@ -0,0 +1,204 @@
+"""
+Count-light changelists for large admin tables
+
+Django's changelist runs an exact COUNT(*) of the filtered rows for the
+paginator and another of the whole table for "N total" on every view, and
+its date drill-down issues SELECT DISTINCT over the date column. On big
+tables those queries cost more than the page itself.
+
+EstimatedCountPaginator counts small result sets exactly (bounded to
+``exact_threshold`` rows) and above that uses the planner's estimate on
+PostgreSQL (pg_class.reltuples, or the row estimate of EXPLAIN when
+filtered) or a cached exact count elsewhere. Only planner estimates are
+labelled "about N"; when one overshoots so far that its last page would be
+empty, the paginator falls back to the cached exact count. The date drill-down of
+ContactSubmission reads its years, months and days from the indexed
+ContactRollup table whenever the active filters map onto rollup columns.
+"""
+import datetime
+import hashlib
+import json
+
+from django.conf import settings
+from django.contrib.admin.views.main import ChangeList
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.functional import cached_property
+
+
+EXACT_COUNT_THRESHOLD = 10_000
+COUNT_CACHE_KEY = "admin-count:%s"
+COUNT_CACHE_TIMEOUT = 60 * 5
+
+
+def planner_estimate(queryset):
+    """The database's own row estimate for a queryset, or None where there is none"""
+    if connections[queryset.db].vendor != "postgresql":
+        return None
+    queryset = queryset.order_by()
+    if not queryset.query.where:
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute("SELECT reltuples FROM pg_class WHERE oid = %s::regclass", [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+        # -1 until the table has been vacuumed or analyzed
+        return int(row[0]) if row and row[0] >= 0 else None
+    plan = json.loads(queryset.explain(format="json"))
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def cached_count(queryset, timeout=COUNT_CACHE_TIMEOUT):
+    """An exact count, reused for ``timeout`` seconds by every view of the same filters"""
+    sql, params = queryset.order_by().query.sql_with_params()
+    key = COUNT_CACHE_KEY % hashlib.md5(repr((queryset.db, sql, params)).encode()).hexdigest()
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, timeout)
+    return count
+
+
+def estimated_count(queryset, threshold=EXACT_COUNT_THRESHOLD):
+    """(count, is_estimate) for a queryset, counting exactly only up to ``threshold`` rows
+
+    ``is_estimate`` is only set for planner estimates; a count above
+    ``threshold`` without one is exact, if up to COUNT_CACHE_TIMEOUT old.
+    """
+    estimate = planner_estimate(queryset)
+    if estimate is not None and estimate > threshold:
+        return estimate, True
+    # Stops reading after threshold + 1 rows, so small filtered sets are exact and large ones cheap
+    bounded = queryset.order_by()[: threshold + 1].count()
+    if bounded <= threshold:
+        return bounded, False
+    return max(cached_count(queryset), bounded), False
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator whose count is exact for small result sets and estimated for large ones"""
+
+    exact_threshold = EXACT_COUNT_THRESHOLD
+    template_name = "admin/portfolio/estimated_pagination.html"
+
+    @cached_property
+    def _estimated_count(self):
+        count, estimated = estimated_count(self.object_list, self.exact_threshold)
+        if estimated and count > self.per_page:
+            # Never link to pages past the end: following one raises IncorrectLookupParameters
+            last_page_start = (count - 1) // self.per_page * self.per_page
+            if not self.object_list[last_page_start:last_page_start + 1].exists():
+                return cached_count(self.object_list), False
+        return count, estimated
+
+    @property
+    def count(self):
+        return self._estimated_count[0]
+
+    @property
+    def estimated(self):
+        return self._estimated_count[1]
+
+
+class EstimatedCountChangeList(ChangeList):
+    """
+    Changelist counting the unfiltered table the way its paginator counts results
+
+    Use with ``show_full_result_count = False`` on the ModelAdmin so Django
+    skips its own exact count; "N total" is then filled in here.
+    """
+
+    def get_results(self, request):
+        super().get_results(request)
+        if isinstance(self.paginator, EstimatedCountPaginator):
+            self.full_result_count, self.full_result_count_estimated = estimated_count(
+                self.root_queryset, self.paginator.exact_threshold
+            )
+            self.show_full_result_count = True
+            self.show_admin_actions = bool(self.full_result_count)
+
+
+def rollup_filters(cl):
+    """ContactRollup filters equivalent to a ContactSubmission changelist's, or None when they have none"""
+    from portfolio import rollups
+
+    if cl.query:
+        return None
+    field = cl.date_hierarchy
+    # Archived submissions stay in the rollups but not in the changelist
+    filters = {"submissions__gt": F("archived")}
+    for key, values in cl.get_filters_params().items():
+        if len(values) != 1:
+            return None
+        name, _, lookup = key.partition("__")
+        value = values[0]
+        if name in rollups.DIMENSIONS and lookup in ("", "exact"):
+            filters[name] = value
+        elif key == "is_responded__exact" and value == "1":
+            # Only responded submissions are ever archived
+            filters["responded__gt"] = F("archived")
+        elif key == "is_responded__exact" and value == "0":
+            filters["submissions__gt"] = F("responded")
+        elif name == field and lookup in ("year", "month", "day"):
+            filters["day__%s" % lookup] = value
+        elif name == field and lookup in ("gte", "lt"):
+            day = local_day(value)
+            if day is None:
+                return None
+            filters["day__%s" % lookup] = day
+        else:
+            return None
+    return filters
+
+
+def local_day(value):
+    """The local date of a date or datetime query string value"""
+    moment = parse_datetime(value)
+    if moment is None:
+        return parse_date(value)
+    return timezone.localdate(moment) if timezone.is_aware(moment) else moment.date()
+
+
+class RollupDates:
+    """The part of a queryset Django's date drill-down uses, answered from ContactRollup days"""
+
+    def __init__(self, rollups):
+        self.rollups = rollups
+
+    def aggregate(self, **aggregates):
+        bounds = self.rollups.aggregate(**{name: type(expression)("day") for name, expression in aggregates.items()})
+        return {name: day and as_datetime(day) for name, day in bounds.items()}
+
+    def dates(self, field_name, kind):
+        return self.rollups.dates("day", kind)
+
+    def datetimes(self, field_name, kind):
+        return [as_datetime(day) for day in self.dates(field_name, kind)]
+
+
+def as_datetime(day):
+    moment = datetime.datetime.combine(day, datetime.time.min)
+    return timezone.make_aware(moment) if settings.USE_TZ else moment
+
+
+class RollupDateHierarchy:
+    """A changelist whose ``queryset`` is only used for date drill-down"""
+
+    def __init__(self, cl, queryset):
+        self._cl = cl
+        self.queryset = queryset
+
+    def __getattr__(self, name):
+        return getattr(self._cl, name)
+
+
+def date_hierarchy_changelist(cl):
+    """``cl``, or a stand-in reading drill-down dates from the rollups when its filters allow"""
+    from portfolio.models import ContactRollup
+
+    filters = rollup_filters(cl)
+    if filters is None:
+        return cl
+    return RollupDateHierarchy(cl, RollupDates(ContactRollup.objects.filter(**filters)))
@@ -0,0 +1,318 @@
+"""
+Read-only JSON API for portfolio content
+
+Projects, blog posts, services and team members are exposed under /api/
+for the mobile app and partner sites. Every endpoint supports sparse
+fieldsets (``?fields=id,title,technologies``) and only prefetches the
+inline children the requested fields need. Listings use keyset (cursor)
+pagination, so deep pages cost the same as the first one.
+
+Responses are rendered once and cached with their ETag under a key that
+includes the fragment version tokens of the resource's models (see
+portfolio.fragments). Publishing a page or saving one of its inline children
+replaces those tokens, which retires every cached response of that resource
+at once; conditional requests are answered with a 304 from the cache.
+"""
+import hashlib
+from functools import partial
+
+from django.db.models import Prefetch
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from rest_framework import serializers, viewsets
+from rest_framework.exceptions import ParseError
+from rest_framework.pagination import CursorPagination
+from rest_framework.permissions import AllowAny
+from rest_framework.renderers import JSONRenderer
+from wagtail.models import Page
+from wagtail.rich_text import expand_db_html
+
+from portfolio import cdn, fragments, singleflight
+from portfolio.models import (
+    BlogPost, PricingFeature, PricingPlan, ProcessStep, ProjectImage, ProjectPage, ProjectTechnology, ServicePage,
+    TeamPage, TeamPageMember, Technology,
+)
+
+
+CACHE_KEY = "api:%s:%s"
+CACHE_TIMEOUT = 60 * 60 * 24
+FIELDS_PARAM = "fields"
+
+# Shared caches may keep a response briefly; the application cache is
+# invalidated on publish, so most requests past this are cheap 304s
+CACHE_CONTROL = {"public": True, "max_age": 0, "s_maxage": 60, "stale_while_revalidate": 60}
+
+
+class RichTextField(serializers.CharField):
+    """Rich text with internal links and embeds expanded to front-end HTML"""
+
+    def to_representation(self, value):
+        return expand_db_html(value) if value else ""
+
+
+class StreamField(serializers.Field):
+    """A StreamField as the list of blocks Wagtail's API representation gives"""
+
+    def __init__(self, **kwargs):
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return value.stream_block.get_api_representation(value, self.context)
+
+
+class SparseFieldsMixin:
+    """Drop the fields not listed in ``?fields=``; nested serializers are returned whole"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = requested_fields(self.context.get("request"))
+        if requested is None:
+            return
+        unknown = requested - set(self.fields)
+        if unknown:
+            raise ParseError("Unknown fields: %s" % ", ".join(sorted(unknown)))
+        for name in set(self.fields) - requested:
+            self.fields.pop(name)
+
+
+def requested_fields(request):
+    """The set of field names asked for in ``?fields=``, or None for all fields"""
+    if request is None or not request.query_params.get(FIELDS_PARAM):
+        return None
+    return {name.strip() for name in request.query_params[FIELDS_PARAM].split(",") if name.strip()}
+
+
+class PageSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    url = serializers.SerializerMethodField()
+
+    def get_url(self, page):
+        return page.get_full_url(self.context.get("request"))
+
+
+class ProjectTechnologySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ProjectTechnology
+        fields = ["name", "category"]
+
+
+class ProjectImageSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ProjectImage
+        fields = ["image_url", "caption", "is_featured"]
+
+
+class ProjectSerializer(PageSerializer):
+    overview = RichTextField(source="project_overview")
+    challenge = RichTextField(source="project_challenge")
+    solution = RichTextField(source="project_solution")
+    results = RichTextField(source="project_results")
+    technologies = ProjectTechnologySerializer(source="project_technologies", many=True)
+    images = ProjectImageSerializer(source="project_images", many=True)
+
+    class Meta:
+        model = ProjectPage
+        fields = [
+            "id", "title", "slug", "url", "first_published_at", "last_published_at",
+            "project_title", "project_subtitle", "client_name", "project_url", "github_url",
+            "overview", "challenge", "solution", "results",
+            "project_duration", "project_team_size", "completion_date", "featured_image_url",
+            "technologies", "images",
+        ]
+
+
+class BlogPostSerializer(PageSerializer):
+    tags = serializers.SerializerMethodField()
+    featured_image = serializers.SerializerMethodField()
+    content = StreamField()
+
+    class Meta:
+        model = BlogPost
+        fields = [
+            "id", "title", "slug", "url", "first_published_at", "last_published_at",
+            "excerpt", "author", "publish_date", "featured_image", "tags", "content",
+        ]
+
+    def get_tags(self, post):
+        return [tag.strip() for tag in post.tags.split(",") if tag.strip()]
+
+    def get_featured_image(self, post):
+        return post.featured_image.url if post.featured_image else None
+
+
+class ProcessStepSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ProcessStep
+        fields = ["step_number", "title", "description"]
+
+
+class TechnologySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Technology
+        fields = ["name", "logo_url", "description"]
+
+
+class PricingFeatureSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PricingFeature
+        fields = ["feature_text", "is_included"]
+
+
+class PricingPlanSerializer(serializers.ModelSerializer):
+    features = PricingFeatureSerializer(many=True)
+
+    class Meta:
+        model = PricingPlan
+        fields = ["name", "price", "description", "is_popular", "features"]
+
+
+class ServiceSerializer(PageSerializer):
+    hero_description = RichTextField()
+    service_overview = RichTextField()
+    pricing_description = RichTextField()
+    process_steps = ProcessStepSerializer(many=True)
+    technologies = TechnologySerializer(many=True)
+    pricing_plans = PricingPlanSerializer(many=True)
+
+    class Meta:
+        model = ServicePage
+        fields = [
+            "id", "title", "slug", "url", "first_published_at", "last_published_at",
+            "hero_title", "hero_description", "hero_image_url", "service_overview",
+            "process_title", "process_steps", "technologies_title", "technologies",
+            "pricing_title", "pricing_description", "pricing_plans",
+        ]
+
+
+class TeamMemberSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    bio = RichTextField()
+    skills = serializers.SerializerMethodField()
+
+    class Meta:
+        model = TeamPageMember
+        fields = ["id", "page", "sort_order", "name", "position", "bio", "email", "linkedin", "github", "twitter", "skills"]
+
+    def get_skills(self, member):
+        return [skill.strip() for skill in member.skills.split(",") if skill.strip()]
+
+
+class KeysetPagination(CursorPagination):
+    """Cursor pagination ordered by the view's ``ordering``"""
+
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+    def get_ordering(self, request, queryset, view):
+        return (view.ordering,)
+
+
+class CachedReadOnlyViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Read-only endpoint whose rendered responses are cached until its models change
+
+    Subclasses set ``model`` (the resource's model; its fragment version
+    covers its inline children too), ``ordering`` for keyset pagination and
+    ``prefetch_plan``: for each serializer field that reads inline children,
+    the prefetches it needs. ``listing_model`` names the page type whose
+    publish purges the response from a CDN, when it is not ``model``.
+    """
+
+    model = None
+    listing_model = None
+    ordering = "-pk"
+    prefetch_plan = {}
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    renderer_classes = [JSONRenderer]
+    pagination_class = KeysetPagination
+
+    def base_queryset(self):
+        return self.model.objects.all()
+
+    def get_queryset(self):
+        queryset = self.base_queryset()
+        requested = requested_fields(self.request)
+        for field, lookups in self.prefetch_plan.items():
+            if requested is None or field in requested:
+                queryset = queryset.prefetch_related(*lookups)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, partial(super().list, request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, partial(super().retrieve, request, *args, **kwargs))
+
+    def version_models(self):
+        return [self.model, Page]
+
+    def cache_params(self):
+        """Query parameters that change a response; anything else (tracking tags, cache busters) shares its entry"""
+        pagination = self.pagination_class
+        return (FIELDS_PARAM, pagination.cursor_query_param, pagination.page_size_query_param)
+
+    def cache_key(self, request):
+        versions = fragments.get_versions([fragments.model_version_key(model) for model in self.version_models()])
+        params = [(name, request.query_params.getlist(name)) for name in self.cache_params()]
+        parts = [request.get_host(), request.path, *params, *sorted(versions.values())]
+        return CACHE_KEY % (self.basename, hashlib.md5(repr(parts).encode()).hexdigest())
+
+    def cached_response(self, request, respond):
+        def render():
+            body = JSONRenderer().render(respond().data)
+            return {"body": body, "etag": '"%s"' % hashlib.md5(body).hexdigest()}
+
+        document = singleflight.get_or_compute(self.cache_key(request), render, timeout=CACHE_TIMEOUT)
+        response = HttpResponse(document["body"], content_type="application/json")
+        response["ETag"] = document["etag"]
+        patch_cache_control(response, **CACHE_CONTROL)
+        key = cdn.listing_key(self.listing_model or self.model)
+        response["Surrogate-Key"] = key
+        response["Cache-Tag"] = key
+        return get_conditional_response(request, etag=document["etag"], response=response)
+
+
+class LivePageViewSet(CachedReadOnlyViewSet):
+    ordering = "-first_published_at"
+
+    def base_queryset(self):
+        return self.model.objects.live().public()
+
+
+class ProjectViewSet(LivePageViewSet):
+    model = ProjectPage
+    serializer_class = ProjectSerializer
+    prefetch_plan = {
+        "technologies": ["project_technologies"],
+        "images": ["project_images"],
+    }
+
+
+class BlogPostViewSet(LivePageViewSet):
+    model = BlogPost
+    serializer_class = BlogPostSerializer
+
+
+class ServiceViewSet(LivePageViewSet):
+    model = ServicePage
+    serializer_class = ServiceSerializer
+    prefetch_plan = {
+        "process_steps": ["process_steps"],
+        "technologies": ["technologies"],
+        "pricing_plans": [Prefetch("pricing_plans", queryset=PricingPlan.objects.prefetch_related("features"))],
+    }
+
+
+class TeamMemberViewSet(CachedReadOnlyViewSet):
+    model = TeamPageMember
+    serializer_class = TeamMemberSerializer
+    listing_model = TeamPage
+    ordering = "pk"
+
+    def version_models(self):
+        # Members are saved with their page, but unpublishing only touches the page
+        return [TeamPageMember, TeamPage, Page]
+
+    def base_queryset(self):
+        return TeamPageMember.objects.filter(page__in=TeamPage.objects.live().public())
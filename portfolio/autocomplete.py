@@ -0,0 +1,228 @@
+"""
+In-memory prefix index for search-as-you-type autocomplete
+
+Each process holds its own index. A version token in the shared cache is
+replaced whenever any process changes the indexed pages; a process whose
+index was built for another token rebuilds it on its next lookup, so an
+index never outlives a publish made by another worker.
+"""
+import re
+import threading
+import uuid
+from bisect import bisect_left, insort
+
+from django.core.cache import cache
+from django.utils.text import slugify
+
+
+DEFAULT_LIMIT = 10
+VERSION_KEY = "autocomplete:version"
+
+_word_re = re.compile(r"\w+", re.UNICODE)
+
+
+def normalize(text):
+    """Lowercase and collapse whitespace so lookups are case-insensitive"""
+    return " ".join(_word_re.findall((text or "").lower()))
+
+
+def index_keys(term):
+    """Keys for a term: the whole phrase plus every word-start suffix"""
+    words = normalize(term).split(" ")
+    return {" ".join(words[i:]) for i in range(len(words)) if words[i]}
+
+
+class PrefixIndex:
+    """Sorted array of (key, entry id) pairs searched with bisect"""
+
+    def __init__(self):
+        self._keys = []
+        self._entries = {}
+        self._entry_keys = {}
+        self._groups = {}
+        self._lock = threading.Lock()
+        self.built = False
+        self.version = None
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, entry_id, label, url, kind, terms=(), group=None):
+        """Add or replace an entry, indexing its label and any extra terms"""
+        keys = set()
+        for term in (label, *terms):
+            keys |= index_keys(term)
+        with self._lock:
+            self._remove(entry_id)
+            self._entries[entry_id] = {"label": label, "url": url, "kind": kind}
+            self._entry_keys[entry_id] = keys
+            self._groups.setdefault(group, set()).add(entry_id)
+            for key in keys:
+                insort(self._keys, (key, entry_id))
+
+    def remove(self, entry_id):
+        """Drop an entry and all of its keys"""
+        with self._lock:
+            self._remove(entry_id)
+
+    def remove_group(self, group):
+        """Drop every entry added under ``group``"""
+        with self._lock:
+            for entry_id in self._groups.pop(group, ()):
+                self._remove(entry_id)
+
+    def _remove(self, entry_id):
+        for key in self._entry_keys.pop(entry_id, ()):
+            position = bisect_left(self._keys, (key, entry_id))
+            if position < len(self._keys) and self._keys[position] == (key, entry_id):
+                del self._keys[position]
+        self._entries.pop(entry_id, None)
+
+    def is_current(self, version):
+        return self.built and self.version == version
+
+    def load(self, rows, version=None):
+        """Replace the index contents from (group, id, label, url, kind, terms) rows"""
+        keys = []
+        entries = {}
+        entry_keys = {}
+        groups = {}
+        for group, entry_id, label, url, kind, terms in rows:
+            entry_key_set = set()
+            for term in (label, *terms):
+                entry_key_set |= index_keys(term)
+            entries[entry_id] = {"label": label, "url": url, "kind": kind}
+            entry_keys[entry_id] = entry_key_set
+            groups.setdefault(group, set()).add(entry_id)
+            keys.extend((key, entry_id) for key in entry_key_set)
+        keys.sort()
+        with self._lock:
+            self._keys = keys
+            self._entries = entries
+            self._entry_keys = entry_keys
+            self._groups = groups
+            self.built = True
+            self.version = version
+
+    def search(self, prefix, limit=DEFAULT_LIMIT):
+        """Return up to ``limit`` distinct entries having a key starting with ``prefix``"""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        results = []
+        seen = set()
+        # add() and remove() edit the key list in place
+        with self._lock:
+            keys = self._keys
+            position = bisect_left(keys, (prefix,))
+            while position < len(keys) and len(results) < limit:
+                key, entry_id = keys[position]
+                if not key.startswith(prefix):
+                    break
+                if entry_id not in seen:
+                    seen.add(entry_id)
+                    entry = self._entries.get(entry_id)
+                    if entry is not None:
+                        results.append(entry)
+                position += 1
+        return results
+
+
+index = PrefixIndex()
+
+
+def page_rows(page):
+    """Index rows for a live page: the page itself plus its technologies or tags"""
+    from portfolio.models import BlogPage, BlogPost, ProjectPage
+
+    group = page.pk
+    url = page.get_url()
+    kind = page._meta.model_name
+    terms = []
+    extra = []
+
+    if isinstance(page, ProjectPage):
+        terms = [page.project_title, page.client_name]
+        extra = [(t.name, "technology") for t in page.project_technologies.all()]
+    elif isinstance(page, BlogPost):
+        extra = [(tag.strip(), "tag") for tag in (page.tags or "").split(",") if tag.strip()]
+    elif isinstance(page, BlogPage):
+        extra = [(t.tag_name, "tag") for t in page.blog_tags.all()]
+
+    rows = [(group, "page:%s" % page.pk, page.title, url, kind, tuple(t for t in terms if t))]
+    for label, extra_kind in extra:
+        entry_id = "%s:%s:%s" % (extra_kind, page.pk, slugify(label))
+        rows.append((group, entry_id, label, url, extra_kind, ()))
+    return rows
+
+
+def shared_version():
+    """The version token of the indexed pages, shared by every process"""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_version():
+    """Replace the shared token so other processes rebuild; returns (previous, new)"""
+    previous = cache.get(VERSION_KEY)
+    version = uuid.uuid4().hex
+    cache.set(VERSION_KEY, version, None)
+    return previous, version
+
+
+def build_index(version=None):
+    """Rebuild the whole index from live, public pages"""
+    from wagtail.models import Page
+
+    if version is None:
+        # Read before the pages, so a change made meanwhile triggers another rebuild
+        version = shared_version()
+    pages = Page.objects.live().public().filter(depth__gt=1).specific()
+    rows = []
+    for page in pages:
+        rows.extend(page_rows(page))
+    index.load(rows, version)
+    return index
+
+
+def get_index():
+    """Return the process-wide index, (re)building it on first use or after a change elsewhere"""
+    version = shared_version()
+    if not index.is_current(version):
+        build_index(version)
+    return index
+
+
+def changed(applied):
+    """Bump the shared version after a change; the local index keeps up only if it was current"""
+    previous, version = bump_version()
+    if applied and index.version == previous:
+        index.version = version
+
+
+def invalidate():
+    """Have every process, this one included, rebuild its index, e.g. after URLs of a subtree changed"""
+    bump_version()
+    index.version = None
+
+
+def update_page(page):
+    """Re-index a single page after it is published"""
+    from wagtail.models import Page
+
+    if index.built:
+        index.remove_group(page.pk)
+        if Page.objects.filter(pk=page.pk).live().public().exists():
+            for group, entry_id, label, url, kind, terms in page_rows(page):
+                index.add(entry_id, label, url, kind, terms, group=group)
+    changed(applied=index.built)
+
+
+def remove_page(page):
+    """Remove a page from the index after it is unpublished or deleted"""
+    if index.built:
+        index.remove_group(page.pk)
+    changed(applied=index.built)
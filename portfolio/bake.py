@@ -0,0 +1,202 @@
+"""
+Static export ("bake") of the live page tree to a directory
+
+Each live page is rendered through the full Django stack with the test
+client and written to <output>/<url>/index.html next to precompressed
+.gz/.br variants, the layout nginx gzip_static and WhiteNoise both serve
+directly. Pages whose cache policy is not shared (those embedding a
+CSRF-protected form) are skipped unless explicitly included, since a baked
+CSRF token could never validate. A manifest records every baked page's ETag (see
+portfolio.conditional) so later runs only re-render pages whose content or
+listed children changed since the previous bake.
+"""
+import json
+import logging
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from portfolio import compression
+
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = ".bake-manifest.json"
+
+
+def output_path(output_dir, url):
+    """<output>/<url>/index.html for a site-relative page URL"""
+    relative = url.strip("/")
+    return Path(output_dir, relative, "index.html") if relative else Path(output_dir, "index.html")
+
+
+def load_manifest(output_dir):
+    try:
+        with open(Path(output_dir, MANIFEST_NAME)) as manifest_file:
+            return json.load(manifest_file)
+    except (OSError, ValueError):
+        return {"pages": {}}
+
+
+def save_manifest(output_dir, manifest):
+    path = Path(output_dir, MANIFEST_NAME)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def live_pages(site, include_private=False):
+    """(page id, site-relative url, etag) for every live, public page of a site"""
+    from portfolio.cdn import get_policy
+    from portfolio.conditional import page_etag
+
+    pages = site.root_page.get_descendants(inclusive=True).live().public().specific()
+    result = []
+    for page in pages:
+        url = page.get_url(current_site=site)
+        if not url or not url.startswith("/"):
+            continue
+        if not include_private and not get_policy(page)["shared"]:
+            continue
+        etag = page_etag(page) if hasattr(page, "get_conditional_dependencies") else None
+        result.append((page.pk, url, etag))
+    return result
+
+
+def plan(site, output_dir, full=False, include_private=False):
+    """Split the live tree into pages to (re)render, pages to keep and stale files to remove"""
+    manifest = load_manifest(output_dir)
+    previous = manifest.get("pages", {})
+    current = {str(pk): {"url": url, "etag": etag} for pk, url, etag in live_pages(site, include_private)}
+
+    to_render = [
+        entry["url"] for pk, entry in current.items()
+        if full or entry["etag"] is None or previous.get(pk) != entry
+        or not output_path(output_dir, entry["url"]).exists()
+    ]
+    current_urls = {entry["url"] for entry in current.values()}
+    to_remove = [entry["url"] for entry in previous.values() if entry["url"] not in current_urls]
+    return current, to_render, to_remove
+
+
+def _init_worker():
+    import django
+    from django.apps import apps
+    from django.db import connections
+
+    if not apps.ready:
+        os.environ.setdefault("DJANGO_SETTINGS_MODULE", "setting.settings")
+        django.setup()
+    # Never share database connections inherited from the parent process
+    connections.close_all()
+
+
+def render_page(url, output_dir, host):
+    """Render one URL and write it with its compressed variants; returns (url, error or None, bytes)"""
+    from django.test import Client
+
+    try:
+        client = Client(HTTP_HOST=host)
+        response = client.get(url, secure=True)
+        if response.status_code != 200:
+            return url, "HTTP %s" % response.status_code, 0
+
+        body = response.content
+        path = output_path(output_dir, url)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _write(path, body)
+        written = len(body)
+        for encoding, data in compression.variants(body).items():
+            _write(Path(str(path) + compression.ENCODINGS[encoding]), data)
+            written += len(data)
+    except Exception as error:
+        logger.exception("Baking %s failed", url)
+        return url, repr(error), 0
+    return url, None, written
+
+
+def _write(path, data):
+    tmp_path = Path(str(path) + ".tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+def remove_page(output_dir, url):
+    """Delete the baked files of a page that is no longer live"""
+    path = output_path(output_dir, url)
+    for suffix in ("", *compression.ENCODINGS.values()):
+        Path(str(path) + suffix).unlink(missing_ok=True)
+    directory = path.parent
+    if directory != Path(output_dir) and directory.is_dir() and not any(directory.iterdir()):
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def bake(site, output_dir, workers=None, full=False, host=None, include_private=False):
+    """Bake the site into ``output_dir``; returns a summary dict
+
+    ``workers=0`` renders in the calling process instead of a pool. A page
+    that fails is reported in ``failed`` and left out of the manifest, so
+    the next run renders it again; the manifest is saved however the run ends.
+    """
+    from django.db import connections
+
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    host = host or site.hostname
+    current, to_render, to_remove = plan(site, output_dir, full=full, include_private=include_private)
+
+    for url in to_remove:
+        remove_page(output_dir, url)
+
+    started = time.perf_counter()
+    failed = []
+    rendered = set()
+    written = 0
+    try:
+        if to_render and workers == 0:
+            results = (render_page(url, str(output_dir), host) for url in to_render)
+            for url, error, size in results:
+                rendered.add(url)
+                if error:
+                    failed.append((url, error))
+                written += size
+        elif to_render:
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                futures = {pool.submit(render_page, url, str(output_dir), host): url for url in to_render}
+                for future, url in futures.items():
+                    try:
+                        url, error, size = future.result()
+                    except Exception as pool_error:
+                        # The worker itself died (e.g. BrokenProcessPool)
+                        error, size = repr(pool_error), 0
+                    rendered.add(url)
+                    if error:
+                        failed.append((url, error))
+                    written += size
+    finally:
+        # Unchanged pages keep their entry; changed ones only once they were written
+        failed_urls = {url for url, error in failed}
+        pending = set(to_render) - rendered
+        save_manifest(output_dir, {
+            "baked_at": time.time(),
+            "pages": {
+                pk: entry for pk, entry in current.items()
+                if entry["url"] not in failed_urls and entry["url"] not in pending
+            },
+        })
+    elapsed = time.perf_counter() - started
+
+    rendered_count = len(rendered) - len(failed)
+    return {
+        "total": len(current),
+        "rendered": rendered_count,
+        "skipped": len(current) - len(to_render),
+        "removed": len(to_remove),
+        "failed": failed,
+        "bytes": written,
+        "seconds": elapsed,
+        "pages_per_second": rendered_count / elapsed if elapsed else 0.0,
+    }
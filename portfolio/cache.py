@@ -0,0 +1,259 @@
+"""
+Two-tier cache backend: a bounded in-process LRU in front of a shared cache
+
+Reads are answered from a small per-process LRU (entry count and byte size
+bounded, short TTL) and fall back to the shared tier, any other configured
+cache alias (file based or Redis), which every worker sees. Writes and
+deletes go to both tiers. Values are pickled once, zlib-compressed above a
+size threshold and stored as bytes in both tiers, so the byte budget of the
+local tier is exact and the shared tier never pickles again.
+
+Other processes' writes become visible once the local copy expires, so
+LOCAL_TIMEOUT bounds how stale a worker can be after another worker
+invalidates a key.
+
+    CACHES = {
+        "default": {
+            "BACKEND": "portfolio.cache.TieredCache",
+            "OPTIONS": {"SHARED": "shared", "LOCAL_TIMEOUT": 5},
+        },
+        "shared": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", ...},
+    }
+"""
+import pickle
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+
+RAW = b"p"
+COMPRESSED = b"z"
+
+
+def dumps(value, min_compress_length=1024, level=6):
+    """Pickle a value, compressing it when that pays off; the first byte flags the format"""
+    data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+    if len(data) >= min_compress_length:
+        compressed = zlib.compress(data, level)
+        if len(compressed) < len(data):
+            return COMPRESSED + compressed
+    return RAW + data
+
+
+def loads(data):
+    if data[:1] == COMPRESSED:
+        return pickle.loads(zlib.decompress(data[1:]))
+    return pickle.loads(data[1:])
+
+
+class LocalLRU:
+    """Thread-safe LRU of serialized values bounded by entry count and total bytes"""
+
+    def __init__(self, max_entries=1000, max_bytes=16 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    @property
+    def size(self):
+        return self._bytes
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, data = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._pop(key)
+                return None
+            self._data.move_to_end(key)
+            return data
+
+    def set(self, key, data, timeout):
+        """Store ``data`` for ``timeout`` seconds (None: until evicted)"""
+        with self._lock:
+            self._pop(key)
+            # A single value may take at most an eighth of the budget
+            if timeout is not None and timeout <= 0 or len(data) > self.max_bytes // 8:
+                return
+            expires_at = time.monotonic() + timeout if timeout is not None else None
+            self._data[key] = (expires_at, data)
+            self._bytes += len(data)
+            while self._data and (len(self._data) > self.max_entries or self._bytes > self.max_bytes):
+                self._pop(next(iter(self._data)))
+
+    def delete(self, key):
+        with self._lock:
+            self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def _pop(self, key):
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[1])
+
+
+class TieredCache(BaseCache):
+    """Django cache backend layering a per-process LRU over another cache alias
+
+    OPTIONS: SHARED (alias of the shared cache, default "shared", or a cache
+    instance),
+    LOCAL_MAX_ENTRIES, LOCAL_MAX_BYTES, LOCAL_TIMEOUT (seconds a value is
+    served locally, default 5), COMPRESS_MIN_LENGTH and COMPRESS_LEVEL.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self.shared_alias = options.get("SHARED", location or "shared")
+        self.local_timeout = options.get("LOCAL_TIMEOUT", 5)
+        self.compress_min_length = options.get("COMPRESS_MIN_LENGTH", 1024)
+        self.compress_level = options.get("COMPRESS_LEVEL", 6)
+        self.local = LocalLRU(
+            max_entries=options.get("LOCAL_MAX_ENTRIES", 1000),
+            max_bytes=options.get("LOCAL_MAX_BYTES", 16 * 1024 * 1024),
+        )
+        self._counters = {"local_hits": 0, "local_misses": 0, "shared_hits": 0, "shared_misses": 0}
+        self._counters_lock = threading.Lock()
+
+    @property
+    def shared(self):
+        if isinstance(self.shared_alias, BaseCache):
+            return self.shared_alias
+        return caches[self.shared_alias]
+
+    def stats(self):
+        """Hit/miss counters per tier plus the local tier's current size"""
+        with self._counters_lock:
+            counters = dict(self._counters)
+        return {
+            "local": {
+                "hits": counters["local_hits"],
+                "misses": counters["local_misses"],
+                "entries": len(self.local),
+                "bytes": self.local.size,
+            },
+            "shared": {"hits": counters["shared_hits"], "misses": counters["shared_misses"]},
+        }
+
+    def reset_stats(self):
+        with self._counters_lock:
+            for name in self._counters:
+                self._counters[name] = 0
+
+    def _count(self, **increments):
+        with self._counters_lock:
+            for name, amount in increments.items():
+                self._counters[name] += amount
+
+    def _dumps(self, value):
+        return dumps(value, self.compress_min_length, self.compress_level)
+
+    def _local_timeout(self, timeout):
+        timeout = self.get_backend_timeout(timeout)
+        if timeout is None:
+            return self.local_timeout
+        return min(timeout - time.time(), self.local_timeout)
+
+    def get(self, key, default=None, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        data = self.local.get(local_key)
+        if data is not None:
+            self._count(local_hits=1)
+            return loads(data)
+
+        data = self.shared.get(key, version=version)
+        if data is None:
+            self._count(local_misses=1, shared_misses=1)
+            return default
+        self._count(local_misses=1, shared_hits=1)
+        self.local.set(local_key, data, self.local_timeout)
+        return loads(data)
+
+    def get_many(self, keys, version=None):
+        found = {}
+        missing = []
+        for key in keys:
+            data = self.local.get(self.make_and_validate_key(key, version=version))
+            if data is None:
+                missing.append(key)
+            else:
+                found[key] = loads(data)
+        self._count(local_hits=len(found), local_misses=len(missing))
+
+        if missing:
+            shared_found = self.shared.get_many(missing, version=version)
+            self._count(shared_hits=len(shared_found), shared_misses=len(missing) - len(shared_found))
+            for key, data in shared_found.items():
+                self.local.set(self.make_and_validate_key(key, version=version), data, self.local_timeout)
+                found[key] = loads(data)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        data = self._dumps(value)
+        self.shared.set(key, data, timeout=timeout, version=version)
+        self.local.set(self.make_and_validate_key(key, version=version), data, self._local_timeout(timeout))
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        serialized = {key: self._dumps(value) for key, value in data.items()}
+        failed = self.shared.set_many(serialized, timeout=timeout, version=version)
+        local_timeout = self._local_timeout(timeout)
+        for key, value in serialized.items():
+            local_key = self.make_and_validate_key(key, version=version)
+            if key in failed:
+                self.local.delete(local_key)
+            else:
+                self.local.set(local_key, value, local_timeout)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        data = self._dumps(value)
+        local_key = self.make_and_validate_key(key, version=version)
+        if not self.shared.add(key, data, timeout=timeout, version=version):
+            return False
+        self.local.set(local_key, data, self._local_timeout(timeout))
+        return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self.local.delete(self.make_and_validate_key(key, version=version))
+        return self.shared.touch(key, timeout=timeout, version=version)
+
+    def delete(self, key, version=None):
+        self.local.delete(self.make_and_validate_key(key, version=version))
+        return self.shared.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self.local.delete(self.make_and_validate_key(key, version=version))
+        self.shared.delete_many(keys, version=version)
+
+    def has_key(self, key, version=None):
+        if self.local.get(self.make_and_validate_key(key, version=version)) is not None:
+            return True
+        return self.shared.has_key(key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        # Values are opaque bytes to the shared tier, so go through get/set
+        self.local.delete(self.make_and_validate_key(key, version=version))
+        return super().incr(key, delta, version=version)
+
+    def clear(self):
+        self.local.clear()
+        self.shared.clear()
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
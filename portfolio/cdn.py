@@ -0,0 +1,212 @@
+"""
+Shared-cache (CDN) headers, surrogate keys and purge-on-publish
+
+Every page response names itself ("page-<id>"), the listings it renders
+("list-<model>") and the shared navigation ("nav") in Surrogate-Key /
+Cache-Tag headers. Publishing a page purges its own key, its parent's key
+and the listing key for its type (plus "nav" when the page appears in menus
+or breadcrumbs) through the backend configured in PORTFOLIO_PURGE_BACKEND.
+"""
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from django.conf import settings
+from django.db import transaction
+from django.utils.cache import patch_cache_control
+from django.utils.module_loading import import_string
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POLICY = {
+    "shared": True,
+    "max_age": 0,
+    "s_maxage": 300,
+    "stale_while_revalidate": 60,
+    "stale_if_error": 86400,
+}
+
+# Per page type overrides, keyed by model name. Pages embedding a CSRF-protected
+# form must never be stored by a shared cache.
+POLICIES = {
+    "homepage": {"shared": False},
+    "contactpage": {"shared": False},
+    "blogindexpage": {"s_maxage": 120},
+    "portfolioindexpage": {"s_maxage": 120},
+    "blogpost": {"s_maxage": 3600},
+    "projectpage": {"s_maxage": 3600},
+}
+
+
+def get_policy(page):
+    """The caching policy for a page type, with settings overrides applied"""
+    model_name = page._meta.model_name
+    policy = dict(DEFAULT_POLICY)
+    policy.update(POLICIES.get(model_name, {}))
+    policy.update(getattr(settings, "PORTFOLIO_CACHE_POLICIES", {}).get(model_name, {}))
+    return policy
+
+
+NAVIGATION_KEY = "nav"
+
+
+def page_key(page_id):
+    return "page-%s" % page_id
+
+
+def listing_key(model):
+    return "list-%s" % model._meta.model_name
+
+
+def surrogate_keys(page):
+    """Keys naming a page response: the page itself plus every listing it renders"""
+    keys = [page_key(page.pk)]
+    keys.extend(listing_key(queryset.model) for queryset in page.get_conditional_dependencies())
+    keys.append(NAVIGATION_KEY)
+    return keys
+
+
+def purge_keys_for(page):
+    """Keys to purge when a page changes: itself, its parent and its type's listings"""
+    from wagtail.models import Page
+
+    from portfolio.navigation import affects_navigation
+
+    keys = [page_key(page.pk), listing_key(page.specific_class or type(page))]
+    if affects_navigation(page):
+        keys.append(NAVIGATION_KEY)
+    if page.depth > 2:
+        parent_path = page.path[:-page.steplen]
+        parent_id = Page.objects.filter(path=parent_path).values_list("pk", flat=True).first()
+        if parent_id:
+            keys.append(page_key(parent_id))
+    return keys
+
+
+def patch_response(page, request, response, private=False):
+    """Add Cache-Control and surrogate key headers to a served page response"""
+    policy = get_policy(page)
+    if private or not policy["shared"]:
+        patch_cache_control(response, private=True, max_age=0, must_revalidate=True)
+        return response
+
+    patch_cache_control(
+        response,
+        public=True,
+        max_age=policy["max_age"],
+        s_maxage=policy["s_maxage"],
+        stale_while_revalidate=policy["stale_while_revalidate"],
+        stale_if_error=policy["stale_if_error"],
+    )
+    keys = surrogate_keys(page)
+    response["Surrogate-Key"] = " ".join(keys)
+    response["Cache-Tag"] = ",".join(keys)
+    return response
+
+
+class BasePurgeBackend:
+    """Purge backends receive surrogate keys to evict from a shared cache"""
+
+    def __init__(self, **options):
+        self.options = options
+
+    def purge(self, keys):
+        raise NotImplementedError
+
+
+class NullPurgeBackend(BasePurgeBackend):
+    """Used when no shared cache sits in front of the site"""
+
+    def purge(self, keys):
+        pass
+
+
+class HTTPPurgeBackend(BasePurgeBackend):
+    """Sends one PURGE request per batch with the keys in a Surrogate-Key header
+
+    Understood by Varnish (xkey), Fastly-style proxies and the local
+    PurgeRecorder stand-in below. OPTIONS: URL, METHOD, HEADERS, TIMEOUT.
+    """
+
+    def purge(self, keys):
+        response = requests.request(
+            self.options.get("METHOD", "PURGE"),
+            self.options["URL"],
+            headers={**self.options.get("HEADERS", {}), "Surrogate-Key": " ".join(keys)},
+            timeout=self.options.get("TIMEOUT", 5),
+        )
+        response.raise_for_status()
+
+
+def get_purge_backend():
+    config = getattr(settings, "PORTFOLIO_PURGE_BACKEND", None) or {
+        "BACKEND": "portfolio.cdn.NullPurgeBackend",
+    }
+    backend_class = import_string(config["BACKEND"])
+    return backend_class(**config.get("OPTIONS", {}))
+
+
+def purge(keys):
+    """Purge keys through the configured backend; failures are logged, never raised"""
+    keys = list(dict.fromkeys(keys))
+    if not keys:
+        return
+    try:
+        get_purge_backend().purge(keys)
+    except Exception:
+        logger.exception("Surrogate key purge failed for %s", keys)
+
+
+def purge_page(page):
+    """Purge a page and its listings once the publish transaction commits"""
+    keys = purge_keys_for(page)
+    transaction.on_commit(lambda: purge(keys))
+
+
+class PurgeRecorder:
+    """Local HTTP stand-in for a CDN purge API, recording every purged key
+
+    Start it, point HTTPPurgeBackend at ``recorder.url`` and inspect
+    ``recorder.purged`` (a list of key lists, one per request).
+    """
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self.purged = []
+        recorder = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_PURGE(self):
+                recorder.purged.append(self.headers.get("Surrogate-Key", "").split())
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            do_POST = do_PURGE
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return "http://%s:%s/" % (host, port)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
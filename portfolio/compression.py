@@ -0,0 +1,35 @@
+"""
+Precompressed gzip/Brotli variants of rendered bytes
+"""
+import gzip
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# File suffix and Content-Encoding for every variant we can produce
+ENCODINGS = {
+    "br": ".br",
+    "gzip": ".gz",
+}
+
+
+def compress(data, encoding):
+    """Compress ``data`` with the given Content-Encoding at maximum ratio"""
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    if encoding == "br" and brotli is not None:
+        return brotli.compress(data, quality=11)
+    return None
+
+
+def variants(data):
+    """Map of Content-Encoding to compressed bytes, skipping unavailable or unhelpful encoders"""
+    result = {}
+    for encoding in ENCODINGS:
+        compressed = compress(data, encoding)
+        if compressed is not None and len(compressed) < len(data):
+            result[encoding] = compressed
+    return result
@@ -0,0 +1,111 @@
+"""
+Conditional GET (ETag) support for Wagtail-served pages
+
+Pages carry no Last-Modified: their markup also changes with the menu, the
+fragments they render and PORTFOLIO_CACHE_VERSION, none of which has a
+modification time, so If-Modified-Since alone could revalidate stale markup.
+"""
+import hashlib
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+
+
+def page_etag(page):
+    """ETag for a page and the querysets its rendering depends on"""
+    from portfolio import fragments
+    from portfolio.navigation import navigation_version
+
+    # Fragment versions change on saves that leave the revision alone, e.g. a measured card image
+    version_keys = [fragments.instance_version_key(page)]
+    version_keys.extend(fragments.model_version_key(queryset.model) for queryset in page.get_conditional_dependencies())
+    versions = fragments.get_versions(version_keys)
+    parts = [
+        str(page.pk),
+        str(page.live_revision_id),
+        str(getattr(settings, "PORTFOLIO_CACHE_VERSION", "")),
+        navigation_version(page),
+        *(versions[key] for key in version_keys),
+    ]
+
+    for queryset in page.get_conditional_dependencies():
+        summary = queryset.order_by().aggregate(latest=Max("last_published_at"), total=Count("pk"))
+        parts.append("%s/%s" % (summary["latest"], summary["total"]))
+
+    return '"%s"' % hashlib.md5(":".join(parts).encode()).hexdigest()
+
+
+def has_session(request):
+    return settings.SESSION_COOKIE_NAME in request.COOKIES
+
+
+def is_signed_in(request):
+    """Whether the request has an authenticated user; never reads the session of a request without one
+
+    Reading the session makes SessionMiddleware add Vary: Cookie, which would
+    split every shared cache entry per visitor.
+    """
+    if not has_session(request):
+        return False
+    user = getattr(request, "user", None)
+    return bool(user and user.is_authenticated)
+
+
+def has_per_request_output(request):
+    """Whether this render carries one-off output (flash messages) that must not be revalidated"""
+    if not has_session(request) and CookieStorage.cookie_name not in request.COOKIES:
+        return False
+    return bool(len(get_messages(request)))
+
+
+def can_answer_not_modified(request, page):
+    """Anonymous requests are answered with a 304, unless the page's form still has to set the CSRF cookie"""
+    if is_signed_in(request):
+        return False
+    if page.renders_csrf_token:
+        # Let a fresh render set the cookie when it is missing
+        return settings.CSRF_COOKIE_NAME in request.COOKIES
+    return True
+
+
+class ConditionalServeMixin:
+    """Answer conditional GETs for a page with a 304 before any template rendering"""
+
+    # Pages whose template renders a CSRF-protected form
+    renders_csrf_token = False
+
+    def get_conditional_dependencies(self):
+        """Querysets of pages whose publication changes how this page renders"""
+        return []
+
+    def serve(self, request, *args, **kwargs):
+        from portfolio import cdn, precompressed
+
+        if request.method not in ("GET", "HEAD") or has_per_request_output(request):
+            response = super().serve(request, *args, **kwargs)
+            return cdn.patch_response(self, request, response, private=True)
+
+        etag = page_etag(self)
+
+        if can_answer_not_modified(request, self):
+            not_modified = get_conditional_response(request, etag=etag)
+            if not_modified is not None:
+                not_modified["ETag"] = etag
+                return cdn.patch_response(self, request, not_modified)
+
+        private = is_signed_in(request)
+        response = version = None
+        if not private and cdn.get_policy(self)["shared"] and not getattr(request, "is_preview", False):
+            # Minified and compressed by PrecompressedPageMiddleware on an earlier request
+            version = etag
+            response = precompressed.cached_response(request, etag)
+        if response is None:
+            response = super().serve(request, *args, **kwargs)
+            response.precompressed_version = version
+        if response.status_code != 200:
+            return response
+        response["ETag"] = etag
+        return cdn.patch_response(self, request, response, private=private)
@@ -0,0 +1,169 @@
+"""
+RSS and Atom feeds for blog posts and projects
+
+Feed documents are rendered once from a single values() query per feed and
+stored in the cache together with their ETag and Last-Modified. They are
+rebuilt when a BlogPost or ProjectPage is published, unpublished or deleted,
+so serving a feed (including the 304 path) never touches the database.
+"""
+import datetime
+import hashlib
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed
+from wagtail.models import Site
+
+from portfolio import singleflight
+
+
+FEED_LENGTH = 50
+CACHE_KEY = "feeds:%s:%s"
+
+FORMATS = {
+    "rss": Rss201rev2Feed,
+    "atom": Atom1Feed,
+}
+
+
+def _full_url(url_path, roots):
+    """Turn a page url_path into an absolute URL using the site root paths"""
+    for root in roots:
+        if url_path.startswith(root.root_path):
+            return root.root_url.rstrip("/") + url_path[len(root.root_path) - 1:]
+    return None
+
+
+def _as_datetime(value):
+    if value is None:
+        return None
+    if not isinstance(value, datetime.datetime):
+        value = datetime.datetime.combine(value, datetime.time.min)
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value, datetime.timezone.utc)
+    return value
+
+
+def blog_items():
+    """Feed items for the latest live blog posts"""
+    from portfolio.models import BlogPost
+
+    rows = (
+        BlogPost.objects.live()
+        .public()
+        .order_by("-publish_date", "-pk")
+        .values("title", "excerpt", "publish_date", "author", "tags", "url_path", "last_published_at")
+    )[:FEED_LENGTH]
+    for row in rows:
+        yield {
+            "title": row["title"],
+            "url_path": row["url_path"],
+            "description": row["excerpt"],
+            "pubdate": _as_datetime(row["publish_date"]),
+            "updateddate": row["last_published_at"],
+            "author_name": row["author"],
+            "categories": [tag.strip() for tag in row["tags"].split(",") if tag.strip()],
+        }
+
+
+def project_items():
+    """Feed items for the latest live projects"""
+    from portfolio.models import ProjectPage
+
+    rows = (
+        ProjectPage.objects.live()
+        .public()
+        .order_by("-first_published_at", "-pk")
+        .values(
+            "title", "project_subtitle", "client_name", "completion_date",
+            "url_path", "first_published_at", "last_published_at",
+        )
+    )[:FEED_LENGTH]
+    for row in rows:
+        yield {
+            "title": row["title"],
+            "url_path": row["url_path"],
+            "description": row["project_subtitle"] or row["client_name"],
+            "pubdate": _as_datetime(row["completion_date"] or row["first_published_at"]),
+            "updateddate": row["last_published_at"],
+            "author_name": row["client_name"],
+            "categories": [],
+        }
+
+
+FEEDS = {
+    "blog": {
+        "title": "Fintaa Software House Blog",
+        "description": "Technology, development insights and industry trends from Fintaa.",
+        "items": blog_items,
+    },
+    "projects": {
+        "title": "Fintaa Software House Portfolio",
+        "description": "Recent projects delivered by Fintaa Software House.",
+        "items": project_items,
+    },
+}
+
+
+def build_feed(name):
+    """Render every format of a feed and store them in the cache"""
+    feed = FEEDS[name]
+    roots = Site.get_site_root_paths()
+    home_url = roots[-1].root_url + "/" if roots else "/"
+
+    items = []
+    for item in feed["items"]():
+        link = _full_url(item.pop("url_path"), roots)
+        if link:
+            items.append(dict(item, link=link, unique_id=link))
+
+    last_modified = max(
+        (item["updateddate"] or item["pubdate"] for item in items if item["updateddate"] or item["pubdate"]),
+        default=timezone.now(),
+    )
+
+    documents = {}
+    for format_name, generator_class in FORMATS.items():
+        generator = generator_class(
+            title=feed["title"],
+            link=home_url,
+            description=feed["description"],
+            language="en",
+        )
+        for item in items:
+            generator.add_item(**item)
+        body = generator.writeString("utf-8").encode("utf-8")
+        documents[format_name] = {
+            "body": body,
+            "content_type": generator.content_type,
+            "etag": '"%s"' % hashlib.sha1(body).hexdigest(),
+            "last_modified": last_modified.timestamp(),
+        }
+        singleflight.store(CACHE_KEY % (name, format_name), documents[format_name], None)
+    return documents
+
+
+def get_feed(name, format_name):
+    """The cached feed document, building it once on first use however many requests miss it"""
+    return singleflight.get_or_compute(
+        CACHE_KEY % (name, format_name), lambda: build_feed(name)[format_name], timeout=None,
+    )
+
+
+def rebuild_for_page(page):
+    """Rebuild whichever feed lists pages of this type once the change commits"""
+    from portfolio.models import BlogPost, ProjectPage
+
+    page_class = page.specific_class
+    if page_class is None:
+        return
+    if issubclass(page_class, BlogPost):
+        transaction.on_commit(lambda: build_feed("blog"))
+    elif issubclass(page_class, ProjectPage):
+        transaction.on_commit(lambda: build_feed("projects"))
+
+
+def invalidate_all():
+    """Drop every cached feed so it is rebuilt on the next request"""
+    cache.delete_many([CACHE_KEY % (name, fmt) for name in FEEDS for fmt in FORMATS])
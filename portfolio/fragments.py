@@ -0,0 +1,125 @@
+"""
+Versioned template fragment caching
+
+Fragments are cached under a key built from the objects they render: each
+model instance contributes its own version token and each queryset or
+related manager the version token of its model. Tokens are replaced
+whenever a tracked object is saved or deleted (see portfolio.signals), and
+changing an inline child (a pricing feature, a team card) also replaces the
+tokens of the parents it belongs to through its ParentalKey, so a fragment
+keyed on a page is invalidated by any edit published on that page. Stale
+fragments are never deleted, they simply stop being looked up.
+"""
+import functools
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Manager, Model, QuerySet
+from modelcluster.fields import ParentalKey
+from wagtail.models import Page
+
+from portfolio import singleflight
+
+
+FRAGMENT_KEY = "fragment:%s:%s"
+VERSION_KEY = "fragment-version:%s"
+FRAGMENT_TIMEOUT = 60 * 60 * 24
+
+# Longest chain of ParentalKeys followed when bumping parents
+MAX_PARENT_DEPTH = 3
+
+
+def model_label(model):
+    """Pages are versioned as wagtailcore.page so base and specific instances share tokens"""
+    if issubclass(model, Page):
+        return "wagtailcore.page"
+    return model._meta.label_lower
+
+
+def instance_version_key(instance):
+    return VERSION_KEY % "%s:%s" % (model_label(type(instance)), instance.pk)
+
+
+def model_version_key(model):
+    return VERSION_KEY % model._meta.label_lower
+
+
+def dependency_key(value):
+    """The version key a template dependency is tracked by, or None for plain values"""
+    if isinstance(value, Model):
+        return instance_version_key(value)
+    if isinstance(value, (QuerySet, Manager)):
+        return model_version_key(value.model)
+    return None
+
+
+def get_versions(keys):
+    """Current version tokens for ``keys``, creating tokens for any not yet cached"""
+    versions = cache.get_many(keys)
+    missing = {key: _new_token() for key in keys if key not in versions}
+    if missing:
+        for key, token in missing.items():
+            # Keep a token another process created in the meantime
+            if not cache.add(key, token, None):
+                token = cache.get(key) or token
+            versions[key] = token
+    return versions
+
+
+def fragment_key(name, dependencies):
+    """Cache key for a fragment from its name and the current versions of its dependencies"""
+    parts = [str(getattr(settings, "PORTFOLIO_CACHE_VERSION", "")), str(name)]
+    version_keys = [dependency_key(value) for value in dependencies]
+    versions = get_versions([key for key in version_keys if key])
+    for value, key in zip(dependencies, version_keys):
+        parts.append("%s=%s" % (key, versions[key]) if key else str(value))
+    digest = hashlib.md5("|".join(parts).encode()).hexdigest()
+    return FRAGMENT_KEY % (name, digest)
+
+
+def get_or_render(name, dependencies, render, timeout=FRAGMENT_TIMEOUT):
+    """Cached fragment content; concurrent misses share a single ``render()``"""
+    return singleflight.get_or_compute(fragment_key(name, dependencies), render, timeout=timeout)
+
+
+def bump(instance):
+    """Replace the version tokens of an instance, its model and its ParentalKey parents"""
+    tokens = {}
+    _collect(instance, tokens, MAX_PARENT_DEPTH)
+    cache.set_many(tokens, None)
+
+
+def _collect(instance, tokens, depth):
+    tokens[instance_version_key(instance)] = _new_token()
+    tokens[model_version_key(type(instance))] = _new_token()
+    if depth == 0:
+        return
+    for field in instance._meta.concrete_fields:
+        if not isinstance(field, ParentalKey) or getattr(instance, field.attname) is None:
+            continue
+        try:
+            parent = getattr(instance, field.name)
+        except field.related_model.DoesNotExist:
+            continue
+        _collect(parent, tokens, depth - 1)
+
+
+def is_tracked(instance):
+    """Only what templates render carries fragment versions: pages and their inline children"""
+    return renders_in_pages(type(instance))
+
+
+@functools.cache
+def renders_in_pages(model):
+    # Submissions, jobs and other records are written often and never rendered on a page
+    if issubclass(model, Page):
+        return True
+    return model._meta.app_label == "portfolio" and any(
+        isinstance(field, ParentalKey) for field in model._meta.concrete_fields
+    )
+
+
+def _new_token():
+    return uuid.uuid4().hex[:12]
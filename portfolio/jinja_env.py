@@ -0,0 +1,109 @@
+"""
+Jinja2 environment for the optional Jinja2 template engine
+
+Enabled with TEMPLATE_ENGINE=jinja2 (see settings.TEMPLATES). The ported
+page templates live in portfolio/jinja2/ and use the same helpers as the
+Django templates: url() and static(), main_menu(), breadcrumbs() and
+image_attrs(), the split/trim/first filters, Django's date and truncatewords filters, a
+regroup filter that keeps the queryset's order like {% regroup %}, and a
+{% cachefragment %} tag backed by portfolio.fragments.
+"""
+from itertools import groupby
+
+from django.template import defaultfilters
+from django.templatetags.static import static
+from django.urls import reverse
+from jinja2 import Environment, nodes, pass_context
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+from portfolio import fragments
+from portfolio.templatetags import portfolio_tags
+
+
+class Group:
+    """One group of regroup(), with the attribute names {% regroup %} uses"""
+
+    def __init__(self, grouper, items):
+        self.grouper = grouper
+        self.list = items
+
+
+def regroup(items, attribute):
+    """Group consecutive items by an attribute, without sorting first"""
+    return [
+        Group(grouper, list(members))
+        for grouper, members in groupby(items, key=lambda item: getattr(item, attribute))
+    ]
+
+
+def truncatewords(value, length):
+    """Django's truncatewords; HTML input (e.g. from richtext) stays marked safe"""
+    truncated = defaultfilters.truncatewords(value, length)
+    return Markup(truncated) if hasattr(value, '__html__') else truncated
+
+
+@pass_context
+def main_menu(context):
+    return portfolio_tags.main_menu(context)
+
+
+@pass_context
+def breadcrumbs(context, page=None):
+    return portfolio_tags.breadcrumbs(context, page)
+
+
+def url(viewname, *args, **kwargs):
+    """reverse() with positional or keyword arguments, like {% url %}"""
+    return reverse(viewname, args=args or None, kwargs=kwargs or None)
+
+
+class FragmentCacheExtension(Extension):
+    """
+    Jinja2 counterpart of the {% cachefragment %} template tag::
+
+        {% cachefragment "pricing" page %}...{% endcachefragment %}
+
+    Fragments are cached apart from the Django engine's, since the two
+    engines do not render byte-identical markup.
+    """
+
+    tags = {'cachefragment'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        name = parser.parse_expression()
+        dependencies = []
+        while parser.stream.current.type != 'block_end':
+            parser.stream.skip_if('comma')
+            dependencies.append(parser.parse_expression())
+        body = parser.parse_statements(('name:endcachefragment',), drop_needle=True)
+        args = [nodes.ContextReference(), name, nodes.List(dependencies)]
+        return nodes.CallBlock(self.call_method('_render', args), [], [], body).set_lineno(lineno)
+
+    def _render(self, context, name, dependencies, caller):
+        request = context.get('request')
+        if getattr(request, 'is_preview', False):
+            return caller()
+        return fragments.get_or_render('jinja2:%s' % name, dependencies, caller)
+
+
+def environment(**options):
+    env = Environment(**options)
+    env.globals.update({
+        'static': static,
+        'url': url,
+        'main_menu': main_menu,
+        'breadcrumbs': breadcrumbs,
+        'image_attrs': portfolio_tags.image_attrs,
+    })
+    env.filters.update({
+        'split': portfolio_tags.split,
+        'trim': portfolio_tags.trim,
+        'first': portfolio_tags.first,
+        'date': defaultfilters.date,
+        'truncatewords': truncatewords,
+        'regroup': regroup,
+    })
+    env.add_extension(FragmentCacheExtension)
+    return env
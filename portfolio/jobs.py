@@ -0,0 +1,157 @@
+"""
+Chunked background execution of admin bulk actions
+
+An admin action over a large selection is recorded as an AdminJob holding
+the selection as JSON: the changelist's field lookups and search term (or
+the checked primary keys), bounded by the lowest and highest primary key
+selected so rows added later are left alone. The job runs in a daemon
+thread once the request commits. The thread walks the selection in
+primary-key order: each chunk re-applies the selection to a pk range and
+runs the registered action on it in its own short transaction, together
+with the job's progress counters, so no lock is held for longer than one
+chunk and the Unfold job list can show progress as it goes. A job that has
+not moved for STALE_AFTER was interrupted by a restart; it keeps its cursor
+and is picked up again by ``manage.py run_admin_jobs``.
+"""
+import datetime
+import logging
+import threading
+
+from django.apps import apps
+from django.contrib import admin
+from django.contrib.admin.filters import FieldListFilter
+from django.contrib.admin.utils import build_q_object_from_lookup_parameters
+from django.db import connections, transaction
+from django.db.models import F, Max, Min
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1000
+# Selections up to this size are still updated inline by the admin actions
+INLINE_LIMIT = 1000
+# A pending or running job without progress for this long is no longer being run
+STALE_AFTER = datetime.timedelta(minutes=5)
+
+ACTIONS = {}
+
+
+def register(name):
+    """Register ``function(queryset, **params)`` as a job action called ``name``"""
+    def decorator(function):
+        ACTIONS[name] = function
+        return function
+    return decorator
+
+
+def admin_selection(model_admin, request, queryset):
+    """The selection of an admin action as JSON: the checked rows, or the changelist's filters and search"""
+    if request.POST.get("select_across") != "1":
+        return {"lookups": {"pk__in": [list(queryset.values_list("pk", flat=True))]}}
+    changelist = model_admin.get_changelist_instance(request)
+    filter_specs, _, lookups, _, _ = changelist.get_filters(request)
+    for spec in filter_specs:
+        if isinstance(spec, FieldListFilter):
+            lookups.update(spec.used_parameters)
+    return {"lookups": lookups, "search": changelist.query}
+
+
+def filtered(model, selection):
+    """The queryset a selection stands for"""
+    queryset = model._default_manager.filter(build_q_object_from_lookup_parameters(selection.get("lookups", {})))
+    if selection.get("search"):
+        queryset, may_have_duplicates = admin.site.get_model_admin(model).get_search_results(
+            None, queryset, selection["search"],
+        )
+        if may_have_duplicates:
+            queryset = queryset.distinct()
+    return queryset
+
+
+def submit(model, selection, action, description, user=None, **params):
+    """Record a job for ``action`` over a selection of ``model`` and start it once the transaction commits"""
+    from portfolio.models import AdminJob
+
+    if action not in ACTIONS:
+        raise KeyError(f"Unknown job action {action!r}")
+    queryset = filtered(model, selection)
+    bounds = queryset.aggregate(low=Min("pk"), high=Max("pk"))
+    selection = {**selection, "lookups": {
+        **selection.get("lookups", {}), "pk__gte": [bounds["low"]], "pk__lte": [bounds["high"]],
+    }}
+    job = AdminJob.objects.create(
+        action=action,
+        description=description,
+        model=model._meta.label_lower,
+        selection=selection,
+        params=params,
+        total=queryset.count(),
+        created_by=user,
+    )
+    transaction.on_commit(lambda: start(job.pk))
+    return job
+
+
+def start(job_id):
+    threading.Thread(target=run, args=(job_id,), kwargs={"background": True}, daemon=True).start()
+
+
+def selection(job):
+    """The queryset a job was submitted with"""
+    return filtered(apps.get_model(job.model), job.selection)
+
+
+def stalled(queryset, stale_after=STALE_AFTER):
+    """The pending or running jobs in ``queryset`` that have not moved for ``stale_after``"""
+    from portfolio.models import AdminJob
+
+    return queryset.filter(
+        status__in=[AdminJob.PENDING, AdminJob.RUNNING], updated_at__lt=timezone.now() - stale_after,
+    )
+
+
+def active(queryset):
+    """The pending or running jobs in ``queryset`` that are still moving"""
+    from portfolio.models import AdminJob
+
+    return queryset.filter(
+        status__in=[AdminJob.PENDING, AdminJob.RUNNING], updated_at__gte=timezone.now() - STALE_AFTER,
+    )
+
+
+def run(job_id, chunk_size=CHUNK_SIZE, resume=False, background=False):
+    """Run a pending job (or an interrupted one with ``resume``) to completion"""
+    from portfolio.models import AdminJob
+
+    claimable = [AdminJob.PENDING, AdminJob.RUNNING] if resume else [AdminJob.PENDING]
+    try:
+        if not AdminJob.objects.filter(pk=job_id, status__in=claimable).update(
+            status=AdminJob.RUNNING, updated_at=timezone.now(),
+        ):
+            return
+        job = AdminJob.objects.get(pk=job_id)
+        queryset = selection(job).order_by("pk")
+        action = ACTIONS[job.action]
+        cursor = job.cursor
+        while True:
+            pks = list(queryset.filter(pk__gt=cursor).values_list("pk", flat=True)[:chunk_size])
+            if not pks:
+                break
+            with transaction.atomic():
+                action(queryset.filter(pk__gte=pks[0], pk__lte=pks[-1]), **job.params)
+                AdminJob.objects.filter(pk=job_id).update(
+                    done=F("done") + len(pks), cursor=pks[-1], updated_at=timezone.now(),
+                )
+            cursor = pks[-1]
+        AdminJob.objects.filter(pk=job_id).update(status=AdminJob.DONE, finished_at=timezone.now())
+    except Exception as error:
+        logger.exception("Background job %s failed", job_id)
+        AdminJob.objects.filter(pk=job_id).update(
+            status=AdminJob.FAILED, error=repr(error)[:1000], finished_at=timezone.now(),
+        )
+        if not background:
+            raise
+    finally:
+        if background:
+            connections.close_all()
@@ -0,0 +1,30 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from portfolio import retention
+
+
+class Command(BaseCommand):
+    help = 'Move responded contact submissions past the retention period into compressed archive files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=None,
+            help=f'Archive submissions older than this many days (default: CONTACT_RETENTION_DAYS, {settings.CONTACT_RETENTION_DAYS})',
+        )
+        parser.add_argument('--batch-size', type=int, default=retention.BATCH_SIZE, help='Submissions per batch')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many submissions would be archived')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            count = retention.expired(options['days']).count()
+            self.stdout.write(f'{count:,} submission(s) would be archived')
+            return
+        start = time.perf_counter()
+        archived = retention.archive(options['days'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {archived:,} submission(s) to {retention.archive_dir()} '
+            f'in {(time.perf_counter() - start) * 1000:.0f} ms'
+        ))
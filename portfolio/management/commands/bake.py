@@ -0,0 +1,68 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from wagtail.models import Site
+
+from portfolio.bake import bake
+
+
+class Command(BaseCommand):
+    help = 'Render every live page to static HTML (plus .gz/.br variants) for serving from disk'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            default=str(settings.BASE_DIR / 'baked'),
+            help='Directory to write the baked site to',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count(),
+            help='Number of rendering processes (0 renders in this process)',
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Re-render every page instead of only those changed since the last bake',
+        )
+        parser.add_argument(
+            '--site',
+            help='Hostname of the site to bake (defaults to the default site)',
+        )
+        parser.add_argument(
+            '--include-private',
+            action='store_true',
+            help='Also bake pages that are never shared-cached (forms with CSRF tokens)',
+        )
+
+    def handle(self, *args, **options):
+        if options['site']:
+            site = Site.objects.filter(hostname=options['site']).first()
+        else:
+            site = Site.objects.filter(is_default_site=True).first() or Site.objects.first()
+        if site is None:
+            raise CommandError('No Wagtail site found. Please run migrations and seed first.')
+
+        self.stdout.write(f"Baking {site.hostname} into {options['output']}...")
+        summary = bake(
+            site,
+            options['output'],
+            workers=options['workers'],
+            full=options['full'],
+            include_private=options['include_private'],
+        )
+
+        for url, error in summary['failed']:
+            self.stdout.write(self.style.ERROR(f'Failed to render {url} ({error})'))
+
+        self.stdout.write(
+            f"Rendered {summary['rendered']} of {summary['total']} pages "
+            f"({summary['skipped']} unchanged, {summary['removed']} removed) "
+            f"in {summary['seconds']:.2f}s - {summary['pages_per_second']:.1f} pages/s, "
+            f"{summary['bytes'] / 1024:.0f} KiB written"
+        )
+        if summary['failed']:
+            raise CommandError(f"{len(summary['failed'])} page(s) failed to render")
+        self.stdout.write(self.style.SUCCESS('Bake complete'))
@@ -0,0 +1,64 @@
+import random
+import string
+import time
+
+from django.core.management.base import BaseCommand
+
+from portfolio.autocomplete import PrefixIndex
+
+
+WORDS = [
+    'django', 'wagtail', 'python', 'react', 'native', 'mobile', 'cloud', 'security',
+    'automation', 'agent', 'commerce', 'dashboard', 'analytics', 'platform', 'api',
+    'postgres', 'redis', 'kubernetes', 'design', 'marketing', 'portal', 'fintech',
+]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark autocomplete prefix index build time and query latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--entries', type=int, default=100_000, help='Number of synthetic entries')
+        parser.add_argument('--queries', type=int, default=10_000, help='Number of prefix queries to time')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        entries = options['entries']
+
+        rows = []
+        for i in range(entries):
+            label = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 4)))
+            label += ' ' + ''.join(rng.choice(string.ascii_lowercase) for _ in range(6))
+            rows.append((i, 'entry:%d' % i, label, '/bench/%d/' % i, 'page', ()))
+
+        index = PrefixIndex()
+        start = time.perf_counter()
+        index.load(rows)
+        build_seconds = time.perf_counter() - start
+        self.stdout.write(
+            f'Built index of {entries:,} entries ({len(index):,} keys) in {build_seconds * 1000:.1f} ms'
+        )
+
+        start = time.perf_counter()
+        for i in range(1000):
+            index.add('extra:%d' % i, 'incremental %s' % rng.choice(WORDS), '/extra/', 'page', group='extra')
+        add_us = (time.perf_counter() - start) / 1000 * 1e6
+        self.stdout.write(f'Incremental add: {add_us:.1f} µs per entry')
+
+        prefixes = [rng.choice(WORDS)[:rng.randint(1, 5)] for _ in range(options['queries'])]
+        timings = []
+        for prefix in prefixes:
+            start = time.perf_counter()
+            index.search(prefix)
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+
+        def pct(p):
+            return timings[min(len(timings) - 1, int(len(timings) * p))] * 1e6
+
+        self.stdout.write(
+            f'Query latency over {len(timings):,} queries: '
+            f'p50 {pct(0.50):.1f} µs, p99 {pct(0.99):.1f} µs, max {timings[-1] * 1e6:.1f} µs'
+        )
+        self.stdout.write(self.style.SUCCESS('Autocomplete benchmark complete'))
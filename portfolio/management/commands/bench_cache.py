@@ -0,0 +1,99 @@
+import pickle
+import random
+import tempfile
+import time
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from portfolio.cache import TieredCache, dumps
+
+
+def sample_values():
+    """Values shaped like what the site caches: version tokens, navigation, feeds and fragments"""
+    navigation = {
+        'home': {'id': 3, 'title': 'Home', 'url': '/', 'kind': 'homepage'},
+        'menu': [{'id': i, 'title': 'Section %d' % i, 'url': '/section-%d/' % i, 'kind': 'page'} for i in range(8)],
+        'pages': {'0001%04d' % i: {'id': i, 'title': 'Page %d' % i, 'url': '/p/%d/' % i} for i in range(60)},
+        'version': '06956a060b1c',
+    }
+    fragment = ''.join(
+        '<div class="service-card p-8 rounded-xl"><h3 class="text-2xl">Service %d</h3>'
+        '<p class="text-gray-300 mb-4">Comprehensive technology solutions</p></div>\n' % i
+        for i in range(120)
+    )
+    feed = {'body': (fragment * 4).encode(), 'content_type': 'application/rss+xml', 'etag': '"abc"'}
+    return {'token': '3f2a9c0d11be', 'navigation': navigation, 'fragment': fragment, 'feed': feed}
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the two-tier cache against LocMemCache and FileBasedCache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keys', type=int, default=500, help='Number of distinct keys')
+        parser.add_argument('--reads', type=int, default=20_000, help='Number of reads per backend')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        values = sample_values()
+        self.stdout.write('Serialized sizes (pickle vs tiered encoding):')
+        for name, value in values.items():
+            self.stdout.write(
+                f'  {name:<10} {len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL)):>8,} B'
+                f' -> {len(dumps(value)):>8,} B'
+            )
+
+        with tempfile.TemporaryDirectory() as file_dir, tempfile.TemporaryDirectory() as shared_dir:
+            file_cache = FileBasedCache(file_dir, {'OPTIONS': {'MAX_ENTRIES': 100_000}})
+            shared = FileBasedCache(shared_dir, {'OPTIONS': {'MAX_ENTRIES': 100_000}})
+            tiered = TieredCache('', {'OPTIONS': {'SHARED': shared, 'LOCAL_TIMEOUT': 60}})
+            backends = [
+                ('LocMemCache', LocMemCache('bench', {'OPTIONS': {'MAX_ENTRIES': 100_000}})),
+                ('FileBasedCache', file_cache),
+                ('TieredCache (LRU + file)', tiered),
+            ]
+            for label, backend in backends:
+                self.run(label, backend, values, options)
+
+            # A second worker: empty local tier, everything comes from the shared tier
+            tiered.local.clear()
+            tiered.reset_stats()
+            self.run('TieredCache, cold worker', tiered, values, options, populate=False)
+            stats = tiered.stats()
+            self.stdout.write(
+                f'  local hits {stats["local"]["hits"]:,} / misses {stats["local"]["misses"]:,}, '
+                f'shared hits {stats["shared"]["hits"]:,} / misses {stats["shared"]["misses"]:,}, '
+                f'local tier {stats["local"]["entries"]:,} entries, {stats["local"]["bytes"]:,} B'
+            )
+        self.stdout.write(self.style.SUCCESS('Cache benchmark complete'))
+
+    def run(self, label, backend, values, options, populate=True):
+        rng = random.Random(options['seed'])
+        names = list(values)
+        keys = ['bench:%s:%d' % (names[i % len(names)], i) for i in range(options['keys'])]
+
+        set_seconds = 0.0
+        if populate:
+            start = time.perf_counter()
+            for key in keys:
+                backend.set(key, values[key.split(':')[1]], 3600)
+            set_seconds = time.perf_counter() - start
+
+        # Skewed reads: a few hot keys (menus, version tokens) dominate
+        reads = [keys[min(len(keys) - 1, int(rng.paretovariate(1.2)) - 1)] for _ in range(options['reads'])]
+        timings = []
+        for key in reads:
+            start = time.perf_counter()
+            backend.get(key)
+            timings.append(time.perf_counter() - start)
+        total = sum(timings)
+        timings.sort()
+
+        def pct(p):
+            return timings[min(len(timings) - 1, int(len(timings) * p))] * 1e6
+
+        line = f'{label}: reads {len(reads) / total:,.0f}/s (p50 {pct(0.50):.1f} µs, p99 {pct(0.99):.1f} µs)'
+        if populate:
+            line += f', writes {len(keys) / set_seconds:,.0f}/s'
+        self.stdout.write(line)
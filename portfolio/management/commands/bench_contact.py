@@ -0,0 +1,148 @@
+import http.client
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+SERVERS = {
+    'gunicorn-sync': ['gunicorn', 'setting.wsgi:application', '--worker-class', 'sync'],
+    'gunicorn-uvicorn': ['gunicorn', 'setting.asgi:application', '--worker-class', 'uvicorn.workers.UvicornWorker'],
+    'uvicorn': ['uvicorn', 'setting.asgi:application'],
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def server_command(name, port, workers):
+    command = [sys.executable, '-m'] + SERVERS[name]
+    if name == 'uvicorn':
+        return command + ['--host', '127.0.0.1', '--port', str(port), '--workers', str(workers), '--log-level', 'warning']
+    return command + ['--bind', '127.0.0.1:%d' % port, '--workers', str(workers), '--log-level', 'warning']
+
+
+def wait_for_server(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', '/autocomplete/?q=a', headers={'Host': 'localhost'})
+            conn.getresponse().read()
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def post_loop(port, deadline, token, timings, statuses, lock):
+    """Submit the contact form over one keep-alive connection until the deadline"""
+    body = urlencode({
+        'csrfmiddlewaretoken': token,
+        'name': 'Benchmark',
+        'email': 'bench@example.com',
+        'service': 'web_development',
+        'message': 'Load test submission',
+        'next': '/contact/',
+    })
+    headers = {
+        'Host': 'localhost',
+        'Content-Type': 'application/x-www-form-urlencoded',
+        'Cookie': '%s=%s' % (settings.CSRF_COOKIE_NAME, token),
+    }
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    local_timings, local_statuses = [], {}
+    while time.time() < deadline:
+        start = time.perf_counter()
+        try:
+            conn.request('POST', '/contact-submit/', body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            status = 'error'
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        local_timings.append(time.perf_counter() - start)
+        local_statuses[status] = local_statuses.get(status, 0) + 1
+    conn.close()
+    with lock:
+        timings.extend(local_timings)
+        for status, count in local_statuses.items():
+            statuses[status] = statuses.get(status, 0) + count
+
+
+class Command(BaseCommand):
+    help = 'Benchmark contact form POST throughput under gunicorn sync, gunicorn+uvicorn and uvicorn workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--servers', nargs='+', choices=list(SERVERS), default=list(SERVERS))
+        parser.add_argument('--workers', type=int, default=2, help='Server worker processes')
+        parser.add_argument('--concurrency', type=int, default=16, help='Concurrent client connections')
+        parser.add_argument('--seconds', type=float, default=5.0, help='Duration of each run')
+
+    def handle(self, *args, **options):
+        database = settings.DATABASES['default']
+        if database['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('bench_contact copies the SQLite database so submissions do not pile up in it')
+
+        # A 32 character secret is accepted both as the cookie and as the form token
+        token = 'b' * 32
+        with tempfile.TemporaryDirectory() as directory:
+            database_copy = os.path.join(directory, 'bench.sqlite3')
+            shutil.copy(database['NAME'], database_copy)
+            env = dict(
+                os.environ,
+                DATABASE_URL='sqlite:///%s' % database_copy,
+                CACHE_DIR=os.path.join(directory, 'cache'),
+                SQLITE_TUNING='True',
+            )
+
+            for name in options['servers']:
+                port = free_port()
+                server = subprocess.Popen(
+                    server_command(name, port, options['workers']),
+                    cwd=settings.BASE_DIR,
+                    env=env,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                )
+                try:
+                    if not wait_for_server(port):
+                        self.stderr.write(f'{name}: server did not start')
+                        continue
+                    timings, statuses, lock = [], {}, threading.Lock()
+                    deadline = time.time() + options['seconds']
+                    clients = [
+                        threading.Thread(target=post_loop, args=(port, deadline, token, timings, statuses, lock))
+                        for _ in range(options['concurrency'])
+                    ]
+                    for client in clients:
+                        client.start()
+                    for client in clients:
+                        client.join()
+                finally:
+                    server.terminate()
+                    server.wait(timeout=30)
+
+                timings.sort()
+
+                def pct(p):
+                    return timings[min(len(timings) - 1, int(len(timings) * p))] * 1000 if timings else 0.0
+
+                self.stdout.write(
+                    f'{name:<17} {len(timings) / options["seconds"]:>8,.0f} req/s  '
+                    f'p50 {pct(0.50):.1f} ms  p99 {pct(0.99):.1f} ms  statuses {statuses}'
+                )
+        self.stdout.write(self.style.SUCCESS('Contact POST benchmark complete'))
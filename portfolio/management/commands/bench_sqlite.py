@@ -0,0 +1,135 @@
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+PROFILES = {
+    # What Django does without OPTIONS: rollback journal, deferred transactions
+    'default': {'pragmas': {}, 'begin': 'BEGIN', 'timeout': 5.0},
+    'tuned': {'pragmas': settings.SQLITE_PRAGMAS, 'begin': 'BEGIN IMMEDIATE', 'timeout': 5.0},
+}
+
+
+def connect(path, profile):
+    conn = sqlite3.connect(path, timeout=profile['timeout'], isolation_level=None)
+    for name, value in profile['pragmas'].items():
+        conn.execute('PRAGMA %s=%s' % (name, value))
+    return conn
+
+
+def create_database(path, pages):
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.executescript('''
+        CREATE TABLE page (id INTEGER PRIMARY KEY, title TEXT, url_path TEXT, body TEXT, live INTEGER);
+        CREATE TABLE submission (
+            id INTEGER PRIMARY KEY, name TEXT, email TEXT, message TEXT, created_at REAL
+        );
+        CREATE TABLE counter (name TEXT PRIMARY KEY, value INTEGER);
+        INSERT INTO counter VALUES ('submissions', 0);
+    ''')
+    body = 'Lorem ipsum dolor sit amet, consectetur adipiscing elit. ' * 40
+    conn.execute('BEGIN')
+    conn.executemany(
+        'INSERT INTO page (title, url_path, body, live) VALUES (?, ?, ?, 1)',
+        [('Page %d' % i, '/page-%d/' % i, body) for i in range(pages)],
+    )
+    conn.execute('COMMIT')
+    conn.close()
+
+
+def reader(path, profile, pages, start_at, deadline, results):
+    """Page views: a detail lookup plus a 20-row listing, one autocommit read each"""
+    conn = connect(path, profile)
+    rng = random.Random(os.getpid())
+    time.sleep(max(0, start_at - time.time()))
+    done = errors = 0
+    while time.time() < deadline:
+        start = rng.randint(1, max(1, pages - 20))
+        try:
+            conn.execute('SELECT title, body FROM page WHERE id = ?', (start,)).fetchall()
+            conn.execute(
+                'SELECT id, title, url_path FROM page WHERE live = 1 AND id >= ? ORDER BY id LIMIT 20', (start,)
+            ).fetchall()
+            done += 1
+        except sqlite3.OperationalError:
+            errors += 1
+    conn.close()
+    results.put(('read', done, errors))
+
+
+def writer(path, profile, start_at, deadline, results):
+    """Contact form submissions: a small transaction that reads, inserts and updates a counter"""
+    conn = connect(path, profile)
+    time.sleep(max(0, start_at - time.time()))
+    done = errors = 0
+    while time.time() < deadline:
+        try:
+            conn.execute(profile['begin'])
+            conn.execute("SELECT value FROM counter WHERE name = 'submissions'").fetchone()
+            conn.execute(
+                'INSERT INTO submission (name, email, message, created_at) VALUES (?, ?, ?, ?)',
+                ('Visitor', 'visitor@example.com', 'Hello ' * 50, time.time()),
+            )
+            conn.execute("UPDATE counter SET value = value + 1 WHERE name = 'submissions'")
+            conn.execute('COMMIT')
+            done += 1
+        except sqlite3.OperationalError:
+            errors += 1
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+        time.sleep(0.001)
+    conn.close()
+    results.put(('write', done, errors))
+
+
+class Command(BaseCommand):
+    help = 'Benchmark mixed read/write throughput of SQLite with default and tuned pragmas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4, help='Reader processes (page views)')
+        parser.add_argument('--writers', type=int, default=2, help='Writer processes (form submissions)')
+        parser.add_argument('--seconds', type=float, default=5.0, help='Duration of each run')
+        parser.add_argument('--pages', type=int, default=2000, help='Rows in the synthetic page table')
+
+    def handle(self, *args, **options):
+        context = multiprocessing.get_context('spawn')
+        for name, profile in PROFILES.items():
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'bench.sqlite3')
+                create_database(path, options['pages'])
+                if profile['pragmas'].get('journal_mode'):
+                    connect(path, profile).close()
+
+                results = context.Queue()
+                # Processes need a moment to spawn; everyone starts measuring together
+                start_at = time.time() + 2
+                deadline = start_at + options['seconds']
+                processes = [
+                    context.Process(target=reader, args=(path, profile, options['pages'], start_at, deadline, results))
+                    for _ in range(options['readers'])
+                ] + [
+                    context.Process(target=writer, args=(path, profile, start_at, deadline, results))
+                    for _ in range(options['writers'])
+                ]
+                for process in processes:
+                    process.start()
+                totals = {'read': [0, 0], 'write': [0, 0]}
+                for _ in processes:
+                    kind, done, errors = results.get()
+                    totals[kind][0] += done
+                    totals[kind][1] += errors
+                for process in processes:
+                    process.join()
+
+            seconds = options['seconds']
+            self.stdout.write(
+                f'{name:<8} reads {totals["read"][0] / seconds:>10,.0f}/s ({totals["read"][1]:,} errors), '
+                f'writes {totals["write"][0] / seconds:>8,.0f}/s ({totals["write"][1]:,} locked)'
+            )
+        self.stdout.write(self.style.SUCCESS('SQLite benchmark complete'))
@@ -0,0 +1,83 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+PROFILES = {
+    'full': 'setting.settings',
+    'public': 'setting.settings_public',
+}
+
+# Runs in a fresh interpreter: load the WSGI app, serve one page, and report
+# timings, imported modules and peak memory after startup and after the request.
+# The public profile still imports part of the admin stack on the first request,
+# when Wagtail loads the wagtail_hooks modules of the installed contrib apps.
+PROBE = '''
+import json, sys, time
+
+def peak_rss_kb():
+    # VmHWM starts over at exec, unlike ru_maxrss, which inherits the parent's peak
+    with open("/proc/self/status") as status:
+        return int(status.read().split("VmHWM:")[1].split()[0])
+
+start = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+from django.urls import get_resolver
+get_resolver().url_patterns
+loaded = time.perf_counter()
+startup_modules = len(sys.modules)
+startup_rss = peak_rss_kb()
+from django.test import Client
+status = Client(HTTP_HOST=sys.argv[2]).get(sys.argv[1]).status_code
+served = time.perf_counter()
+print(json.dumps({
+    "startup": loaded - start,
+    "first_request": served - loaded,
+    "status": status,
+    "startup_modules": startup_modules,
+    "startup_rss_kb": startup_rss,
+    "modules": len(sys.modules),
+    "rss_kb": peak_rss_kb(),
+}))
+'''
+
+
+class Command(BaseCommand):
+    help = 'Compare startup time, imported modules and memory of the full and public-only settings profiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=3, help='Fresh processes per profile')
+        parser.add_argument('--url', default='/', help='Page requested once after startup')
+        parser.add_argument('--host', default='localhost')
+
+    def handle(self, *args, **options):
+        for name, module in PROFILES.items():
+            samples = []
+            for _ in range(options['runs']):
+                env = dict(os.environ, DJANGO_SETTINGS_MODULE=module, WARM_UP='False')
+                output = subprocess.run(
+                    [sys.executable, '-c', PROBE, options['url'], options['host']],
+                    cwd=settings.BASE_DIR,
+                    env=env,
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                ).stdout
+                samples.append(json.loads(output.strip().splitlines()[-1]))
+
+            def median(key):
+                return statistics.median(sample[key] for sample in samples)
+
+            self.stdout.write(
+                f'{name:<7} ({module}): startup {median("startup") * 1000:>6.0f} ms, '
+                f'{median("startup_modules"):>5.0f} modules, max RSS {median("startup_rss_kb") / 1024:>6.1f} MB; '
+                f'after first request (HTTP {samples[0]["status"]}) {median("first_request") * 1000:>6.0f} ms, '
+                f'{median("modules"):>5.0f} modules, max RSS {median("rss_kb") / 1024:>6.1f} MB'
+            )
+        self.stdout.write(self.style.SUCCESS('Startup comparison complete'))
@@ -0,0 +1,84 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.template.utils import EngineHandler
+from django.test import RequestFactory, override_settings
+from wagtail.models import Page, Site
+
+
+def engine_configs():
+    """The Django engine as configured plus the Jinja2 engine, whatever TEMPLATE_ENGINE says"""
+    django_config = next(
+        config for config in settings.TEMPLATES
+        if config['BACKEND'] == 'django.template.backends.django.DjangoTemplates'
+    )
+    return {
+        'django': dict(django_config, NAME='django'),
+        'jinja2': dict(settings.JINJA2_TEMPLATES, NAME='jinja2'),
+    }
+
+
+def sample_pages():
+    """The first live page of each page type, with the site it belongs to"""
+    pages = {}
+    for site in Site.objects.select_related('root_page'):
+        for page in site.root_page.get_descendants(inclusive=True).live().public().specific():
+            pages.setdefault(type(page).__name__, (site, page))
+    return pages
+
+
+def page_request(site, page):
+    request = RequestFactory().get(page.get_url(current_site=site), HTTP_HOST=site.hostname)
+    request.user = AnonymousUser()
+    return request
+
+
+def render(engine, site, page):
+    request = page_request(site, page)
+    template = engine.get_template(page.get_template(request))
+    return template.render(page.get_context(request), request)
+
+
+class Command(BaseCommand):
+    help = 'Compare render time of each page type under the Django and Jinja2 template engines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--renders', type=int, default=50, help='Timed renders per page and engine')
+
+    def handle(self, *args, **options):
+        try:
+            import jinja2  # noqa: F401
+        except ImportError:
+            raise CommandError('bench_templates needs Jinja2 installed')
+
+        pages = sample_pages()
+        if not pages:
+            raise CommandError('No live pages to render')
+
+        configs = engine_configs()
+        # Fragment caching would hide the template cost after the first render
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}):
+            self.stdout.write(f'{"page type":<20} {"engine":<7} {"first render":>13} {"cached p50":>11} {"p95":>9}')
+            for kind, (site, page) in sorted(pages.items()):
+                for name in configs:
+                    # A fresh engine per page type, so the first render includes parsing
+                    engine = EngineHandler([configs[name]])[name]
+                    start = time.perf_counter()
+                    render(engine, site, page)
+                    first = time.perf_counter() - start
+
+                    timings = []
+                    for _ in range(options['renders']):
+                        start = time.perf_counter()
+                        render(engine, site, page)
+                        timings.append(time.perf_counter() - start)
+                    timings.sort()
+                    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+                    self.stdout.write(
+                        f'{kind:<20} {name:<7} {first * 1000:>10.1f} ms '
+                        f'{statistics.median(timings) * 1000:>8.2f} ms {p95 * 1000:>6.2f} ms'
+                    )
+        self.stdout.write(self.style.SUCCESS('Template benchmark complete'))
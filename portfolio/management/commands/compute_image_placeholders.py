@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from portfolio import placeholders
+
+
+class Command(BaseCommand):
+    help = 'Store dimensions, dominant colour and blurred placeholder of blog and project card images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Re-read images that were already measured')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        read, failed = placeholders.backfill(force=options['force'])
+        if failed:
+            self.stdout.write(self.style.WARNING(f'{failed} image(s) could not be read; see the log'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Measured {read - failed} image(s) in {(time.perf_counter() - start) * 1000:.0f} ms'
+        ))
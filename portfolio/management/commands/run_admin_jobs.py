@@ -0,0 +1,25 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+
+from portfolio import jobs
+from portfolio.models import AdminJob
+
+
+class Command(BaseCommand):
+    help = 'Run background admin jobs that were never started or were interrupted by a restart'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stale', type=int, default=int(jobs.STALE_AFTER.total_seconds()),
+            help='Seconds without progress after which a job counts as interrupted (default: 300)',
+        )
+
+    def handle(self, *args, **options):
+        stale_after = datetime.timedelta(seconds=options['stale'])
+        stalled = jobs.stalled(AdminJob.objects.all(), stale_after).order_by('pk')
+        for job in stalled:
+            self.stdout.write(f'Resuming "{job}" at {job.done:,}/{job.total:,}')
+            jobs.run(job.pk, resume=True)
+            job.refresh_from_db()
+            self.stdout.write(f'  {job.get_status_display()}')
@@ -0,0 +1,34 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from portfolio.notifications import DigestSender
+
+
+class Command(BaseCommand):
+    help = 'Background worker sending staff a digest of new contact submissions every interval'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=int, default=settings.CONTACT_DIGEST_INTERVAL,
+            help='Seconds between digests (default: CONTACT_DIGEST_INTERVAL)',
+        )
+        parser.add_argument('--once', action='store_true', help='Send one digest and exit')
+
+    def handle(self, *args, **options):
+        sender = DigestSender()
+        try:
+            while True:
+                close_old_connections()
+                sent = sender.send_digest()
+                if sent:
+                    self.stdout.write(f'Sent a digest of {sent} submission(s)')
+                if options['once']:
+                    return
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            sender.close()
@@ -0,0 +1,33 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from portfolio.renditions import warm
+
+
+class Command(BaseCommand):
+    help = 'Generate every image rendition the page templates use that does not exist yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count(),
+            help='Number of generating processes (0 generates in this process)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('Warming image renditions...')
+        summary = warm(workers=options['workers'])
+
+        for image_id, error in summary['failed']:
+            self.stdout.write(self.style.ERROR(f'Failed to generate renditions of image {image_id}: {error}'))
+
+        self.stdout.write(
+            f"Generated {summary['generated']} renditions of {summary['images']} images "
+            f"({summary['skipped']} already existed) "
+            f"in {summary['seconds']:.2f}s - {summary['renditions_per_second']:.1f} renditions/s"
+        )
+        if summary['failed']:
+            raise CommandError(f"{len(summary['failed'])} image(s) failed to render")
+        self.stdout.write(self.style.SUCCESS('Renditions warm'))
@@ -0,0 +1,43 @@
+import multiprocessing
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from portfolio import warmup
+
+
+class Command(BaseCommand):
+    help = 'Prime templates, URL resolvers and page caches; optionally report cold vs warm first-request latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--no-render', action='store_true', help='Skip requesting every live page')
+        parser.add_argument(
+            '--report', action='store_true',
+            help='Compare first-request latency of fresh processes with and without warm-up',
+        )
+        parser.add_argument('--probes', type=int, default=5, help='Pages to time with --report')
+
+    def handle(self, *args, **options):
+        report, pages = warmup.warm_up(render=not options['no_render'], log=self.stdout.write)
+        for url, status in warmup.failures(pages):
+            self.stderr.write(f'{url} answered {status}')
+        self.stdout.write(self.style.SUCCESS(f'Warm-up complete in {sum(report.values()) * 1000:.0f} ms'))
+
+        if options['report']:
+            self.report(warmup.live_page_urls()[:options['probes']])
+
+    def report(self, urls):
+        context = multiprocessing.get_context('spawn')
+        results = {}
+        for label, warm in (('cold', False), ('warm', True)):
+            with tempfile.TemporaryDirectory() as cache_dir:
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                    results[label] = pool.submit(warmup.first_request_latency, urls, warm, cache_dir).result()
+
+        self.stdout.write('First request latency in a fresh process:')
+        for (url, _, cold), (_, _, warm) in zip(results['cold'], results['warm']):
+            self.stdout.write(f'  {url:<40} cold {cold * 1000:>8.1f} ms   warm {warm * 1000:>8.1f} ms')
+        cold_total = sum(seconds for _, _, seconds in results['cold'])
+        warm_total = sum(seconds for _, _, seconds in results['warm'])
+        self.stdout.write(f'  {"total":<40} cold {cold_total * 1000:>8.1f} ms   warm {warm_total * 1000:>8.1f} ms')
@@ -0,0 +1,28 @@
+from django.db import migrations
+
+
+SECTION_PAGE_MODELS = [
+    'AboutPage',
+    'ServicesPage',
+    'PortfolioIndexPage',
+    'TeamPage',
+    'BlogIndexPage',
+    'ContactPage',
+]
+
+
+def show_section_pages_in_menus(apps, schema_editor):
+    """The navigation is now built from show_in_menus, so flag the existing section pages"""
+    for model_name in SECTION_PAGE_MODELS:
+        apps.get_model('portfolio', model_name).objects.update(show_in_menus=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0004_portfolioindexpage'),
+    ]
+
+    operations = [
+        migrations.RunPython(show_section_pages_in_menus, migrations.RunPython.noop),
+    ]
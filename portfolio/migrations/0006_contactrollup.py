@@ -0,0 +1,47 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:11
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+
+
+def fill_rollups(apps, schema_editor):
+    """Roll up the submissions received before the table existed, as rollups.rebuild does"""
+    ContactSubmission = apps.get_model('portfolio', 'ContactSubmission')
+    ContactRollup = apps.get_model('portfolio', 'ContactRollup')
+    rows = (
+        ContactSubmission.objects.order_by()
+        .annotate(day=TruncDate('created_at'))
+        .values('day', 'service', 'budget', 'timeline')
+        .annotate(submissions=Count('pk'), responded=Count('pk', filter=Q(is_responded=True)))
+    )
+    ContactRollup.objects.bulk_create((ContactRollup(**row) for row in rows.iterator()), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0005_show_section_pages_in_menus'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContactRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('service', models.CharField(max_length=100)),
+                ('budget', models.CharField(blank=True, max_length=50)),
+                ('timeline', models.CharField(blank=True, max_length=50)),
+                ('submissions', models.PositiveIntegerField(default=0)),
+                ('responded', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Contact Rollup',
+                'verbose_name_plural': 'Contact Rollups',
+                'ordering': ['day'],
+                'constraints': [models.UniqueConstraint(fields=('day', 'service', 'budget', 'timeline'), name='unique_contact_rollup')],
+            },
+        ),
+        migrations.RunPython(fill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0006_contactrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedContactSubmission',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('submission_id', models.PositiveBigIntegerField(unique=True)),
+                ('name', models.CharField(max_length=255)),
+                ('email', models.EmailField(max_length=254)),
+                ('company', models.CharField(blank=True, max_length=255)),
+                ('service', models.CharField(max_length=100)),
+                ('budget', models.CharField(blank=True, max_length=50)),
+                ('timeline', models.CharField(blank=True, max_length=50)),
+                ('created_at', models.DateTimeField(db_index=True)),
+                ('is_responded', models.BooleanField(default=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('archive_file', models.CharField(max_length=255)),
+            ],
+            options={
+                'verbose_name': 'Archived Contact Submission',
+                'verbose_name_plural': 'Archived Contact Submissions',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0007_archivedcontactsubmission'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingContactNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('submission_id', models.PositiveBigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+            ],
+            options={
+                'verbose_name': 'Pending Contact Notification',
+                'verbose_name_plural': 'Pending Contact Notifications',
+                'ordering': ['pk'],
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:32
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+
+
+def count_archived(apps, schema_editor):
+    """Recount every rollup row from live and archived submissions, as rollups.rebuild does"""
+    ContactRollup = apps.get_model('portfolio', 'ContactRollup')
+    counts = {}
+    for model_name, is_archive in (('ContactSubmission', False), ('ArchivedContactSubmission', True)):
+        rows = (
+            apps.get_model('portfolio', model_name).objects.order_by()
+            .annotate(day=TruncDate('created_at'))
+            .values('day', 'service', 'budget', 'timeline')
+            .annotate(submissions=Count('pk'), responded=Count('pk', filter=Q(is_responded=True)))
+        )
+        for row in rows.iterator():
+            key = (row['day'], row['service'], row['budget'], row['timeline'])
+            row_counts = counts.setdefault(key, {'submissions': 0, 'responded': 0, 'archived': 0})
+            row_counts['submissions'] += row['submissions']
+            row_counts['responded'] += row['responded']
+            if is_archive:
+                row_counts['archived'] += row['submissions']
+    ContactRollup.objects.all().delete()
+    ContactRollup.objects.bulk_create(
+        (
+            ContactRollup(day=day, service=service, budget=budget, timeline=timeline, **row_counts)
+            for (day, service, budget, timeline), row_counts in counts.items()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0010_image_placeholders'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contactrollup',
+            name='archived',
+            field=models.PositiveIntegerField(default=0, help_text='Submissions counted here that were moved to the archive'),
+        ),
+        migrations.RunPython(count_archived, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:38
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0011_contactrollup_archived'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='adminjob',
+            name='query',
+        ),
+        migrations.AddField(
+            model_name='adminjob',
+            name='selection',
+            field=models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder),
+        ),
+    ]
@@ -1,3 +1,5 @@
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from wagtail.models import Page, Orderable
 from wagtail.fields import RichTextField, StreamField
@@ -7,10 +9,14 @@ from wagtail.images.blocks import ImageChooserBlock
 from modelcluster.fields import ParentalKey
 from modelcluster.models import ClusterableModel
 
+from portfolio.conditional import ConditionalServeMixin
 
-class HomePage(Page):
+
+class HomePage(ConditionalServeMixin, Page):
     """Main homepage with hero section"""
     
+    renders_csrf_token = True
+    
     # Hero Section
     hero_title = models.CharField(max_length=255, default="Fintaa")
     hero_subtitle = models.CharField(max_length=255, default="SOFTWARE HOUSE")
@@ -118,7 +124,7 @@ class AboutFeature(Orderable):
     ]
 
 
-class ServicePage(Page):
+class ServicePage(ConditionalServeMixin, Page):
     """Individual service detail pages"""
     
     hero_title = models.CharField(max_length=255)
@@ -226,7 +232,7 @@ class PricingFeature(Orderable):
     ]
 
 
-class ProjectPage(Page):
+class ProjectPage(ConditionalServeMixin, Page):
     """Individual project showcase pages"""
     
     # Project Details
@@ -249,6 +255,12 @@ class ProjectPage(Page):
     
     # Featured Image
     featured_image_url = models.URLField(blank=True, help_text="URL for featured project image")
+    # Card image metadata, filled in on save (see portfolio.placeholders)
+    featured_image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    featured_image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    featured_image_color = models.CharField(max_length=7, blank=True, editable=False)
+    featured_image_placeholder = models.TextField(blank=True, editable=False)
+    featured_image_source = models.CharField(max_length=500, blank=True, editable=False)
     
     content_panels = Page.content_panels + [
         MultiFieldPanel([
@@ -316,7 +328,7 @@ class ProjectImage(Orderable):
     ]
 
 
-class BlogPage(Page):
+class BlogPage(ConditionalServeMixin, Page):
     """Blog/News pages"""
     
     # Blog Content
@@ -425,15 +437,96 @@ class ContactSubmission(ClusterableModel):
     def __str__(self):
         return f"{self.name} - {self.get_service_display()}"
     
+    @staticmethod
+    def fields_from_post(data):
+        """Model field values from a submitted contact form (sync and async handlers share this)"""
+        return {
+            'name': data.get('name', ''),
+            'email': data.get('email', ''),
+            'phone': data.get('phone', ''),
+            'company': data.get('company', ''),
+            'service': data.get('service', 'general'),
+            'budget': data.get('budget', 'not_specified'),
+            'timeline': data.get('timeline', 'flexible'),
+            'message': data.get('message', ''),
+        }
+    
     class Meta:
         ordering = ['-created_at']
         verbose_name = "Contact Submission"
         verbose_name_plural = "Contact Submissions"
 
 
-class AboutPage(Page):
+class PendingContactNotification(models.Model):
+    """A new submission waiting for the next staff digest (see portfolio.notifications)"""
+
+    # Not a foreign key: the queue must not block deleting or archiving submissions
+    submission_id = models.PositiveBigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['pk']
+        verbose_name = "Pending Contact Notification"
+        verbose_name_plural = "Pending Contact Notifications"
+
+    def __str__(self):
+        return f"Submission {self.submission_id}"
+
+
+class ArchivedContactSubmission(models.Model):
+    """Index of a contact submission moved to an archive file (see portfolio.retention)"""
+
+    submission_id = models.PositiveBigIntegerField(unique=True)
+    name = models.CharField(max_length=255)
+    email = models.EmailField()
+    company = models.CharField(max_length=255, blank=True)
+    service = models.CharField(max_length=100)
+    budget = models.CharField(max_length=50, blank=True)
+    timeline = models.CharField(max_length=50, blank=True)
+    created_at = models.DateTimeField(db_index=True)
+    is_responded = models.BooleanField(default=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+    archive_file = models.CharField(max_length=255)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Archived Contact Submission"
+        verbose_name_plural = "Archived Contact Submissions"
+
+    def __str__(self):
+        return f"{self.name} - {self.created_at:%Y-%m-%d}"
+
+
+class ContactRollup(models.Model):
+    """Daily contact submission counts per service, budget and timeline (see portfolio.rollups)"""
+
+    day = models.DateField()
+    service = models.CharField(max_length=100)
+    budget = models.CharField(max_length=50, blank=True)
+    timeline = models.CharField(max_length=50, blank=True)
+    submissions = models.PositiveIntegerField(default=0)
+    responded = models.PositiveIntegerField(default=0)
+    archived = models.PositiveIntegerField(default=0, help_text="Submissions counted here that were moved to the archive")
+
+    class Meta:
+        ordering = ['day']
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'service', 'budget', 'timeline'], name='unique_contact_rollup'),
+        ]
+        verbose_name = "Contact Rollup"
+        verbose_name_plural = "Contact Rollups"
+
+    def __str__(self):
+        return f"{self.day} {self.service}/{self.budget}/{self.timeline}: {self.submissions}"
+
+
+class AboutPage(ConditionalServeMixin, Page):
     """About Us page"""
     
+    show_in_menus_default = True
+    
     hero_title = models.CharField(max_length=255, default="About Fintaa")
     hero_subtitle = models.CharField(max_length=255, blank=True)
     hero_description = RichTextField()
@@ -523,9 +616,13 @@ class TeamMember(Orderable):
     ]
 
 
-class ContactPage(Page):
+class ContactPage(ConditionalServeMixin, Page):
     """Contact Us page"""
     
+    renders_csrf_token = True
+    
+    show_in_menus_default = True
+    
     hero_title = models.CharField(max_length=255, default="Get In Touch")
     hero_description = RichTextField()
     
@@ -566,17 +663,7 @@ class ContactPage(Page):
             # Handle form submission
             try:
                 # Create contact submission
-                submission = ContactSubmission.objects.create(
-                    name=request.POST.get('name', ''),
-                    email=request.POST.get('email', ''),
-                    phone=request.POST.get('phone', ''),
-                    company=request.POST.get('company', ''),
-                    service=request.POST.get('service', 'general'),
-                    budget=request.POST.get('budget', 'not_specified'),
-                    timeline=request.POST.get('timeline', 'flexible'),
-                    message=request.POST.get('message', ''),
-                    status='new'
-                )
+                submission = ContactSubmission.objects.create(**ContactSubmission.fields_from_post(request.POST))
                 messages.success(request, 'Thank you for your message! We\'ll get back to you soon.')
                 return redirect(request.path)
             except Exception as e:
@@ -604,9 +691,11 @@ class ContactMethod(Orderable):
 
 # New Page Models for Multi-page Navigation
 
-class ServicesPage(Page):
+class ServicesPage(ConditionalServeMixin, Page):
     """Services listing page"""
     
+    show_in_menus_default = True
+    
     hero_title = models.CharField(max_length=255, default="Our Services")
     hero_description = RichTextField(
         default="<p>We offer comprehensive software development services to transform your ideas into reality.</p>"
@@ -640,9 +729,11 @@ class ServicePageItem(Orderable):
     ]
 
 
-class TeamPage(Page):
+class TeamPage(ConditionalServeMixin, Page):
     """Team page showing all team members"""
     
+    show_in_menus_default = True
+    
     hero_title = models.CharField(max_length=255, default="Our Team")
     hero_description = RichTextField(
         default="<p>Meet the talented individuals who make our software house exceptional.</p>"
@@ -684,9 +775,11 @@ class TeamPageMember(Orderable):
     ]
 
 
-class BlogIndexPage(Page):
+class BlogIndexPage(ConditionalServeMixin, Page):
     """Blog listing page"""
     
+    show_in_menus_default = True
+    
     hero_title = models.CharField(max_length=255, default="Our Blog")
     hero_description = RichTextField(
         default="<p>Stay updated with the latest in technology, development insights, and industry trends.</p>"
@@ -704,16 +797,25 @@ class BlogIndexPage(Page):
         context['blog_posts'] = blog_posts
         return context
     
+    def get_conditional_dependencies(self):
+        return [BlogPost.objects.live().public()]
+    
     subpage_types = ['portfolio.BlogPost']
 
 
-class BlogPost(Page):
+class BlogPost(ConditionalServeMixin, Page):
     """Individual blog post"""
     
     excerpt = models.TextField(max_length=500, help_text="Brief description for listing pages")
     author = models.CharField(max_length=255, default="Fintaa Team")
     publish_date = models.DateField("Post date")
     featured_image = models.ImageField(upload_to='blog/', blank=True, null=True)
+    # Card image metadata, filled in on save (see portfolio.placeholders)
+    featured_image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    featured_image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    featured_image_color = models.CharField(max_length=7, blank=True, editable=False)
+    featured_image_placeholder = models.TextField(blank=True, editable=False)
+    featured_image_source = models.CharField(max_length=500, blank=True, editable=False)
     
     # Content
     content = StreamField([
@@ -740,9 +842,11 @@ class BlogPost(Page):
     parent_page_types = ['portfolio.BlogIndexPage']
 
 
-class PortfolioIndexPage(Page):
+class PortfolioIndexPage(ConditionalServeMixin, Page):
     """Portfolio listing page"""
     
+    show_in_menus_default = True
+    
     hero_title = models.CharField(max_length=255, default="Our Portfolio")
     hero_description = RichTextField(
         default="<p>Explore our successful projects and see how we've helped businesses transform their digital presence.</p>"
@@ -760,5 +864,60 @@ class PortfolioIndexPage(Page):
         context['projects'] = projects
         return context
     
+    def get_conditional_dependencies(self):
+        return [ProjectPage.objects.live().public()]
+    
     subpage_types = ['portfolio.ProjectPage']
     max_count = 1
+
+
+class AdminJob(models.Model):
+    """An admin bulk action running in chunks in the background (see portfolio.jobs)"""
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    action = models.CharField(max_length=100)
+    description = models.CharField(max_length=255)
+    model = models.CharField(max_length=100)
+    # Lookups and search term of the selection (see jobs.filtered); chunks re-apply it to primary-key ranges
+    selection = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(
+        max_length=20,
+        choices=[
+            (PENDING, 'Pending'),
+            (RUNNING, 'Running'),
+            (DONE, 'Done'),
+            (FAILED, 'Failed'),
+        ],
+        default=PENDING
+    )
+    total = models.PositiveIntegerField(default=0)
+    done = models.PositiveIntegerField(default=0)
+    cursor = models.PositiveBigIntegerField(default=0, help_text="Last primary key processed")
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL, related_name='+'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Background Job"
+        verbose_name_plural = "Background Jobs"
+
+    def __str__(self):
+        return self.description
+
+    @property
+    def progress(self):
+        """Percentage of the selection processed"""
+        if self.status == self.DONE or not self.total:
+            return 100 if self.status == self.DONE else 0
+        return min(100, round(100 * self.done / self.total))
+
@@ -0,0 +1,99 @@
+"""
+Cached navigation menu and breadcrumb data built from the Wagtail page tree
+
+One values() query per site loads the menu pages (live children of the
+site root flagged show_in_menus) together with every live page that has
+children, which is enough to build the breadcrumb trail of any page from
+its tree path without further queries. The result is cached per site and
+dropped whenever a page is published, unpublished, moved or deleted.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import Q
+from wagtail.models import Page, Site
+
+from portfolio import singleflight
+
+
+CACHE_KEY = "navigation:%s"
+
+
+def site_id_for_page(page):
+    """The id of the site serving ``page``, from Wagtail's cached site root paths"""
+    url_parts = page.get_url_parts()
+    return url_parts[0] if url_parts else None
+
+
+def build_navigation(site_id):
+    """Menu items and a path -> page map for breadcrumbs, from a single query"""
+    site = Site.objects.select_related("root_page").get(pk=site_id)
+    root = site.root_page
+    root_path = root.url_path
+    rows = (
+        Page.objects.live()
+        .public()
+        .descendant_of(root, inclusive=True)
+        .filter(Q(depth=root.depth + 1, show_in_menus=True) | Q(numchild__gt=0) | Q(pk=root.pk))
+        .order_by("path")
+        .values_list("pk", "path", "depth", "title", "url_path", "show_in_menus", "content_type__model")
+    )
+
+    pages = {}
+    menu = []
+    for pk, path, depth, title, url_path, show_in_menus, model in rows:
+        item = {
+            "id": pk,
+            "title": title,
+            "url": "/" + url_path[len(root_path):],
+            "kind": model,
+        }
+        pages[path] = item
+        if depth == root.depth + 1 and show_in_menus:
+            menu.append(item)
+
+    navigation = {
+        "root_path": root.path,
+        "home": pages.get(root.path),
+        "menu": menu,
+        "pages": pages,
+    }
+    navigation["version"] = hashlib.md5(
+        repr([(item["id"], item["title"], item["url"]) for item in pages.values()]).encode()
+    ).hexdigest()[:12]
+    return navigation
+
+
+def get_navigation(site_id):
+    """Navigation for a site, from the cache when possible; concurrent misses build it once"""
+    return singleflight.get_or_compute(CACHE_KEY % site_id, lambda: build_navigation(site_id), timeout=None)
+
+
+def get_breadcrumbs(navigation, page):
+    """Ancestors of ``page`` from the site root down to its parent, using only cached data"""
+    steplen = page.steplen
+    root_depth = len(navigation["root_path"]) // steplen
+    crumbs = []
+    for depth in range(root_depth, page.depth):
+        ancestor = navigation["pages"].get(page.path[:depth * steplen])
+        if ancestor is not None:
+            crumbs.append(ancestor)
+    return crumbs
+
+
+def navigation_version(page):
+    """Short hash of the navigation a page renders, for use in its ETag"""
+    site_id = site_id_for_page(page)
+    if site_id is None:
+        return ""
+    return get_navigation(site_id)["version"]
+
+
+def affects_navigation(page):
+    """Whether a change to ``page`` can alter menus or breadcrumbs"""
+    return page.depth <= 3 or page.numchild > 0
+
+
+def invalidate():
+    """Drop the cached navigation of every site"""
+    cache.delete_many([CACHE_KEY % site_id for site_id in Site.objects.values_list("pk", flat=True)])
@@ -0,0 +1,138 @@
+"""
+Batched staff notifications for new contact submissions
+
+Saving a new submission only queues a PendingContactNotification row, so
+the contact POST never waits on a mail server. A background worker
+(``manage.py send_contact_digests``) wakes up every
+``CONTACT_DIGEST_INTERVAL`` seconds and sends one digest of everything
+queued since its last run over an SMTP connection it keeps open between
+digests. A failed send is retried with backoff on a fresh connection; events
+stay queued until a digest carrying them goes out, and are given up on
+after ``MAX_ATTEMPTS`` failed digests. Given-up events are logged as errors
+and stay listed under Pending Contact Notifications in the admin, where
+they can be retried or dismissed.
+"""
+import logging
+import smtplib
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import F
+from django.template.loader import render_to_string
+from django.urls import reverse
+
+
+logger = logging.getLogger(__name__)
+
+BATCH_LIMIT = 500
+MAX_ATTEMPTS = 5
+RETRIES = 3
+RETRY_BACKOFF = 2.0
+
+
+def enqueue(submission):
+    """Queue a digest entry for a new submission"""
+    from portfolio.models import PendingContactNotification
+
+    PendingContactNotification.objects.create(submission_id=submission.pk)
+
+
+def recipients():
+    """CONTACT_DIGEST_RECIPIENTS, or the email addresses of active staff users"""
+    if settings.CONTACT_DIGEST_RECIPIENTS:
+        return list(settings.CONTACT_DIGEST_RECIPIENTS)
+    users = get_user_model().objects.filter(is_staff=True, is_active=True).exclude(email="")
+    return sorted(set(users.values_list("email", flat=True)))
+
+
+def build_digest(submissions, to):
+    """One plain-text email listing the submissions, with links to the admin"""
+    base_url = settings.WAGTAILADMIN_BASE_URL.rstrip("/")
+    context = {
+        "submissions": [
+            (submission, base_url + reverse("admin:portfolio_contactsubmission_change", args=[submission.pk]))
+            for submission in submissions
+        ],
+        "changelist_url": base_url + reverse("admin:portfolio_contactsubmission_changelist"),
+    }
+    count = len(submissions)
+    return EmailMessage(
+        subject=f"{count} new contact submission{'s' if count != 1 else ''}",
+        body=render_to_string("portfolio/email/contact_digest.txt", context),
+        to=to,
+    )
+
+
+class DigestSender:
+    """
+    Sends queued notifications as digests over one reused connection
+
+    The connection is opened on first use and kept open across digests;
+    call close() when the worker stops.
+    """
+
+    def __init__(self, connection=None, retries=RETRIES, backoff=RETRY_BACKOFF):
+        self.connection = connection or get_connection(fail_silently=False)
+        self.retries = retries
+        self.backoff = backoff
+        self.is_open = False
+
+    def send(self, message):
+        for attempt in range(self.retries):
+            try:
+                if not self.is_open:
+                    self.connection.open()
+                    self.is_open = True
+                self.connection.send_messages([message])
+                return
+            except (smtplib.SMTPException, OSError):
+                # The server may have dropped an idle connection; start over on a new one
+                self.close()
+                if attempt == self.retries - 1:
+                    raise
+                logger.warning("Contact digest send failed, retrying", exc_info=True)
+                time.sleep(self.backoff * 2 ** attempt)
+
+    def send_digest(self):
+        """Send one digest of the queued submissions; returns how many it listed"""
+        from portfolio.models import ContactSubmission, PendingContactNotification
+
+        events = list(PendingContactNotification.objects.filter(attempts__lt=MAX_ATTEMPTS)[:BATCH_LIMIT])
+        if not events:
+            return 0
+        to = recipients()
+        if not to:
+            logger.warning("No recipients for the contact digest; %s notification(s) stay queued", len(events))
+            return 0
+
+        event_ids = [event.pk for event in events]
+        found = ContactSubmission.objects.in_bulk([event.submission_id for event in events])
+        # Submissions deleted before the digest went out are skipped
+        submissions = [found[event.submission_id] for event in events if event.submission_id in found]
+        if submissions:
+            try:
+                self.send(build_digest(submissions, to))
+            except Exception as error:
+                PendingContactNotification.objects.filter(pk__in=event_ids).update(
+                    attempts=F("attempts") + 1, last_error=repr(error)[:1000],
+                )
+                logger.exception("Contact digest for %s submission(s) failed", len(submissions))
+                given_up = PendingContactNotification.objects.filter(pk__in=event_ids, attempts__gte=MAX_ATTEMPTS).count()
+                if given_up:
+                    logger.error(
+                        "Gave up notifying staff of %s submission(s) after %s failed digests; "
+                        "retry them from Pending Contact Notifications in the admin", given_up, MAX_ATTEMPTS,
+                    )
+                return 0
+        PendingContactNotification.objects.filter(pk__in=event_ids).delete()
+        return len(submissions)
+
+    def close(self):
+        if self.is_open:
+            try:
+                self.connection.close()
+            except Exception:
+                pass
+            self.is_open = False
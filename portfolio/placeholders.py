@@ -0,0 +1,210 @@
+"""
+Intrinsic dimensions and placeholders of listing card images
+
+When a page is saved with a new card image, either an uploaded file or an
+image URL, the image is read once. Its width and height, its dominant
+colour and a tiny blurred WebP are stored on the page next to the image.
+The listing templates render the image lazy-loaded with those dimensions,
+and paint the colour and the blurred preview behind it until it arrives.
+Uploads are read during the save; image URLs are fetched in a background
+thread once the save commits, so an editor never waits on a remote host.
+The image is only read again when its file or URL changes, including after
+a failed read. Pages saved before this existed, and images that could not
+be read, are filled in by ``manage.py compute_image_placeholders``.
+"""
+import base64
+import io
+import logging
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from django.db import connections, transaction
+from django.utils.html import format_html
+from PIL import Image, ImageFilter, ImageOps
+
+from portfolio import cdn
+
+
+logger = logging.getLogger(__name__)
+
+# model label: (field holding the file or URL, prefix of the fields storing its metadata)
+SOURCES = {
+    "portfolio.blogpost": ("featured_image", "featured_image"),
+    "portfolio.projectpage": ("featured_image_url", "featured_image"),
+}
+EMPTY = {"width": None, "height": None, "color": "", "placeholder": ""}
+
+PLACEHOLDER_SIZE = 16
+PLACEHOLDER_BLUR = 1
+PLACEHOLDER_QUALITY = 40
+PALETTE_SIZE = 5
+FETCH_TIMEOUT = 5
+# Overall limit of one fetch, however slowly the host trickles the body
+FETCH_DEADLINE = 15
+FETCH_MAX_BYTES = 20 * 1024 * 1024
+
+
+def analyse(data):
+    """Width, height, dominant colour and placeholder data URI of encoded image bytes"""
+    with Image.open(io.BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image).convert("RGB")
+    width, height = image.size
+
+    image.thumbnail((64, 64))
+    palette = image.quantize(colors=PALETTE_SIZE)
+    _, index = max(palette.getcolors())
+    red, green, blue = palette.getpalette()[index * 3:index * 3 + 3]
+
+    image.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+    buffer = io.BytesIO()
+    image.filter(ImageFilter.GaussianBlur(PLACEHOLDER_BLUR)).save(buffer, "WEBP", quality=PLACEHOLDER_QUALITY)
+    return {
+        "width": width,
+        "height": height,
+        "color": "#%02x%02x%02x" % (red, green, blue),
+        "placeholder": "data:image/webp;base64," + base64.b64encode(buffer.getvalue()).decode(),
+    }
+
+
+def fetch(url, timeout=FETCH_TIMEOUT, max_bytes=FETCH_MAX_BYTES, deadline=FETCH_DEADLINE):
+    """The bytes of a remote http(s) image, refusing anything larger than ``max_bytes`` or slower than ``deadline``"""
+    if urlsplit(url).scheme not in ("http", "https"):
+        raise ValueError(f"{url} is not an http(s) URL")
+    give_up = time.monotonic() + deadline
+    with requests.get(url, timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+        data = b""
+        for chunk in response.iter_content(64 * 1024):
+            data += chunk
+            if len(data) > max_bytes:
+                raise ValueError(f"{url} is larger than {max_bytes} bytes")
+            if time.monotonic() > give_up:
+                raise TimeoutError(f"{url} took longer than {deadline} seconds")
+    return data
+
+
+def source_of(instance):
+    """(field name, metadata prefix, current file name or URL) for an instance, or None"""
+    try:
+        field, prefix = SOURCES[instance._meta.label_lower]
+    except KeyError:
+        return None
+    value = getattr(instance, field)
+    if value and not getattr(value, "_committed", True):
+        # Store a new upload now, as FileField.pre_save would, so its final name is known
+        value.save(value.name, value.file, save=False)
+    return field, prefix, getattr(value, "name", value) or ""
+
+
+def read(instance, field, source):
+    value = getattr(instance, field)
+    if hasattr(value, "open"):
+        with value.open("rb") as image_file:
+            return image_file.read()
+    return fetch(source)
+
+
+def ingest(instance, force=False, defer_remote=False):
+    """Fill in the image metadata of an instance whose image changed; returns whether it changed
+
+    With ``defer_remote``, an image URL is fetched by ``measure`` in the background
+    once the transaction commits, and the metadata is left empty until then.
+    """
+    found = source_of(instance)
+    if found is None:
+        return False
+    field, prefix, source = found
+    if not force and getattr(instance, f"{prefix}_source") == source:
+        return False
+
+    fields = {name: f"{prefix}_{name}" for name in EMPTY}
+    metadata = EMPTY
+    stored = None
+    if source and instance.pk and not force:
+        # Revisions saved before the image was measured carry stale metadata; reuse the stored row's
+        stored = (
+            type(instance)._default_manager.filter(pk=instance.pk, **{f"{prefix}_source": source})
+            .values(*fields.values()).first()
+        )
+    if stored:
+        metadata = {name: stored[field_name] for name, field_name in fields.items()}
+    elif source and defer_remote and not hasattr(getattr(instance, field), "open"):
+        # instance.pk is only known after the first save of a new page
+        transaction.on_commit(lambda: in_background(measure, type(instance), instance.pk, source))
+    elif source:
+        try:
+            metadata = analyse(read(instance, field, source))
+        except Exception:
+            # Recorded with empty metadata, so later saves do not read it again
+            logger.warning("Could not read image %s of %s", source, instance, exc_info=True)
+    for name, value in metadata.items():
+        setattr(instance, fields[name], value)
+    setattr(instance, f"{prefix}_source", source)
+    return True
+
+
+def in_background(function, *args):
+    def run():
+        try:
+            function(*args)
+        finally:
+            connections.close_all()
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def measure(model, pk, source):
+    """Fetch and store the metadata of an image URL, unless the page has moved on to another image
+
+    The page and its listings are purged from shared caches once it is stored.
+    """
+    _, prefix = SOURCES[model._meta.label_lower]
+    try:
+        metadata = analyse(fetch(source))
+    except Exception:
+        logger.warning("Could not read image %s of %s %s", source, model._meta.label, pk, exc_info=True)
+        return
+    instance = model._default_manager.filter(pk=pk, **{f"{prefix}_source": source}).first()
+    if instance is None:
+        return
+    for name, value in metadata.items():
+        setattr(instance, f"{prefix}_{name}", value)
+    # The save bumps the page's fragment versions and so its ETag; shared caches are told separately
+    instance.save(update_fields=[f"{prefix}_{name}" for name in metadata])
+    cdn.purge_page(instance)
+
+
+def image_attrs(instance, prefix="featured_image"):
+    """width, height and placeholder style attributes for an <img> of the instance's image"""
+    width = getattr(instance, f"{prefix}_width")
+    if not width:
+        return ""
+    return format_html(
+        ' width="{}" height="{}" style="background: {} url({}) center / cover no-repeat"',
+        width,
+        getattr(instance, f"{prefix}_height"),
+        getattr(instance, f"{prefix}_color"),
+        getattr(instance, f"{prefix}_placeholder"),
+    )
+
+
+def backfill(force=False):
+    """Measure every card image not measured yet (all of them with ``force``); returns (measured, failed)"""
+    from django.apps import apps
+
+    read_count = failed = 0
+    for label, (field, prefix) in SOURCES.items():
+        model = apps.get_model(label)
+        stored = [f"{prefix}_{name}" for name in (*EMPTY, "source")]
+        for instance in model.objects.iterator():
+            # Images recorded without metadata could not be read, or their fetch never finished
+            unread = getattr(instance, f"{prefix}_source") and not getattr(instance, f"{prefix}_width")
+            if not ingest(instance, force=force or unread):
+                continue
+            read_count += 1
+            if getattr(instance, f"{prefix}_source") and not getattr(instance, f"{prefix}_width"):
+                failed += 1
+            instance.save(update_fields=stored)
+    return read_count, failed
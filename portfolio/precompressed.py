@@ -0,0 +1,189 @@
+"""
+Minified, precompressed bodies of shared page responses
+
+PrecompressedPageMiddleware minifies the HTML of every page response that
+a shared cache may store (Cache-Control: public, see portfolio.cdn) and
+keeps the minified body in the cache together with its gzip and Brotli
+variants, under the page's URL. Entries are versioned by the page's ETag,
+which covers the fragment version tokens of the page and the listings it
+renders (see portfolio.conditional and portfolio.fragments), so anything
+that would invalidate one of its fragments replaces the entry on the next
+request. Later requests for the
+same version are answered from the entry by ConditionalServeMixin without
+rendering, and the middleware sends the variant the client accepts as is,
+so no request after the first spends CPU on templates, minification or
+compression.
+
+Entries are keyed by path: only requests without a query string, or
+whose parameters are all tracking parameters no page reads (see
+IGNORED_PARAMS), are answered from or stored in the cache. Pages served
+privately (those embedding a CSRF token, or to signed-in users) are passed
+through untouched.
+"""
+import hashlib
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+from portfolio import compression
+
+
+CACHE_KEY = "precompressed:%s"
+CACHE_TIMEOUT = 60 * 60 * 24
+# Query parameters added by campaign links and ad clicks; pages render the same with or without them
+IGNORED_PARAMS = frozenset({
+    "utm_source", "utm_medium", "utm_campaign", "utm_term", "utm_content", "gclid", "fbclid",
+})
+
+# Elements whose text is whitespace-sensitive or not HTML
+RAW_ELEMENT = re.compile(r"(<(pre|textarea|script|style)\b[^>]*>.*?</\2\s*>)", re.IGNORECASE | re.DOTALL)
+COMMENT = re.compile(r"<!--(?!\[if).*?-->", re.DOTALL)
+CSS_COMMENT = re.compile(r"/\*.*?\*/", re.DOTALL)
+CSS_PUNCTUATION = re.compile(r"\s*([{};])\s*")
+WHITESPACE = re.compile(r"\s+")
+
+
+def collapse(match):
+    # A run keeps one newline when it had one, so the markup stays line-oriented
+    return "\n" if "\n" in match.group() else " "
+
+
+def minify_text(html):
+    return WHITESPACE.sub(collapse, COMMENT.sub("", html))
+
+
+def minify_raw(element, tag):
+    tag = tag.lower()
+    if tag == "style":
+        open_tag, _, rest = element.partition(">")
+        css, _, close_tag = rest.rpartition("</")
+        css = CSS_PUNCTUATION.sub(r"\1", WHITESPACE.sub(" ", CSS_COMMENT.sub("", css))).strip()
+        return "%s>%s</%s" % (open_tag, css, close_tag)
+    # Scripts are left alone: template literals and regular expressions are whitespace-sensitive
+    return element
+
+
+def minify(html):
+    """HTML with comments, indentation and redundant whitespace removed; <pre>, <textarea> and <script> kept verbatim"""
+    parts = RAW_ELEMENT.split(html)
+    result = []
+    # split() yields text, element, tag name, text, element, tag name, ...
+    for index in range(0, len(parts), 3):
+        result.append(minify_text(parts[index]))
+        if index + 1 < len(parts):
+            result.append(minify_raw(parts[index + 1], parts[index + 2]))
+    return "".join(result).strip() + "\n"
+
+
+def cache_key(request):
+    engine = settings.TEMPLATES[0]["BACKEND"]
+    return CACHE_KEY % hashlib.md5(("%s:%s:%s" % (engine, request.get_host(), request.path)).encode()).hexdigest()
+
+
+def is_cacheable_request(request):
+    """Whether a request renders the same page as its path alone"""
+    return all(name in IGNORED_PARAMS for name in request.GET)
+
+
+def is_cacheable(request, response):
+    """Whether a response is a complete, shareable HTML page served by ConditionalServeMixin"""
+    return (
+        getattr(response, "precompressed_version", None) is not None
+        and request.method in ("GET", "HEAD")
+        and is_cacheable_request(request)
+        and response.status_code == 200
+        and not response.streaming
+        and response.get("Content-Type", "").startswith("text/html")
+        and response.has_header("ETag")
+        and not response.has_header("Content-Encoding")
+        and "public" in response.get("Cache-Control", "")
+        and not response.cookies
+    )
+
+
+def build(response):
+    """The cache entry of a response: its minified body and every useful compressed variant"""
+    charset = response.charset
+    body = minify(response.content.decode(charset)).encode(charset)
+    return {
+        "version": response.precompressed_version,
+        "content_type": response["Content-Type"],
+        "identity": body,
+        **compression.variants(body),
+    }
+
+
+def cached_response(request, version):
+    """A response carrying the cached entry of this URL, or None when there is none for ``version``"""
+    if not is_cacheable_request(request):
+        return None
+    entry = cache.get(cache_key(request))
+    if entry is None or entry["version"] != version:
+        return None
+    response = HttpResponse(entry["identity"], content_type=entry["content_type"])
+    response.precompressed_entry = entry
+    return response
+
+
+def accepted_encodings(header):
+    """Quality value of every content coding a client names; 0 for those it refuses"""
+    qualities = {}
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            qualities[coding.lower()] = quality
+    return qualities
+
+
+def choose_encoding(request, entry):
+    """The best variant of an entry for a request; "identity" when nothing better is accepted
+
+    The client's quality values decide. Browsers list gzip before br at the
+    same quality, so ties go to the order of compression.ENCODINGS instead.
+    """
+    qualities = accepted_encodings(request.headers.get("Accept-Encoding", ""))
+    best, best_quality = "identity", 0
+    for coding in compression.ENCODINGS:
+        quality = qualities.get(coding, qualities.get("*", 0))
+        if coding in entry and quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+class PrecompressedPageMiddleware:
+    """Serve shared page responses minified and precompressed from the cache"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        entry = getattr(response, "precompressed_entry", None)
+        if entry is None:
+            if not is_cacheable(request, response):
+                return response
+            entry = build(response)
+            cache.set(cache_key(request), entry, CACHE_TIMEOUT)
+
+        encoding = choose_encoding(request, entry)
+        response.content = entry[encoding]
+        response["Content-Length"] = str(len(response.content))
+        patch_vary_headers(response, ("Accept-Encoding",))
+        if encoding != "identity":
+            response["Content-Encoding"] = encoding
+            # Like GZipMiddleware: the encoded bytes differ, the representation does not
+            etag = response["ETag"]
+            if etag.startswith('"'):
+                response["ETag"] = "W/" + etag
+        return response
@@ -0,0 +1,202 @@
+"""
+Pre-warming of the image renditions the page templates render
+
+Every rendition spec is read from the templates themselves: the image,
+srcset_image and picture tags (Django) and functions (Jinja2) in each page
+model's template are scanned, and brace expansions such as
+``width-{640,960,1280}`` are expanded the way the tags expand them. Each
+image a live page of that model references (image choosers in its
+StreamFields and foreign keys to the image model) is then given every
+spec of its page's template. Renditions that already exist are skipped;
+the missing ones are generated per image across a process pool, so the
+first visitor after a deploy or a publish never waits on Pillow.
+``manage.py warm_renditions`` warms the whole site, and publishing a page
+warms that page's images in the background (see portfolio.signals).
+"""
+import logging
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from django.db import connections, transaction
+from django.template import TemplateDoesNotExist
+from django.template.loader import get_template
+from django.utils.text import smart_split
+from wagtail.blocks import ListBlock, StreamBlock, StructBlock
+from wagtail.fields import StreamField
+from wagtail.images import get_image_model
+from wagtail.images.blocks import ImageChooserBlock
+from wagtail.images.models import Filter
+
+from portfolio.bake import _init_worker
+
+
+logger = logging.getLogger(__name__)
+
+IMAGE_TAGS = ("image", "srcset_image", "picture")
+DJANGO_TAG = re.compile(r"\{%%-?\s*(?:%s)\s+\S+\s+(.*?)-?%%\}" % "|".join(IMAGE_TAGS), re.DOTALL)
+JINJA_CALL = re.compile(r"\b(?:%s)\(\s*[^,()]+,\s*([\"'])(.*?)\1" % "|".join(IMAGE_TAGS), re.DOTALL)
+
+
+def source_specs(source):
+    """Expanded filter specs of every image tag or call in a template source"""
+    specs = set()
+    for match in DJANGO_TAG.finditer(source):
+        bits = []
+        for bit in smart_split(match.group(1)):
+            if bit == "as":
+                break
+            if "=" not in bit:
+                bits.append(bit)
+        if bits:
+            specs.update(Filter.expand_spec(bits))
+    for match in JINJA_CALL.finditer(source):
+        specs.update(Filter.expand_spec(match.group(2)))
+    return specs
+
+
+def template_specs(model):
+    """Filter specs rendered by a page model's template"""
+    try:
+        template = get_template(model.template)
+    except TemplateDoesNotExist:
+        return set()
+    return source_specs(Path(template.origin.name).read_text())
+
+
+def block_images(block, value):
+    """Ids of the images chosen anywhere inside a block value"""
+    if value is None:
+        return
+    if isinstance(block, ImageChooserBlock):
+        yield value.pk
+    elif isinstance(block, StreamBlock):
+        for child in value:
+            yield from block_images(child.block, child.value)
+    elif isinstance(block, StructBlock):
+        for name, child_block in block.child_blocks.items():
+            yield from block_images(child_block, value.get(name))
+    elif isinstance(block, ListBlock):
+        for item in value:
+            yield from block_images(block.child_block, item)
+
+
+def page_images(page):
+    """Ids of the images a page references"""
+    image_model = get_image_model()
+    for field in page._meta.concrete_fields:
+        if isinstance(field, StreamField):
+            yield from block_images(field.stream_block, getattr(page, field.name))
+        elif field.is_relation and field.related_model is image_model:
+            image_id = getattr(page, field.attname)
+            if image_id:
+                yield image_id
+
+
+def wanted(pages=None):
+    """{image id: filter specs} for the images of live pages whose templates render images"""
+    from wagtail.models import Page
+
+    if pages is None:
+        pages = Page.objects.live().specific()
+    specs_by_model = {}
+    result = {}
+    for page in pages:
+        model = type(page)
+        if model not in specs_by_model:
+            specs_by_model[model] = template_specs(model)
+        if not specs_by_model[model]:
+            continue
+        for image_id in page_images(page):
+            result.setdefault(image_id, set()).update(specs_by_model[model])
+    return result
+
+
+def missing(specs_by_image):
+    """({image id: specs without a rendition}, number of renditions that already exist)"""
+    image_model = get_image_model()
+    images = image_model.objects.in_bulk(list(specs_by_image))
+    existing = set(
+        image_model.get_rendition_model().objects
+        .filter(image_id__in=list(images))
+        .values_list("image_id", "filter_spec", "focal_point_key")
+    )
+    result = {}
+    skipped = 0
+    for image_id, specs in specs_by_image.items():
+        image = images.get(image_id)
+        if image is None:
+            # Deleted since the page was saved; the template renders nothing for it
+            continue
+        for spec in sorted(specs):
+            if (image_id, spec, Filter(spec).get_cache_key(image)) in existing:
+                skipped += 1
+            else:
+                result.setdefault(image_id, []).append(spec)
+    return result, skipped
+
+
+def generate(image_id, specs):
+    """Create renditions of one image; returns (image id, renditions created, error)"""
+    try:
+        image = get_image_model().objects.get(pk=image_id)
+        # One read of the original serves every spec
+        image.create_renditions(*[Filter(spec) for spec in specs])
+    except Exception as error:
+        logger.exception("Generating renditions of image %s failed", image_id)
+        return image_id, 0, repr(error)
+    return image_id, len(specs), None
+
+
+def warm(pages=None, workers=None):
+    """Generate the missing renditions of the pages' images (all live pages by default); returns a summary dict
+
+    ``workers=0`` generates them in the calling process instead of a pool.
+    """
+    specs_by_image = wanted(pages)
+    to_generate, skipped = missing(specs_by_image)
+
+    started = time.perf_counter()
+    generated = 0
+    failed = []
+    if to_generate:
+        if workers == 0:
+            results = [generate(image_id, specs) for image_id, specs in to_generate.items()]
+        else:
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                futures = [pool.submit(generate, image_id, specs) for image_id, specs in to_generate.items()]
+                results = [future.result() for future in futures]
+        for image_id, count, error in results:
+            generated += count
+            if error:
+                failed.append((image_id, error))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "images": len(specs_by_image),
+        "generated": generated,
+        "skipped": skipped,
+        "failed": failed,
+        "seconds": elapsed,
+        "renditions_per_second": generated / elapsed if elapsed else 0.0,
+    }
+
+
+def warm_page(page):
+    """Warm a just-published page's renditions in a background thread once the transaction commits"""
+    page = page.specific
+    if not template_specs(type(page)):
+        return
+
+    def run():
+        try:
+            warm([page], workers=0)
+        except Exception:
+            logger.exception("Warming renditions of page %s failed", page.pk)
+        finally:
+            connections.close_all()
+
+    transaction.on_commit(lambda: threading.Thread(target=run, daemon=True).start())
@@ -0,0 +1,158 @@
+"""
+Archival of old contact submissions
+
+Responded submissions older than ``CONTACT_RETENTION_DAYS`` are moved out
+of the ContactSubmission table in batches. Each batch is appended to a
+gzip file per month in ``CONTACT_ARCHIVE_DIR`` as a new gzip member of JSON
+lines (files are only ever appended to, and gzip readers see the members as
+one stream), then indexed in ArchivedContactSubmission and deleted.
+
+The index keeps the columns the admin searches and filters on, so archived
+submissions stay findable without opening the files; restoring one reads
+its record back from its file and re-creates the submission with its
+original id. Archived submissions stay counted in the daily rollups, which
+also count them as archived so the admin's date drill-down skips days left
+without live submissions.
+"""
+import datetime
+import gzip
+import json
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from portfolio import compression, rollups
+
+
+BATCH_SIZE = 1000
+ARCHIVE_NAME = "contact-submissions-%Y-%m.jsonl.gz"
+INDEX_FIELDS = ("name", "email", "company", "service", "budget", "timeline", "created_at", "is_responded")
+
+_archiving = ContextVar("contact_archiving", default=False)
+
+
+@contextmanager
+def archiving():
+    """Delete submissions inside the block as archived: the rollups keep counting them"""
+    token = _archiving.set(True)
+    try:
+        yield
+    finally:
+        _archiving.reset(token)
+
+
+def is_archiving():
+    return _archiving.get()
+
+
+def submission_fields():
+    from portfolio.models import ContactSubmission
+
+    return [field.attname for field in ContactSubmission._meta.concrete_fields]
+
+
+def archive_dir():
+    return Path(settings.CONTACT_ARCHIVE_DIR)
+
+
+def expired(days=None, now=None):
+    """Responded submissions older than the retention period"""
+    from portfolio.models import ContactSubmission
+
+    days = settings.CONTACT_RETENTION_DAYS if days is None else days
+    cutoff = (now or timezone.now()) - datetime.timedelta(days=days)
+    return ContactSubmission.objects.filter(is_responded=True, created_at__lt=cutoff)
+
+
+def encode(value):
+    # Full precision, where DjangoJSONEncoder would round to milliseconds
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot archive {type(value).__name__} values")
+
+
+def append(name, records):
+    """Append records to an archive file as one gzip member"""
+    lines = "".join(json.dumps(record, default=encode) + "\n" for record in records)
+    path = archive_dir() / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "ab") as archive:
+        archive.write(compression.compress(lines.encode(), "gzip"))
+
+
+def archive(days=None, batch_size=BATCH_SIZE, now=None):
+    """Move expired submissions to the archive files; returns how many were archived"""
+    from portfolio.models import ArchivedContactSubmission, ContactSubmission
+
+    queryset = expired(days, now).order_by("pk")
+    fields = submission_fields()
+    archived = 0
+    last = 0
+    while True:
+        records = list(queryset.filter(pk__gt=last).values(*fields)[:batch_size])
+        if not records:
+            return archived
+        last = records[-1]["id"]
+
+        files = {}
+        for record in records:
+            name = timezone.localtime(record["created_at"]).strftime(ARCHIVE_NAME)
+            files.setdefault(name, []).append(record)
+        # Files first: a crash before the commit below leaves records that no
+        # index row points to, never index rows without their records
+        for name, batch in files.items():
+            append(name, batch)
+
+        with transaction.atomic():
+            ArchivedContactSubmission.objects.bulk_create([
+                ArchivedContactSubmission(
+                    submission_id=record["id"],
+                    archive_file=name,
+                    **{field: record[field] for field in INDEX_FIELDS},
+                )
+                for name, batch in files.items()
+                for record in batch
+            ])
+            ids = [record["id"] for record in records]
+            with archiving():
+                ContactSubmission.objects.filter(pk__in=ids).delete()
+            rollups.record_archived(ArchivedContactSubmission.objects.filter(submission_id__in=ids))
+        archived += len(records)
+
+
+def read(name, submission_ids):
+    """The latest archived record of each of ``submission_ids`` in an archive file"""
+    wanted = set(submission_ids)
+    found = {}
+    with gzip.open(archive_dir() / name, "rt") as archive:
+        for line in archive:
+            record = json.loads(line)
+            if record["id"] in wanted:
+                found[record["id"]] = record
+    return found
+
+
+def restore(queryset):
+    """Move archived submissions back into ContactSubmission; returns how many were restored"""
+    from portfolio.models import ContactSubmission
+
+    wanted = {}
+    for name, submission_id in queryset.values_list("archive_file", "submission_id"):
+        wanted.setdefault(name, []).append(submission_id)
+    records = [record for name, ids in wanted.items() for record in read(name, ids).values()]
+
+    with transaction.atomic():
+        # bulk_create sends no post_save: archived submissions never left the rollups
+        ContactSubmission.objects.bulk_create([ContactSubmission(**record) for record in records])
+        for record in records:
+            # created_at is auto_now_add, so the insert stamped it with the current time
+            ContactSubmission.objects.filter(pk=record["id"]).update(created_at=parse_datetime(record["created_at"]))
+        restored = queryset.filter(submission_id__in=[record["id"] for record in records])
+        rollups.record_archived(restored, sign=-1)
+        restored.delete()
+    return len(records)
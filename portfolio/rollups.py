@@ -0,0 +1,259 @@
+"""
+Daily rollups of contact submissions for the admin dashboard
+
+ContactRollup holds one row per day, service, budget and timeline with the
+number of submissions, how many of them were responded to and how many were
+since archived (see portfolio.retention). Rows are
+adjusted in place as submissions are created, edited or deleted (see
+portfolio.signals), and bulk updates that bypass signals adjust the rows
+they touched. ``manage.py rebuild_contact_rollups`` recomputes any range
+from scratch with a GROUP BY over live and archived submissions, so a
+backfill costs one pass in the database rather than a Python loop over
+every submission.
+"""
+import datetime
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.db.models import Count, DateField, F, Func, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+DIMENSIONS = ("service", "budget", "timeline")
+BATCH_SIZE = 1000
+# Rollup keys matched by one UPDATE in set_responded(), well under SQLite's expression depth limit
+KEYS_PER_UPDATE = 200
+
+
+def bucket(submission):
+    """Rollup key of a submission: its local day and dimension values"""
+    return {
+        "day": timezone.localdate(submission.created_at),
+        **{name: getattr(submission, name) for name in DIMENSIONS},
+    }
+
+
+def adjust(key, submissions=0, responded=0, archived=0):
+    """Add to the counts of one rollup row, creating it when missing"""
+    from portfolio.models import ContactRollup
+
+    if not (submissions or responded or archived):
+        return
+    changes = {
+        "submissions": F("submissions") + submissions,
+        "responded": F("responded") + responded,
+        "archived": F("archived") + archived,
+    }
+    if ContactRollup.objects.filter(**key).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            ContactRollup.objects.create(
+                **key,
+                submissions=max(submissions, 0),
+                responded=max(responded, 0),
+                archived=max(archived, 0),
+            )
+    except IntegrityError:
+        # Another request created the row first
+        ContactRollup.objects.filter(**key).update(**changes)
+
+
+def record(submission, sign=1):
+    """Count a new submission (or uncount a deleted one with ``sign=-1``)"""
+    adjust(bucket(submission), submissions=sign, responded=sign * int(submission.is_responded))
+
+
+def move(previous, submission):
+    """Move a saved submission from the bucket and state it was loaded with"""
+    if bucket(previous) == bucket(submission):
+        adjust(bucket(submission), responded=int(submission.is_responded) - int(previous.is_responded))
+        return
+    record(previous, sign=-1)
+    record(submission)
+
+
+def record_archived(queryset, sign=1):
+    """Count archived submissions (an ArchivedContactSubmission queryset) as archived, or back with ``sign=-1``"""
+    for row in aggregate(queryset):
+        adjust({name: row[name] for name in ("day", *DIMENSIONS)}, archived=sign * row["submissions"])
+
+
+def day_expression(queryset):
+    """created_at as a local date, computed in SQL"""
+    if connections[queryset.db].vendor == "sqlite" and (
+        not settings.USE_TZ or timezone.get_current_timezone_name() == "UTC"
+    ):
+        # TruncDate calls back into Python for every row on SQLite; the
+        # built-in DATE() gives the same day when stored times are local
+        return Func(F("created_at"), function="DATE", output_field=DateField())
+    return TruncDate("created_at")
+
+
+def aggregate(queryset):
+    """Rollup rows for a ContactSubmission queryset, computed by the database"""
+    return (
+        queryset.order_by()
+        .annotate(day=day_expression(queryset))
+        .values("day", *DIMENSIONS)
+        .annotate(submissions=Count("pk"), responded=Count("pk", filter=Q(is_responded=True)))
+    )
+
+
+def day_range(start, end):
+    """created_at bounds covering local days ``start`` to ``end`` inclusive"""
+    tz = timezone.get_current_timezone()
+    lower = datetime.datetime.combine(start, datetime.time.min, tzinfo=tz)
+    upper = datetime.datetime.combine(end + datetime.timedelta(days=1), datetime.time.min, tzinfo=tz)
+    return lower, upper
+
+
+def rebuild(start=None, end=None):
+    """Recompute rollups for local days ``start`` to ``end`` (every day when omitted); returns rows written"""
+    from portfolio.models import ArchivedContactSubmission, ContactRollup, ContactSubmission
+
+    # Archived submissions (see portfolio.retention) still count, and are counted as archived
+    sources = [ContactSubmission.objects.all(), ArchivedContactSubmission.objects.all()]
+    existing = ContactRollup.objects.all()
+    if start is not None:
+        lower, _ = day_range(start, start)
+        sources = [source.filter(created_at__gte=lower) for source in sources]
+        existing = existing.filter(day__gte=start)
+    if end is not None:
+        _, upper = day_range(end, end)
+        sources = [source.filter(created_at__lt=upper) for source in sources]
+        existing = existing.filter(day__lte=end)
+
+    key_fields = ("day", *DIMENSIONS)
+    with transaction.atomic():
+        rows = {}
+        for source in sources:
+            is_archive = source.model is ArchivedContactSubmission
+            for row in aggregate(source).iterator(chunk_size=BATCH_SIZE):
+                row["archived"] = row["submissions"] if is_archive else 0
+                key = tuple(row[name] for name in key_fields)
+                if key in rows:
+                    for name in ("submissions", "responded", "archived"):
+                        rows[key][name] += row[name]
+                else:
+                    rows[key] = row
+        stale = {tuple(row[:-1]): row[-1] for row in existing.values_list(*key_fields, "pk")}
+        written = 0
+        batch = []
+        for key, row in rows.items():
+            stale.pop(key, None)
+            batch.append(ContactRollup(**row))
+            if len(batch) >= BATCH_SIZE:
+                written += upsert(batch)
+                batch = []
+        written += upsert(batch)
+        # Buckets left without any submission
+        ContactRollup.objects.filter(pk__in=list(stale.values())).delete()
+    return written
+
+
+def upsert(rows):
+    """Insert rollup rows, replacing the counts of rows that already exist"""
+    from portfolio.models import ContactRollup
+
+    ContactRollup.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=["day", *DIMENSIONS],
+        update_fields=["submissions", "responded", "archived"],
+    )
+    return len(rows)
+
+
+def rebuild_days(days):
+    """Recompute the given local days, e.g. after a queryset.update() on submissions"""
+    days = sorted(set(days))
+    if days:
+        rebuild(days[0], days[-1])
+
+
+def set_responded(queryset, value):
+    """queryset.update(is_responded=value), adjusting the rollups it changed; returns the count"""
+    from portfolio.models import ContactRollup
+
+    key_fields = ("day", *DIMENSIONS)
+    sign = 1 if value else -1
+    with transaction.atomic():
+        # Rows already in the target state leave the counts alone
+        changed = {
+            tuple(row[name] for name in key_fields): sign * row["submissions"]
+            for row in aggregate(queryset.exclude(is_responded=value))
+        }
+        updated = queryset.update(is_responded=value)
+        by_delta = {}
+        for key, delta in changed.items():
+            by_delta.setdefault(delta, []).append(key)
+        for delta, keys in by_delta.items():
+            for offset in range(0, len(keys), KEYS_PER_UPDATE):
+                batch = keys[offset:offset + KEYS_PER_UPDATE]
+                match = Q()
+                for key in batch:
+                    match |= Q(**dict(zip(key_fields, key)))
+                rows = ContactRollup.objects.filter(match)
+                if rows.update(responded=F("responded") + delta) < len(batch):
+                    # Buckets that were never rolled up
+                    existing = set(rows.values_list(*key_fields))
+                    for key in set(batch) - existing:
+                        adjust(dict(zip(key_fields, key)), responded=delta)
+    return updated
+
+
+def dashboard(days=30, today=None):
+    """Chart-ready series for the last ``days`` days, read from the rollup table only"""
+    from portfolio.models import ContactRollup, ContactSubmission
+
+    today = today or timezone.localdate()
+    start = today - datetime.timedelta(days=days - 1)
+    recent = ContactRollup.objects.filter(day__gte=start, day__lte=today)
+
+    per_day = {
+        row["day"]: row
+        for row in recent.order_by().values("day").annotate(submissions=Sum("submissions"), responded=Sum("responded"))
+    }
+    labels, received, responded = [], [], []
+    for offset in range(days):
+        day = start + datetime.timedelta(days=offset)
+        row = per_day.get(day, {})
+        labels.append(day.strftime("%b %d"))
+        received.append(row.get("submissions", 0))
+        responded.append(row.get("responded", 0))
+
+    breakdowns = {}
+    for name in DIMENSIONS:
+        choices = dict(ContactSubmission._meta.get_field(name).choices)
+        rows = recent.order_by().values(name).annotate(submissions=Sum("submissions"), responded=Sum("responded"))
+        breakdowns[name] = [
+            {
+                "label": choices.get(row[name], row[name] or "Not given"),
+                "submissions": row["submissions"],
+                "responded": row["responded"],
+                "rate": rate(row["responded"], row["submissions"]),
+            }
+            for row in sorted(rows, key=lambda row: -row["submissions"])
+        ]
+
+    totals = ContactRollup.objects.aggregate(submissions=Sum("submissions"), responded=Sum("responded"))
+    total = totals["submissions"] or 0
+    total_responded = totals["responded"] or 0
+    return {
+        "labels": labels,
+        "received": received,
+        "responded": responded,
+        "breakdowns": breakdowns,
+        "period_submissions": sum(received),
+        "period_rate": rate(sum(responded), sum(received)),
+        "total": total,
+        "unresponded": total - total_responded,
+        "rate": rate(total_responded, total),
+    }
+
+
+def rate(responded, submissions):
+    """Response rate as a whole percentage"""
+    return round(100 * responded / submissions) if submissions else 0
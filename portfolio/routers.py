@@ -0,0 +1,134 @@
+"""
+Read-replica routing for anonymous page serving
+
+ReplicaRoutingMiddleware marks a request as replica-safe when it is an
+anonymous GET/HEAD outside the admin and CMS, and the visitor has not
+written anything recently. ReplicaRouter then sends that request's reads to
+one of settings.DATABASE_REPLICAS. Everything else goes to the primary:
+writes, admin and CMS traffic, management commands, background threads, and
+any read that follows a write in the same request. After an unsafe request
+the visitor gets a short-lived cookie that pins their next reads to the
+primary, so they see their own writes despite replica lag.
+
+Values computed for shared caches are read from the primary too (see
+use_primary()), so replica lag is never stored beyond the request that saw
+it.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+
+PRIMARY = "default"
+PIN_COOKIE = "db_primary"
+PIN_SECONDS = 15
+PRIMARY_PATHS = ("/cms/", "/django-admin/", "/documents/")
+
+_state = ContextVar("replica_routing", default=None)
+
+
+def replicas():
+    return list(getattr(settings, "DATABASE_REPLICAS", []))
+
+
+def replica_allowed():
+    """Whether reads in the current context may go to a replica"""
+    state = _state.get()
+    return bool(state and state["replica"])
+
+
+@contextmanager
+def use_primary():
+    """Route every read inside the block to the primary"""
+    token = _state.set({"replica": False})
+    try:
+        yield
+    finally:
+        _state.reset(token)
+
+
+class ReplicaRouter:
+    """Sends replica-safe reads to a random replica and everything else to the primary"""
+
+    def db_for_read(self, model, **hints):
+        aliases = replicas()
+        if aliases and replica_allowed():
+            return random.choice(aliases)
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            # Reads after a write in the same request must see it
+            state["replica"] = False
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
+
+
+def is_replica_safe(request, user):
+    if request.method not in ("GET", "HEAD") or PIN_COOKIE in request.COOKIES:
+        return False
+    if request.path.startswith(getattr(settings, "REPLICA_PRIMARY_PATHS", PRIMARY_PATHS)):
+        return False
+    if settings.SESSION_COOKIE_NAME not in request.COOKIES:
+        # Anonymous; reading the session would add Vary: Cookie to shared pages
+        return True
+    return not (user is not None and user.is_authenticated)
+
+
+def pin_to_primary(request, response):
+    """After an unsafe request, keep the visitor's next reads on the primary"""
+    if request.method not in ("GET", "HEAD", "OPTIONS", "TRACE"):
+        response.set_cookie(
+            PIN_COOKIE,
+            "1",
+            max_age=getattr(settings, "REPLICA_PIN_SECONDS", PIN_SECONDS),
+            httponly=True,
+            samesite="Lax",
+            secure=request.is_secure(),
+        )
+    return response
+
+
+class ReplicaRoutingMiddleware:
+    """Scope replica routing to one request; must come after AuthenticationMiddleware"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _state.set({"replica": is_replica_safe(request, getattr(request, "user", None))})
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return pin_to_primary(request, response)
+
+    async def __acall__(self, request):
+        user = None
+        if hasattr(request, "auser") and settings.SESSION_COOKIE_NAME in request.COOKIES:
+            user = await request.auser()
+        token = _state.set({"replica": is_replica_safe(request, user)})
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return pin_to_primary(request, response)
@@ -0,0 +1,100 @@
+"""
+Signal handlers keeping in-process caches and indexes in step with publishing
+"""
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from wagtail.models import Page
+from wagtail.signals import page_published, page_slug_changed, page_unpublished, post_page_move
+
+from portfolio import (
+    autocomplete, cdn, feeds, fragments, navigation, notifications, placeholders, renditions, retention, rollups, sitemaps,
+)
+from portfolio.models import BlogPost, ContactSubmission, ProjectPage
+
+
+@receiver(page_published)
+def handle_page_published(sender, instance, **kwargs):
+    """Re-index a page as soon as it goes live and pre-render its image renditions"""
+    autocomplete.update_page(instance)
+    sitemaps.invalidate_page(instance)
+    feeds.rebuild_for_page(instance)
+    navigation.invalidate()
+    cdn.purge_page(instance)
+    renditions.warm_page(instance)
+
+
+@receiver(page_unpublished)
+def handle_page_unpublished(sender, instance, **kwargs):
+    """Drop a page from the indexes once it is no longer live"""
+    autocomplete.remove_page(instance)
+    sitemaps.invalidate_page(instance)
+    feeds.rebuild_for_page(instance)
+    navigation.invalidate()
+    cdn.purge_page(instance)
+
+
+@receiver(post_delete)
+def handle_page_deleted(sender, instance, **kwargs):
+    """Deleting a live page does not send page_unpublished, so handle it here"""
+    if isinstance(instance, Page):
+        autocomplete.remove_page(instance)
+        sitemaps.invalidate_page(instance)
+        feeds.rebuild_for_page(instance)
+        navigation.invalidate()
+        cdn.purge_page(instance)
+
+
+@receiver(post_page_move)
+@receiver(page_slug_changed)
+def handle_page_url_changed(sender, instance, **kwargs):
+    """A move or slug change rewrites the URL of the whole subtree"""
+    autocomplete.invalidate()
+    sitemaps.invalidate_all()
+    feeds.invalidate_all()
+    navigation.invalidate()
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def handle_model_changed(sender, instance, **kwargs):
+    """Saving (and so publishing) or deleting an object invalidates the fragments rendering it"""
+    if fragments.is_tracked(instance):
+        fragments.bump(instance)
+
+
+@receiver(pre_save, sender=BlogPost)
+@receiver(pre_save, sender=ProjectPage)
+def read_card_image(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Measure a page's card image when it changed, so listings can reserve its space"""
+    if not raw and update_fields is None:
+        placeholders.ingest(instance, defer_remote=True)
+
+
+@receiver(pre_save, sender=ContactSubmission)
+def remember_submission_bucket(sender, instance, **kwargs):
+    """Keep the stored state of an edited submission so its rollup can be moved"""
+    if instance.pk and not instance._state.adding:
+        instance._rollup_previous = (
+            ContactSubmission.objects.filter(pk=instance.pk)
+            .only("created_at", "is_responded", *rollups.DIMENSIONS)
+            .first()
+        )
+
+
+@receiver(post_save, sender=ContactSubmission)
+def handle_submission_saved(sender, instance, created, **kwargs):
+    """Count new submissions and responses in the daily rollups and queue staff notifications"""
+    previous = getattr(instance, "_rollup_previous", None)
+    if created:
+        rollups.record(instance)
+        notifications.enqueue(instance)
+    elif previous is not None:
+        rollups.move(previous, instance)
+    instance._rollup_previous = None
+
+
+@receiver(post_delete, sender=ContactSubmission)
+def handle_submission_deleted(sender, instance, **kwargs):
+    """Uncount deleted submissions; archived ones stay counted (see portfolio.retention)"""
+    if not retention.is_archiving():
+        rollups.record(instance, sign=-1)
@@ -0,0 +1,118 @@
+"""
+Single-flight cache fills: serve stale and block one recompute
+
+get_or_compute() stores a value together with the time it stops being
+fresh, and keeps it in the cache for a further stale window. When the value
+goes stale, the one caller that wins the refresh lock recomputes it inline,
+waiting for the render like a miss would, while every other caller keeps
+getting the stale value. Nothing refreshes a stale value in the background:
+it is only recomputed when a request asks for it, and once the stale window
+has passed the next request is a hard miss. The fragment and API renders
+close over request state, so they are not run detached from their request.
+
+On a hard miss, concurrent callers in the same process queue on a per-key
+lock and callers in other processes wait up to WAIT_TIMEOUT for the
+winner's result before computing it themselves, so one render fills the key
+however many requests missed it at once.
+
+The cross-process lock is a cache.add() on the shared cache, which is atomic
+on Redis and best effort on the file-based cache. Values are computed with
+reads pinned to the primary database so replica lag is never cached.
+"""
+import threading
+import time
+import uuid
+import zlib
+
+from django.core.cache import cache as default_cache
+
+from portfolio import routers
+
+
+LOCK_KEY = "lock:%s"
+LOCK_TIMEOUT = 30
+STALE_TIMEOUT = 60
+WAIT_TIMEOUT = 5.0
+POLL_INTERVAL = 0.05
+
+# Striped re-entrant locks coalesce threads of this process without keeping one lock per key
+_thread_locks = [threading.RLock() for _ in range(256)]
+
+
+def _thread_lock(key):
+    return _thread_locks[zlib.crc32(key.encode()) % len(_thread_locks)]
+
+
+def _acquire(cache, key, timeout):
+    token = uuid.uuid4().hex
+    if cache.add(LOCK_KEY % key, token, timeout):
+        return token
+    return None
+
+
+def _release(cache, key, token):
+    if cache.get(LOCK_KEY % key) == token:
+        cache.delete(LOCK_KEY % key)
+
+
+def store(key, value, timeout=300, stale_timeout=STALE_TIMEOUT, cache=None):
+    """Write a value in the format get_or_compute() reads, e.g. to refresh it eagerly"""
+    cache = cache or default_cache
+    if timeout is None:
+        entry = {"value": value, "fresh_until": None}
+        cache.set(key, entry, None)
+    else:
+        entry = {"value": value, "fresh_until": time.time() + timeout}
+        cache.set(key, entry, timeout + stale_timeout)
+    return entry
+
+
+def _is_fresh(entry):
+    return entry["fresh_until"] is None or time.time() < entry["fresh_until"]
+
+
+def _compute(compute):
+    with routers.use_primary():
+        return compute()
+
+
+def get_or_compute(key, compute, timeout=300, stale_timeout=STALE_TIMEOUT,
+                   lock_timeout=LOCK_TIMEOUT, wait_timeout=WAIT_TIMEOUT, cache=None):
+    """The cached value of ``key``, calling ``compute()`` at most once per refresh
+
+    ``timeout`` is how long a value is fresh (None: until deleted) and
+    ``stale_timeout`` how much longer it may be served while one caller
+    refreshes it; that caller computes the new value before it returns.
+    """
+    cache = cache or default_cache
+    entry = cache.get(key)
+    if entry is not None:
+        if _is_fresh(entry):
+            return entry["value"]
+        token = _acquire(cache, key, lock_timeout)
+        if token is None:
+            return entry["value"]
+        try:
+            return store(key, _compute(compute), timeout, stale_timeout, cache)["value"]
+        finally:
+            _release(cache, key, token)
+
+    with _thread_lock(key):
+        entry = cache.get(key)
+        if entry is not None:
+            return entry["value"]
+        token = _acquire(cache, key, lock_timeout)
+        if token is None:
+            # Another process is computing; wait for its result rather than piling on
+            deadline = time.monotonic() + wait_timeout
+            while time.monotonic() < deadline:
+                time.sleep(POLL_INTERVAL)
+                entry = cache.get(key)
+                if entry is not None:
+                    return entry["value"]
+            token = _acquire(cache, key, lock_timeout)
+        try:
+            return store(key, _compute(compute), timeout, stale_timeout, cache)["value"]
+        finally:
+            if token is not None:
+                _release(cache, key, token)
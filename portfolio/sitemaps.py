@@ -0,0 +1,211 @@
+"""
+Streamed, cached sitemap.xml built from a values()-only page query
+
+Pages are sharded by primary key range, so publishing a page only ever
+invalidates the one shard it lives in (new pages always land in the last
+shard). Once more than SHARD_SIZE primary keys exist, /sitemap.xml becomes a
+sitemap index pointing at /sitemap-<n>.xml shards.
+
+Cached documents are kept until they are invalidated. Each one has a token
+that invalidation replaces, and a stream only caches what it sent when its
+tokens are unchanged at the end, so a publish during a slow stream can never
+be overwritten by the outdated body.
+"""
+import uuid
+
+from django.core.cache import cache
+from django.db.models import F, Max
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.html import escape
+from wagtail.models import Page, Site
+
+
+SHARD_SIZE = 50_000
+CACHE_TIMEOUT = None  # kept until a publish invalidates it
+CHUNK_SIZE = 2_000
+
+GENERATION_KEY = "sitemap:generation"
+
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n'
+URLSET_OPEN = '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+URLSET_CLOSE = "</urlset>\n"
+INDEX_OPEN = '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+INDEX_CLOSE = "</sitemapindex>\n"
+
+
+def _new_token():
+    return uuid.uuid4().hex[:12]
+
+
+def _token(key):
+    # A random token: should the cache evict it, the new one can never bring back old entries
+    token = cache.get(key)
+    if token is None:
+        cache.add(key, _new_token(), None)
+        token = cache.get(key)
+    return token
+
+
+def _generation():
+    return _token(GENERATION_KEY)
+
+
+def _shard_token_key(site_id, shard):
+    return "sitemap:token:%s:shard:%s" % (site_id, shard)
+
+
+def _index_token_key(site_id):
+    return "sitemap:token:%s:index" % site_id
+
+
+def _shard_key(site_id, shard):
+    return "sitemap:%s:%s:shard:%s" % (_generation(), site_id, shard)
+
+
+def _index_key(site_id):
+    return "sitemap:%s:%s:index" % (_generation(), site_id)
+
+
+def _site_root(site):
+    for root in Site.get_site_root_paths():
+        if root.site_id == site.pk:
+            return root
+    return None
+
+
+def _site_pages(root):
+    return (
+        Page.objects.live()
+        .public()
+        .filter(url_path__startswith=root.root_path)
+        .exclude(depth__lte=1)
+    )
+
+
+def shard_summary(root):
+    """(shard, lastmod) pairs for every shard holding at least one live page"""
+    return list(
+        _site_pages(root)
+        .annotate(shard=F("pk") / SHARD_SIZE)
+        .values("shard")
+        .annotate(lastmod=Max("last_published_at"))
+        .order_by("shard")
+        .values_list("shard", "lastmod")
+    )
+
+
+def _url_entry(loc, lastmod):
+    if lastmod:
+        return "<url><loc>%s</loc><lastmod>%s</lastmod></url>\n" % (
+            escape(loc),
+            lastmod.date().isoformat(),
+        )
+    return "<url><loc>%s</loc></url>\n" % escape(loc)
+
+
+def iter_urlset(root, shard=None):
+    """Yield a <urlset> document for the site, optionally limited to one shard"""
+    pages = _site_pages(root)
+    if shard is not None:
+        pages = pages.filter(pk__gte=shard * SHARD_SIZE, pk__lt=(shard + 1) * SHARD_SIZE)
+    rows = pages.order_by("pk").values_list("url_path", "last_published_at")
+
+    base_url = root.root_url.rstrip("/")
+    strip = len(root.root_path) - 1
+
+    yield XML_HEADER + URLSET_OPEN
+    buffer = []
+    for url_path, last_published_at in rows.iterator(chunk_size=CHUNK_SIZE):
+        buffer.append(_url_entry(base_url + url_path[strip:], last_published_at))
+        if len(buffer) >= CHUNK_SIZE:
+            yield "".join(buffer)
+            buffer = []
+    buffer.append(URLSET_CLOSE)
+    yield "".join(buffer)
+
+
+def iter_index(root, shards):
+    """Yield a <sitemapindex> document pointing at each shard"""
+    base_url = root.root_url.rstrip("/")
+    yield XML_HEADER + INDEX_OPEN
+    for shard, lastmod in shards:
+        loc = base_url + reverse("sitemap_shard", args=[shard])
+        entry = "<sitemap><loc>%s</loc>" % escape(loc)
+        if lastmod:
+            entry += "<lastmod>%s</lastmod>" % lastmod.date().isoformat()
+        yield entry + "</sitemap>\n"
+    yield INDEX_CLOSE
+
+
+def _stream_and_cache(key, token_key, chunks):
+    """Stream ``chunks`` to the client while capturing them for the cache"""
+
+    tokens = {GENERATION_KEY: _generation(), token_key: _token(token_key)}
+
+    def stream():
+        captured = []
+        for chunk in chunks:
+            chunk = chunk.encode("utf-8")
+            captured.append(chunk)
+            yield chunk
+        # A publish or move during a slow stream may have outdated what was sent
+        if all(_token(name) == token for name, token in tokens.items()):
+            cache.set(key, b"".join(captured), CACHE_TIMEOUT)
+
+    return StreamingHttpResponse(stream(), content_type="application/xml")
+
+
+def _empty_response():
+    return HttpResponse(XML_HEADER + URLSET_OPEN + URLSET_CLOSE, content_type="application/xml")
+
+
+def sitemap_response(site):
+    """The /sitemap.xml response: a plain urlset, or an index once sharding kicks in"""
+    root = _site_root(site)
+    if root is None:
+        return _empty_response()
+
+    key = _index_key(site.pk)
+    body = cache.get(key)
+    if body is not None:
+        return HttpResponse(body, content_type="application/xml")
+
+    shards = shard_summary(root)
+    if len(shards) <= 1:
+        return _stream_and_cache(key, _index_token_key(site.pk), iter_urlset(root))
+    return _stream_and_cache(key, _index_token_key(site.pk), iter_index(root, shards))
+
+
+def sitemap_shard_response(site, shard):
+    """The /sitemap-<n>.xml response for a single primary-key shard"""
+    root = _site_root(site)
+    if root is None:
+        return _empty_response()
+
+    key = _shard_key(site.pk, shard)
+    body = cache.get(key)
+    if body is not None:
+        return HttpResponse(body, content_type="application/xml")
+    if shard not in {number for number, lastmod in shard_summary(root)}:
+        # Not listed in the index: an empty or out-of-range shard
+        raise Http404
+    return _stream_and_cache(key, _shard_token_key(site.pk, shard), iter_urlset(root, shard))
+
+
+def invalidate_page(page):
+    """Drop the cached shard holding ``page`` plus the top-level sitemap"""
+    keys = []
+    tokens = {}
+    for site_id in Site.objects.values_list("pk", flat=True):
+        keys.append(_index_key(site_id))
+        keys.append(_shard_key(site_id, page.pk // SHARD_SIZE))
+        tokens[_index_token_key(site_id)] = _new_token()
+        tokens[_shard_token_key(site_id, page.pk // SHARD_SIZE)] = _new_token()
+    cache.set_many(tokens, None)
+    cache.delete_many(keys)
+
+
+def invalidate_all():
+    """Drop every cached sitemap, e.g. after a move rewrites descendant URLs"""
+    cache.set(GENERATION_KEY, _new_token(), None)
@@ -0,0 +1,12 @@
+from django import template
+from django.contrib.admin.templatetags.admin_list import date_hierarchy
+
+from portfolio.admin_changelist import date_hierarchy_changelist
+
+register = template.Library()
+
+
+@register.inclusion_tag("admin/date_hierarchy.html")
+def rollup_date_hierarchy(cl):
+    """Django's date drill-down, reading its dates from the daily rollups when the filters allow"""
+    return date_hierarchy(date_hierarchy_changelist(cl))
@@ -1,4 +1,7 @@
 from django import template
+from wagtail.models import Site
+
+from portfolio import fragments, navigation, placeholders
 
 register = template.Library()
 
@@ -22,3 +25,78 @@ def first(value):
     if value:
         return value[0].upper()
     return ""
+
+
+@register.simple_tag
+def image_attrs(instance, prefix="featured_image"):
+    """Dimensions and placeholder attributes for a card image's <img> (see portfolio.placeholders)"""
+    return placeholders.image_attrs(instance, prefix)
+
+
+def _navigation_site_id(context):
+    page = context.get('page')
+    if page is not None and hasattr(page, 'get_url_parts'):
+        site_id = navigation.site_id_for_page(page)
+        if site_id is not None:
+            return site_id
+    request = context.get('request')
+    site = Site.find_for_request(request) if request is not None else None
+    return site.pk if site is not None else None
+
+
+@register.simple_tag(takes_context=True)
+def main_menu(context):
+    """Cached navigation (home item and menu items) for the current site"""
+    site_id = _navigation_site_id(context)
+    if site_id is None:
+        return {'home': None, 'menu': []}
+    return navigation.get_navigation(site_id)
+
+
+@register.simple_tag(takes_context=True)
+def breadcrumbs(context, page=None):
+    """Ancestor pages of the given (or current) page, from the cached navigation"""
+    page = page or context.get('page')
+    site_id = _navigation_site_id(context)
+    if page is None or site_id is None:
+        return []
+    return navigation.get_breadcrumbs(navigation.get_navigation(site_id), page)
+
+
+class FragmentCacheNode(template.Node):
+    def __init__(self, nodelist, name, dependencies):
+        self.nodelist = nodelist
+        self.name = name
+        self.dependencies = dependencies
+
+    def render(self, context):
+        request = context.get('request')
+        if getattr(request, 'is_preview', False):
+            # Previews render drafts that share the live page's pk and version
+            return self.nodelist.render(context)
+        name = self.name.resolve(context)
+        dependencies = [dependency.resolve(context) for dependency in self.dependencies]
+        return fragments.get_or_render(name, dependencies, lambda: self.nodelist.render(context))
+
+
+@register.tag
+def cachefragment(parser, token):
+    """
+    Cache a template fragment keyed on the objects it renders::
+
+        {% cachefragment "pricing" page %}...{% endcachefragment %}
+
+    Model instances, querysets and related managers are tracked by version, so
+    the fragment is rebuilt once any of them (or an inline child of them) is
+    saved or published; other values become part of the key as they are.
+    """
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError("'%s' tag requires a fragment name" % bits[0])
+    nodelist = parser.parse(('endcachefragment',))
+    parser.delete_first_token()
+    return FragmentCacheNode(
+        nodelist,
+        parser.compile_filter(bits[1]),
+        [parser.compile_filter(bit) for bit in bits[2:]],
+    )
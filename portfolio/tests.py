@@ -1,3 +1,1309 @@
-from django.test import TestCase
+import datetime
+import gzip
+import importlib
+import io
+import os
+import re
+import shutil
+import socketserver
+import tempfile
+import threading
+import unittest
+import unittest.mock
+import time
+from email import message_from_bytes
 
-# Create your tests here.
+from django.apps import apps
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import call_command
+from django.db import connection
+from django.contrib.auth.models import AnonymousUser, User
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+from wagtail.images.models import Image
+from wagtail.images.tests.utils import get_test_image_file
+from wagtail.models import Page, Site
+
+from .cache import LocalLRU, TieredCache, dumps
+from . import autocomplete, compression, fragments, jobs, placeholders, precompressed, renditions, retention, rollups, sitemaps
+from .notifications import MAX_ATTEMPTS, DigestSender
+from .bake import bake, load_manifest
+from .admin import ContactSubmissionAdmin
+from .admin_changelist import EstimatedCountPaginator, estimated_count
+from .cdn import PurgeRecorder
+from .routers import PIN_COOKIE, ReplicaRouter, ReplicaRoutingMiddleware, use_primary
+from .templatetags.portfolio_admin import rollup_date_hierarchy
+from .singleflight import LOCK_KEY, get_or_compute, store
+from .warmup import failures, render_pages, warm_up
+from .models import (
+    AdminJob, ArchivedContactSubmission, BlogIndexPage, BlogPost, ContactRollup, ContactSubmission, HomePage, PendingContactNotification, PortfolioIndexPage, PricingFeature, PricingPlan, ProjectPage, ServicePage,
+)
+
+
+class PortfolioTreeMixin:
+    """Builds a small published site: home, blog index with one post, portfolio with one project"""
+
+    def setUp(self):
+        cache.clear()
+        root = Page.objects.get(depth=1)
+        Page.objects.filter(depth=2).delete()
+        root.refresh_from_db()
+
+        self.home = root.add_child(instance=HomePage(title="Home", slug="home"))
+        Site.objects.all().delete()
+        Site.objects.create(hostname="localhost", port=80, root_page=self.home, is_default_site=True)
+
+        self.blog = self.home.add_child(instance=BlogIndexPage(title="Blog", slug="blog"))
+        self.post = self.add_post("First post", "first-post")
+        self.portfolio = self.home.add_child(instance=PortfolioIndexPage(title="Portfolio", slug="portfolio"))
+        self.project = self.portfolio.add_child(instance=ProjectPage(
+            title="Fintech Portal",
+            slug="fintech-portal",
+            project_title="Fintech Portal",
+            client_name="Acme Bank",
+            project_overview="<p>Overview</p>",
+        ))
+        for page in (self.home, self.blog, self.portfolio, self.project):
+            page.save_revision().publish()
+
+    def add_post(self, title, slug):
+        post = self.blog.add_child(instance=BlogPost(
+            title=title,
+            slug=slug,
+            excerpt="Excerpt",
+            publish_date=datetime.date(2025, 1, 1),
+        ))
+        post.save_revision().publish()
+        return post
+
+
+class ConditionalPageResponseTests(PortfolioTreeMixin, TestCase):
+
+    def test_response_carries_validators(self):
+        response = self.client.get("/blog/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.has_header("ETag"))
+        self.assertFalse(response.has_header("Last-Modified"))
+
+    def test_matching_etag_returns_304_without_rendering(self):
+        etag = self.client.get("/portfolio/fintech-portal/")["ETag"]
+
+        response = self.client.get("/portfolio/fintech-portal/", HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        self.assertTemplateNotUsed(response, "portfolio/project_page.html")
+
+    def test_if_modified_since_alone_is_not_answered_with_304(self):
+        # The menu can change without any page of the blog being published
+        response = self.client.get("/blog/", HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60))
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_publishing_page_changes_etag(self):
+        etag = self.client.get("/portfolio/fintech-portal/")["ETag"]
+        self.project.project_subtitle = "Updated"
+        self.project.save_revision().publish()
+
+        response = self.client.get("/portfolio/fintech-portal/", HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_new_child_invalidates_index(self):
+        etag = self.client.get("/blog/")["ETag"]
+        self.add_post("Second post", "second-post")
+
+        response = self.client.get("/blog/", HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Second post")
+
+    def test_unpublished_child_invalidates_index(self):
+        etag = self.client.get("/blog/")["ETag"]
+        self.post.unpublish()
+
+        response = self.client.get("/blog/", HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, "First post")
+
+    def test_unrelated_child_does_not_invalidate_index(self):
+        etag = self.client.get("/portfolio/")["ETag"]
+        self.add_post("Second post", "second-post")
+
+        response = self.client.get("/portfolio/", HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_page_without_form_answers_304_to_client_without_cookies(self):
+        etag = self.client.get("/blog/")["ETag"]
+        self.client.cookies.clear()
+
+        response = self.client.get("/blog/", HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_page_with_form_renders_until_csrf_cookie_is_set(self):
+        first = self.client.get("/")
+        self.assertIn("csrftoken", first.cookies)
+        self.client.cookies.clear()
+
+        self.assertEqual(self.client.get("/", HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 200)
+        self.assertEqual(self.client.get("/", HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 304)
+
+
+class CacheHeaderTests(PortfolioTreeMixin, TestCase):
+
+    def test_listing_page_is_shared_cacheable_with_surrogate_keys(self):
+        response = self.client.get("/blog/")
+
+        cache_control = response["Cache-Control"]
+        self.assertIn("public", cache_control)
+        self.assertIn("s-maxage=120", cache_control)
+        self.assertIn("stale-while-revalidate=60", cache_control)
+        self.assertIn("stale-if-error=86400", cache_control)
+        self.assertEqual(response["Surrogate-Key"].split(), ["page-%s" % self.blog.pk, "list-blogpost", "nav"])
+        self.assertEqual(response["Cache-Tag"], "page-%s,list-blogpost,nav" % self.blog.pk)
+
+    def test_shared_response_does_not_vary_on_cookie(self):
+        response = self.client.get("/blog/")
+
+        self.assertIn("public", response["Cache-Control"])
+        self.assertNotIn("Cookie", response.get("Vary", ""))
+
+    def test_signed_in_user_gets_private_response(self):
+        self.client.force_login(User.objects.create_user("editor"))
+
+        response = self.client.get("/blog/")
+
+        self.assertIn("private", response["Cache-Control"])
+        self.assertIn("Cookie", response["Vary"])
+
+    def test_304_keeps_cache_headers(self):
+        etag = self.client.get("/portfolio/fintech-portal/")["ETag"]
+
+        response = self.client.get("/portfolio/fintech-portal/", HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertIn("s-maxage=3600", response["Cache-Control"])
+        self.assertEqual(response["Surrogate-Key"], "page-%s nav" % self.project.pk)
+
+    def test_pages_with_forms_are_private(self):
+        response = self.client.get("/")
+
+        self.assertIn("private", response["Cache-Control"])
+        self.assertFalse(response.has_header("Surrogate-Key"))
+
+    def test_publish_purges_page_parent_and_listing(self):
+        with PurgeRecorder() as recorder:
+            backend = {"BACKEND": "portfolio.cdn.HTTPPurgeBackend", "OPTIONS": {"URL": recorder.url}}
+            with override_settings(PORTFOLIO_PURGE_BACKEND=backend):
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.post.save_revision().publish()
+
+        self.assertEqual(recorder.purged, [
+            ["page-%s" % self.post.pk, "list-blogpost", "page-%s" % self.blog.pk],
+        ])
+
+
+class NavigationTests(PortfolioTreeMixin, TestCase):
+
+    def test_menu_is_built_from_live_section_pages(self):
+        response = self.client.get("/portfolio/fintech-portal/")
+
+        self.assertContains(response, '<a href="/blog/"', count=3)
+        self.assertContains(response, '<a href="/portfolio/"')
+        self.assertNotContains(response, '<a href="/about/"')
+
+    def test_menu_is_served_from_cache(self):
+        self.client.get("/blog/")
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get("/portfolio/")
+
+        self.assertFalse([q for q in queries if '"numchild" > 0' in q["sql"]])
+
+    def test_breadcrumbs_follow_tree(self):
+        response = self.client.get("/blog/first-post/")
+
+        self.assertContains(response, 'aria-label="Breadcrumb"')
+        self.assertContains(response, '<li><a href="/blog/" class="hover:text-green-400 transition-colors">Blog</a></li>')
+
+    def test_publish_refreshes_menu_and_etag(self):
+        etag = self.client.get("/portfolio/fintech-portal/")["ETag"]
+        self.blog.title = "Insights"
+        self.blog.save_revision().publish()
+
+        response = self.client.get("/portfolio/fintech-portal/", HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "<span>Insights</span>")
+
+
+class FragmentCacheTests(PortfolioTreeMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.service = self.home.add_child(instance=ServicePage(
+            title="Web Development",
+            slug="web-development",
+            hero_title="Web Development",
+            hero_description="<p>Sites</p>",
+            service_overview="<p>Overview</p>",
+        ))
+        plan = PricingPlan(name="Starter", price="$999")
+        plan.features.add(PricingFeature(feature_text="Five pages"))
+        self.service.pricing_plans.add(plan)
+        self.service.save_revision().publish()
+        self.feature = PricingFeature.objects.get(plan__page=self.service)
+
+    def test_fragment_is_served_from_cache(self):
+        self.assertContains(self.client.get("/web-development/"), "Five pages")
+        # A queryset update sends no signals, so the cached fragment is still used
+        PricingFeature.objects.filter(pk=self.feature.pk).update(feature_text="Ten pages")
+
+        response = self.client.get("/web-development/")
+
+        self.assertContains(response, "Five pages")
+
+    def test_saving_inline_child_invalidates_page_fragment(self):
+        self.client.get("/web-development/")
+        self.feature.feature_text = "Ten pages"
+        self.feature.save()
+
+        response = self.client.get("/web-development/")
+
+        self.assertContains(response, "Ten pages")
+        self.assertNotContains(response, "Five pages")
+
+    def test_only_rendered_models_are_tracked(self):
+        self.assertTrue(fragments.is_tracked(self.feature))
+        self.assertTrue(fragments.is_tracked(self.service))
+        with unittest.mock.patch.object(fragments, "bump") as bump:
+            submission = ContactSubmission.objects.create(name="Ada", email="ada@example.com", message="Hello")
+            AdminJob.objects.create(action="set_responded", total=0)
+            submission.delete()
+
+        bump.assert_not_called()
+
+    def test_menu_change_invalidates_footer(self):
+        self.client.get("/blog/")
+        self.portfolio.title = "Work"
+        self.portfolio.save_revision().publish()
+
+        response = self.client.get("/blog/")
+
+        self.assertContains(response, 'class="block text-gray-400 hover:text-green-400 transition-colors">Work</a>')
+
+
+class AutocompleteTests(PortfolioTreeMixin, TestCase):
+
+    def suggestions(self, query):
+        return [(item["label"], item["url"]) for item in self.client.get("/autocomplete/", {"q": query}).json()["results"]]
+
+    def test_publish_updates_index(self):
+        self.assertEqual(self.suggestions("fintech"), [("Fintech Portal", "/portfolio/fintech-portal/")])
+        self.add_post("Fintech lessons", "fintech-lessons")
+
+        self.assertEqual(
+            sorted(self.suggestions("fintech")),
+            [("Fintech Portal", "/portfolio/fintech-portal/"), ("Fintech lessons", "/blog/fintech-lessons/")],
+        )
+
+    def test_change_made_by_another_process_rebuilds_index(self):
+        self.assertEqual(self.suggestions("second"), [])
+        with unittest.mock.patch.object(autocomplete, "update_page"):
+            # Published by another worker: only the shared version moves
+            self.add_post("Second post", "second-post")
+        autocomplete.invalidate()
+
+        self.assertEqual(self.suggestions("second"), [("Second post", "/blog/second-post/")])
+
+    def test_slug_change_reindexes_subtree_urls(self):
+        self.assertEqual(self.suggestions("first"), [("First post", "/blog/first-post/")])
+        self.blog.slug = "journal"
+        with self.captureOnCommitCallbacks(execute=True):
+            # Wagtail sends page_slug_changed once the transaction commits
+            self.blog.save_revision().publish()
+
+        self.assertEqual(self.suggestions("first"), [("First post", "/journal/first-post/")])
+
+
+class SitemapTests(PortfolioTreeMixin, TestCase):
+
+    def fetch(self, url):
+        response = self.client.get(url)
+        content = b"".join(response.streaming_content) if response.streaming else response.content
+        return response.status_code, content.decode()
+
+    def test_publish_and_unpublish_update_cached_sitemap(self):
+        self.assertNotIn("/blog/second-post/", self.fetch("/sitemap.xml")[1])
+        post = self.add_post("Second post", "second-post")
+        self.assertIn("http://localhost/blog/second-post/", self.fetch("/sitemap.xml")[1])
+
+        post.unpublish()
+
+        self.assertNotIn("/blog/second-post/", self.fetch("/sitemap.xml")[1])
+
+    def test_sharded_index_lists_only_non_empty_shards(self):
+        with unittest.mock.patch.object(sitemaps, "SHARD_SIZE", self.post.pk):
+            status, index = self.fetch("/sitemap.xml")
+            shards = [int(number) for number in re.findall(r"/sitemap-(\d+)\.xml", index)]
+            self.assertEqual(shards, sorted({page.pk // self.post.pk for page in (self.home, self.blog, self.post, self.project)}))
+
+            status, shard = self.fetch("/sitemap-1.xml")
+            self.assertEqual(status, 200)
+            self.assertIn("/blog/first-post/", shard)
+            self.assertEqual(self.fetch("/sitemap-%s.xml" % (max(shards) + 1))[0], 404)
+
+    def test_stream_outdated_by_a_move_is_not_cached(self):
+        key = sitemaps._index_key(Site.objects.get().pk)
+        response = self.client.get("/sitemap.xml")
+        sitemaps.invalidate_all()
+        b"".join(response.streaming_content)
+
+        self.assertIsNone(cache.get(key))
+        self.assertIn("/blog/first-post/", self.fetch("/sitemap.xml")[1])
+
+    def test_stream_outdated_by_a_publish_is_not_cached(self):
+        site_id = Site.objects.get().pk
+        keys = [sitemaps._index_key(site_id), sitemaps._shard_key(site_id, self.post.pk // sitemaps.SHARD_SIZE)]
+        response = self.client.get("/sitemap.xml")
+        sitemaps.invalidate_page(self.post)
+        b"".join(response.streaming_content)
+
+        self.assertEqual(cache.get_many(keys), {})
+        self.fetch("/sitemap.xml")
+        self.assertIn(keys[0], cache.get_many(keys))
+
+
+class FeedTests(PortfolioTreeMixin, TestCase):
+
+    def test_feeds_render_from_cache(self):
+        rss = self.client.get("/feeds/blog.rss")
+        self.assertEqual(rss.status_code, 200)
+        self.assertTrue(rss["Content-Type"].startswith("application/rss+xml"))
+        self.assertContains(rss, "<link>http://localhost/blog/first-post/</link>")
+        atom = self.client.get("/feeds/projects.atom")
+        self.assertContains(atom, 'href="http://localhost/portfolio/fintech-portal/"')
+
+        with CaptureQueriesContext(connection) as queries:
+            again = self.client.get("/feeds/blog.rss", HTTP_IF_NONE_MATCH=rss["ETag"])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(self.client.get("/feeds/blog.json").status_code, 404)
+
+    def test_publish_and_unpublish_rebuild_feed(self):
+        etag = self.client.get("/feeds/blog.rss")["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            post = self.add_post("Second post", "second-post")
+
+        response = self.client.get("/feeds/blog.rss", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "/blog/second-post/")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            post.unpublish()
+        self.assertNotContains(self.client.get("/feeds/blog.rss"), "/blog/second-post/")
+        self.assertContains(self.client.get("/feeds/projects.rss"), "Fintech Portal")
+
+    def test_slug_change_invalidates_feed(self):
+        self.client.get("/feeds/blog.rss")
+        self.blog.slug = "journal"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.blog.save_revision().publish()
+
+        self.assertContains(self.client.get("/feeds/blog.rss"), "/journal/first-post/")
+
+
+class TieredCacheTests(TestCase):
+
+    def setUp(self):
+        self.shared = LocMemCache("tiered-tests", {})
+        self.shared.clear()
+        self.cache = TieredCache("", {"OPTIONS": {"SHARED": self.shared, "LOCAL_TIMEOUT": 60}})
+
+    def test_reads_are_served_locally_after_first_shared_hit(self):
+        self.shared.set("menu", dumps(["Blog"]))
+
+        self.assertEqual(self.cache.get("menu"), ["Blog"])
+        self.assertEqual(self.cache.get("menu"), ["Blog"])
+
+        stats = self.cache.stats()
+        self.assertEqual((stats["shared"]["hits"], stats["local"]["hits"]), (1, 1))
+
+    def test_delete_clears_both_tiers(self):
+        self.cache.set("feed", {"body": b"x" * 5000})
+        self.cache.delete("feed")
+
+        self.assertIsNone(self.cache.get("feed"))
+        self.assertIsNone(self.shared.get("feed"))
+
+    def test_large_values_are_compressed(self):
+        self.cache.set("fragment", "<li>item</li>" * 1000)
+
+        self.assertLess(len(self.shared.get("fragment")), 1000)
+        self.assertEqual(self.cache.get("fragment"), "<li>item</li>" * 1000)
+
+    def test_lru_evicts_least_recently_used_by_size(self):
+        lru = LocalLRU(max_entries=10, max_bytes=800)
+        lru.set("a", b"a" * 100, None)
+        lru.set("b", b"b" * 100, None)
+        lru.get("a")
+        for key in "cdefghi":
+            lru.set(key, b"x" * 100, None)
+
+        self.assertIsNotNone(lru.get("a"))
+        self.assertIsNone(lru.get("b"))
+        self.assertLessEqual(lru.size, 800)
+
+
+class SingleFlightTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.renders = 0
+        self.renders_lock = threading.Lock()
+
+    def render(self, value="fresh", delay=0.2):
+        with self.renders_lock:
+            self.renders += 1
+        time.sleep(delay)
+        return value
+
+    def test_simultaneous_misses_render_once(self):
+        barrier = threading.Barrier(100)
+        results = []
+
+        def request():
+            barrier.wait()
+            results.append(get_or_compute("listing", self.render))
+
+        threads = [threading.Thread(target=request) for _ in range(100)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.renders, 1)
+        self.assertEqual(results, ["fresh"] * 100)
+
+    def test_stale_value_is_served_while_another_worker_refreshes(self):
+        store("listing", "stale", timeout=0)
+        cache.add(LOCK_KEY % "listing", "other-worker", 30)
+
+        self.assertEqual(get_or_compute("listing", self.render), "stale")
+        self.assertEqual(self.renders, 0)
+
+    def test_caller_winning_the_lock_refreshes_stale_value(self):
+        store("listing", "stale", timeout=0)
+
+        self.assertEqual(get_or_compute("listing", self.render), "fresh")
+        self.assertEqual(get_or_compute("listing", self.render), "fresh")
+        self.assertEqual(self.renders, 1)
+        self.assertIsNone(cache.get(LOCK_KEY % "listing"))
+
+
+@override_settings(DATABASE_REPLICAS=["replica_1"])
+class ReplicaRoutingTests(TestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.router = ReplicaRouter()
+
+    def route(self, request, during=None):
+        """Run a request through the middleware, returning (read alias, response)"""
+        request.user = AnonymousUser()
+        seen = []
+
+        def get_response(request):
+            if during:
+                during()
+            seen.append(self.router.db_for_read(ContactSubmission))
+            return HttpResponse()
+
+        response = ReplicaRoutingMiddleware(get_response)(request)
+        return seen[0], response
+
+    def test_anonymous_page_reads_use_replica(self):
+        alias, response = self.route(self.factory.get("/blog/"))
+
+        self.assertEqual(alias, "replica_1")
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_post_stays_on_primary_and_pins_following_reads(self):
+        alias, response = self.route(self.factory.post("/contact/"))
+        self.assertEqual(alias, "default")
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        request = self.factory.get("/contact/")
+        request.COOKIES[PIN_COOKIE] = "1"
+        self.assertEqual(self.route(request)[0], "default")
+
+    def test_admin_and_cms_use_primary(self):
+        self.assertEqual(self.route(self.factory.get("/cms/pages/"))[0], "default")
+        self.assertEqual(self.route(self.factory.get("/django-admin/"))[0], "default")
+
+    def test_reads_after_a_write_use_primary(self):
+        def write():
+            self.router.db_for_write(ContactSubmission)
+
+        self.assertEqual(self.route(self.factory.get("/blog/"), during=write)[0], "default")
+
+    def test_outside_requests_and_cache_fills_use_primary(self):
+        self.assertEqual(self.router.db_for_read(ContactSubmission), "default")
+
+        def fill():
+            with use_primary():
+                self.assertEqual(self.router.db_for_read(ContactSubmission), "default")
+
+        self.route(self.factory.get("/blog/"), during=fill)
+
+
+class ContactSubmitTests(TestCase):
+
+    def submit(self, **extra):
+        data = {"name": "Ada", "email": "ada@example.com", "service": "web_development", "message": "Hello"}
+        data.update(extra)
+        return self.client.post("/contact-submit/", data)
+
+    def test_submission_is_stored_and_redirects_to_next(self):
+        response = self.submit(next="/contact/")
+
+        self.assertRedirects(response, "/contact/", fetch_redirect_response=False)
+        submission = ContactSubmission.objects.get()
+        self.assertEqual((submission.name, submission.service), ("Ada", "web_development"))
+
+    def test_offsite_next_is_ignored(self):
+        response = self.submit(next="https://evil.example/")
+
+        self.assertRedirects(response, "/", fetch_redirect_response=False)
+
+
+class ContactRollupTests(TestCase):
+
+    def submit(self, **extra):
+        data = {"name": "Ada", "email": "ada@example.com", "service": "web_development", "message": "Hello"}
+        data.update(extra)
+        return ContactSubmission.objects.create(**data)
+
+    def counts(self):
+        return sorted(ContactRollup.objects.values_list("service", "budget", "submissions", "responded"))
+
+    def test_rollups_follow_creates_edits_and_deletes(self):
+        first = self.submit(budget="5k_15k")
+        self.submit()
+        self.assertEqual(self.counts(), [("web_development", "", 1, 0), ("web_development", "5k_15k", 1, 0)])
+
+        first.is_responded = True
+        first.save()
+        self.assertEqual(self.counts(), [("web_development", "", 1, 0), ("web_development", "5k_15k", 1, 1)])
+
+        first.service = "consulting"
+        first.save()
+        first.delete()
+        self.assertEqual(sum(row.submissions for row in ContactRollup.objects.all()), 1)
+        self.assertEqual(sum(row.responded for row in ContactRollup.objects.all()), 0)
+
+    def test_bulk_update_and_rebuild_match_incremental_counts(self):
+        for budget in ["", "5k_15k", "5k_15k"]:
+            self.submit(budget=budget)
+
+        self.assertEqual(rollups.set_responded(ContactSubmission.objects.filter(budget="5k_15k"), True), 2)
+        incremental = self.counts()
+        self.assertEqual(incremental, [("web_development", "", 1, 0), ("web_development", "5k_15k", 2, 2)])
+
+        ContactRollup.objects.update(submissions=0, responded=0)
+        ContactRollup.objects.create(day=datetime.date(2000, 1, 1), service="consulting", submissions=9)
+        self.assertEqual(rollups.rebuild(), 2)
+        self.assertEqual(self.counts(), incremental)
+
+    def test_dashboard_series(self):
+        self.submit(is_responded=True)
+        self.submit()
+
+        stats = rollups.dashboard(days=7)
+
+        self.assertEqual(len(stats["labels"]), 7)
+        self.assertEqual((stats["received"][-1], stats["responded"][-1]), (2, 1))
+        self.assertEqual((stats["total"], stats["unresponded"], stats["rate"]), (2, 1, 50))
+        self.assertEqual(stats["breakdowns"]["service"][0]["submissions"], 2)
+
+
+class ContactChangeListTests(TestCase):
+
+    url = "/django-admin/portfolio/contactsubmission/"
+
+    def setUp(self):
+        cache.clear()
+        for service in ["consulting", "consulting", "web_development"]:
+            ContactSubmission.objects.create(name="Ada", email="ada@example.com", service=service, message="Hello")
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "password"))
+
+    def test_counts_are_exact_below_the_threshold_and_estimated_above(self):
+        submissions = ContactSubmission.objects.all()
+        self.assertEqual(estimated_count(submissions, threshold=10), (3, False))
+        self.assertEqual(estimated_count(submissions, threshold=2), (3, False))
+        with unittest.mock.patch("portfolio.admin_changelist.planner_estimate", return_value=40):
+            self.assertEqual(estimated_count(submissions, threshold=2), (40, True))
+
+        ContactSubmission.objects.create(name="Bob", email="bob@example.com", service="consulting", message="Hi")
+        # Large counts are served from the cache for a while
+        self.assertEqual(estimated_count(submissions, threshold=2), (3, False))
+        self.assertEqual(estimated_count(submissions, threshold=10), (4, False))
+
+    def test_date_drill_down_reads_the_rollups(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {"service__exact": "consulting"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["cl"].result_count, 2)
+        self.assertEqual(response.context["cl"].full_result_count, 3)
+        distinct = [query["sql"] for query in queries if "DISTINCT" in query["sql"]]
+        self.assertTrue(distinct)
+        self.assertTrue(all("portfolio_contactrollup" in sql for sql in distinct))
+
+    def test_only_planner_estimates_are_labelled(self):
+        with unittest.mock.patch.object(EstimatedCountPaginator, "exact_threshold", 1):
+            self.assertNotContains(self.client.get(self.url), "about 3")
+            with unittest.mock.patch("portfolio.admin_changelist.planner_estimate", return_value=3):
+                self.assertContains(self.client.get(self.url), "about 3")
+
+    def test_overshooting_estimate_never_offers_pages_past_the_end(self):
+        with unittest.mock.patch.object(EstimatedCountPaginator, "exact_threshold", 1), \
+                unittest.mock.patch.object(ContactSubmissionAdmin, "list_per_page", 2), \
+                unittest.mock.patch("portfolio.admin_changelist.planner_estimate", return_value=50):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.context["cl"].paginator.num_pages, 2)
+        self.assertFalse(response.context["cl"].paginator.estimated)
+
+
+class AdminJobTests(TestCase):
+
+    url = "/django-admin/portfolio/contactsubmission/"
+
+    def setUp(self):
+        for index in range(5):
+            ContactSubmission.objects.create(name=f"Lead {index}", email="lead@example.com", service="consulting", message="Hi")
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "password"))
+
+    def mark_all_responded(self, query=""):
+        return self.client.post(self.url + query, {
+            "action": "mark_as_responded", "select_across": "1", "index": "0", "_selected_action": ["1"],
+        })
+
+    def test_small_selections_are_updated_inline(self):
+        self.mark_all_responded()
+
+        self.assertFalse(AdminJob.objects.exists())
+        self.assertEqual(ContactSubmission.objects.filter(is_responded=True).count(), 5)
+
+    def test_large_selections_run_as_chunked_jobs(self):
+        with unittest.mock.patch.object(jobs, "INLINE_LIMIT", 2):
+            self.mark_all_responded()
+        job = AdminJob.objects.get()
+        self.assertEqual((job.status, job.total), (AdminJob.PENDING, 5))
+        self.assertFalse(ContactSubmission.objects.filter(is_responded=True).exists())
+
+        response = self.client.get("/django-admin/portfolio/adminjob/")
+        self.assertContains(response, '<meta http-equiv="refresh"')
+
+        jobs.run(job.pk, chunk_size=2)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.done, job.progress), (AdminJob.DONE, 5, 100))
+        self.assertEqual(ContactSubmission.objects.filter(is_responded=True).count(), 5)
+        self.assertEqual(sum(ContactRollup.objects.values_list("responded", flat=True)), 5)
+        self.assertNotContains(self.client.get("/django-admin/portfolio/adminjob/"), '<meta http-equiv="refresh"')
+
+    def test_jobs_keep_the_changelist_filters_and_search_of_the_selection(self):
+        ContactSubmission.objects.filter(name__in=["Lead 0", "Lead 1"]).update(service="cybersecurity")
+        ContactSubmission.objects.filter(name="Lead 4").update(email="other@example.com")
+        with unittest.mock.patch.object(jobs, "INLINE_LIMIT", 1):
+            self.mark_all_responded("?service__exact=consulting&q=lead%40example.com")
+        job = AdminJob.objects.get()
+        self.assertEqual(job.total, 2)
+        # Submitted after the job: outside its primary-key bounds
+        ContactSubmission.objects.create(name="Lead 5", email="lead@example.com", service="consulting", message="Hi")
+
+        jobs.run(job.pk)
+
+        responded = ContactSubmission.objects.filter(is_responded=True).values_list("name", flat=True)
+        self.assertEqual(sorted(responded), ["Lead 2", "Lead 3"])
+
+    def test_stalled_jobs_stop_the_job_list_reloading(self):
+        with unittest.mock.patch.object(jobs, "INLINE_LIMIT", 2):
+            self.mark_all_responded()
+        AdminJob.objects.update(updated_at=timezone.now() - jobs.STALE_AFTER - datetime.timedelta(seconds=1))
+
+        response = self.client.get("/django-admin/portfolio/adminjob/")
+        self.assertNotContains(response, '<meta http-equiv="refresh"')
+        self.assertContains(response, "Interrupted")
+
+        call_command("run_admin_jobs", stdout=io.StringIO())
+        self.assertEqual(AdminJob.objects.get().status, AdminJob.DONE)
+
+    def test_interrupted_jobs_resume_from_their_cursor(self):
+        queryset = ContactSubmission.objects.order_by("pk")
+        job = jobs.submit(ContactSubmission, {}, "set_responded", "Mark as responded", value=True)
+        first, second = queryset.values_list("pk", flat=True)[1:3]
+        AdminJob.objects.filter(pk=job.pk).update(status=AdminJob.RUNNING, cursor=first, done=2)
+
+        jobs.run(job.pk)
+        self.assertEqual(AdminJob.objects.get(pk=job.pk).status, AdminJob.RUNNING)
+        jobs.run(job.pk, resume=True)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.done), (AdminJob.DONE, 5))
+        self.assertEqual(list(queryset.filter(is_responded=True).values_list("pk", flat=True)[:1]), [second])
+
+
+class RetentionTests(TestCase):
+
+    def setUp(self):
+        archive_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(archive_dir.cleanup)
+        self.enterContext(override_settings(CONTACT_ARCHIVE_DIR=archive_dir.name))
+        self.old = ContactSubmission.objects.create(
+            name="Ada", email="ada@example.com", service="consulting", message="Hello", is_responded=True,
+        )
+        self.created_at = timezone.now() - datetime.timedelta(days=400)
+        ContactSubmission.objects.filter(pk=self.old.pk).update(created_at=self.created_at)
+        self.recent = ContactSubmission.objects.create(
+            name="Bob", email="bob@example.com", service="consulting", message="Hi", is_responded=True,
+        )
+        rollups.rebuild()
+
+    def rollup_totals(self):
+        return sorted(ContactRollup.objects.values_list("submissions", "responded"))
+
+    def test_archive_and_restore(self):
+        totals = self.rollup_totals()
+
+        self.assertEqual(retention.archive(days=365), 1)
+        self.assertEqual(list(ContactSubmission.objects.values_list("pk", flat=True)), [self.recent.pk])
+        archived = ArchivedContactSubmission.objects.get()
+        self.assertEqual((archived.submission_id, archived.name), (self.old.pk, "Ada"))
+        self.assertEqual(self.rollup_totals(), totals)
+        rollups.rebuild()
+        self.assertEqual(self.rollup_totals(), totals)
+
+        self.assertEqual(retention.restore(ArchivedContactSubmission.objects.all()), 1)
+        restored = ContactSubmission.objects.get(pk=self.old.pk)
+        self.assertEqual((restored.message, restored.created_at), ("Hello", self.created_at))
+        self.assertFalse(ArchivedContactSubmission.objects.exists())
+        self.assertEqual(self.rollup_totals(), totals)
+
+    def test_migrations_roll_up_existing_submissions(self):
+        retention.archive(days=365)
+        expected = sorted(ContactRollup.objects.values_list("submissions", "responded", "archived"))
+        fill_rollups = importlib.import_module("portfolio.migrations.0006_contactrollup").fill_rollups
+        count_archived = importlib.import_module("portfolio.migrations.0011_contactrollup_archived").count_archived
+
+        ContactRollup.objects.all().delete()
+        fill_rollups(apps, None)
+        self.assertEqual(sorted(ContactRollup.objects.values_list("submissions", "responded")), [(1, 1)])
+        count_archived(apps, None)
+        self.assertEqual(sorted(ContactRollup.objects.values_list("submissions", "responded", "archived")), expected)
+
+    def test_date_drill_down_skips_years_left_with_only_archived_submissions(self):
+        retention.archive(days=365)
+        self.assertEqual(sorted(ContactRollup.objects.values_list("archived", flat=True)), [0, 1])
+        rollups.rebuild()
+        self.assertEqual(sorted(ContactRollup.objects.values_list("archived", flat=True)), [0, 1])
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "password"))
+
+        response = self.client.get("/django-admin/portfolio/contactsubmission/")
+
+        hierarchy = rollup_date_hierarchy(response.context["cl"])
+        # A single live day remains, so Django drills straight down to it rather than offering two years
+        self.assertEqual(len(hierarchy["choices"]), 1)
+        self.assertIn("created_at__day=%s" % timezone.localdate().day, hierarchy["choices"][0]["link"])
+
+    def test_archive_files_are_appended_to(self):
+        retention.archive(days=365)
+        ContactSubmission.objects.filter(pk=self.recent.pk).update(created_at=self.created_at)
+        retention.archive(days=365)
+
+        names = set(ArchivedContactSubmission.objects.values_list("archive_file", flat=True))
+        self.assertEqual(len(names), 1)
+        self.assertEqual(set(retention.read(names.pop(), [self.old.pk, self.recent.pk])), {self.old.pk, self.recent.pk})
+
+
+class SMTPRecorder:
+    """Local SMTP stand-in recording every message it accepts
+
+    Start it, point the SMTP email backend at ``recorder.host`` and
+    ``recorder.port``, and inspect ``recorder.messages`` (parsed
+    email.message.Message objects). ``fail_next`` makes that many DATA
+    commands fail with a temporary error.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self.messages = []
+        self.connections = 0
+        self.fail_next = 0
+        recorder = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line):
+                self.wfile.write(line.encode() + b"\r\n")
+
+            def handle(self):
+                recorder.connections += 1
+                self.reply("220 localhost SMTPRecorder")
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    command = line.decode().strip().split(" ", 1)[0].upper()
+                    if command == "QUIT":
+                        self.reply("221 Bye")
+                        return
+                    if command == "DATA":
+                        self.receive()
+                    elif command in ("HELO", "EHLO", "MAIL", "RCPT", "RSET", "NOOP"):
+                        self.reply("250 OK")
+                    else:
+                        self.reply("502 Command not implemented")
+
+            def receive(self):
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                for line in self.rfile:
+                    if line in (b".\r\n", b".\n"):
+                        break
+                    lines.append(line[1:] if line.startswith(b"..") else line)
+                if recorder.fail_next:
+                    recorder.fail_next -= 1
+                    self.reply("451 Try again later")
+                    return
+                recorder.messages.append(message_from_bytes(b"".join(lines)))
+                self.reply("250 Queued")
+
+        self.server = socketserver.ThreadingTCPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def host(self):
+        return self.server.server_address[0]
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+@override_settings(CONTACT_DIGEST_RECIPIENTS=["sales@example.com"])
+class NotificationTests(TestCase):
+
+    def submit(self, name):
+        return ContactSubmission.objects.create(name=name, email="lead@example.com", service="consulting", message="Hello")
+
+    def test_new_submissions_are_sent_as_one_digest(self):
+        self.submit("Ada")
+        self.submit("Bob")
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(PendingContactNotification.objects.count(), 2)
+
+        self.assertEqual(DigestSender().send_digest(), 2)
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual((mail.outbox[0].subject, mail.outbox[0].to), ("2 new contact submissions", ["sales@example.com"]))
+        self.assertIn("Ada <lead@example.com>", mail.outbox[0].body)
+        self.assertIn("/django-admin/portfolio/contactsubmission/", mail.outbox[0].body)
+        self.assertFalse(PendingContactNotification.objects.exists())
+        self.assertEqual(DigestSender().send_digest(), 0)
+
+    def test_smtp_digests_reuse_the_connection_and_retry(self):
+        with SMTPRecorder() as recorder, self.settings(
+            EMAIL_BACKEND="django.core.mail.backends.smtp.EmailBackend", EMAIL_HOST=recorder.host, EMAIL_PORT=recorder.port,
+        ):
+            sender = DigestSender(backoff=0)
+            for name in ["Ada", "Bob"]:
+                self.submit(name)
+                self.assertEqual(sender.send_digest(), 1)
+            self.assertEqual(recorder.connections, 1)
+
+            recorder.fail_next = 1
+            self.submit("Cy")
+            self.assertEqual(sender.send_digest(), 1)
+            sender.close()
+
+        self.assertEqual([message["Subject"] for message in recorder.messages], ["1 new contact submission"] * 3)
+        self.assertEqual(recorder.connections, 2)
+
+    def test_failed_digests_keep_their_events(self):
+        self.submit("Ada")
+        with SMTPRecorder() as recorder, self.settings(
+            EMAIL_BACKEND="django.core.mail.backends.smtp.EmailBackend", EMAIL_HOST=recorder.host, EMAIL_PORT=recorder.port,
+        ):
+            recorder.fail_next = 3
+            self.assertEqual(DigestSender(backoff=0).send_digest(), 0)
+
+        event = PendingContactNotification.objects.get()
+        self.assertEqual(event.attempts, 1)
+        self.assertIn("451", event.last_error)
+
+    def test_given_up_events_are_logged_and_retried_from_the_admin(self):
+        self.submit("Ada")
+        PendingContactNotification.objects.update(attempts=MAX_ATTEMPTS - 1)
+        with unittest.mock.patch.object(DigestSender, "send", side_effect=OSError("refused")), \
+                self.assertLogs("portfolio.notifications", "ERROR") as logs:
+            self.assertEqual(DigestSender().send_digest(), 0)
+        self.assertIn("Gave up notifying staff of 1 submission(s)", logs.output[-1])
+        self.assertEqual(DigestSender().send_digest(), 0)
+
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "password"))
+        url = "/django-admin/portfolio/pendingcontactnotification/"
+        self.assertContains(self.client.get(url, {"given_up": "yes"}), "refused")
+        event = PendingContactNotification.objects.get()
+        self.client.post(url, {"action": "retry", "_selected_action": [event.pk]})
+
+        self.assertEqual(DigestSender().send_digest(), 1)
+        self.assertFalse(PendingContactNotification.objects.exists())
+
+
+class BakeTests(PortfolioTreeMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.output = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output, ignore_errors=True)
+        self.site = Site.objects.get()
+
+    def test_bake_writes_shared_pages_and_then_only_changed_ones(self):
+        summary = bake(self.site, self.output, workers=0)
+
+        self.assertEqual((summary["total"], summary["rendered"], summary["failed"]), (4, 4, []))
+        self.assertTrue(os.path.exists(os.path.join(self.output, "blog", "first-post", "index.html.gz")))
+        self.assertFalse(os.path.exists(os.path.join(self.output, "index.html")))
+        self.assertEqual(bake(self.site, self.output, workers=0)["rendered"], 0)
+
+        self.add_post("Second post", "second-post")
+        summary = bake(self.site, self.output, workers=0)
+
+        self.assertEqual((summary["rendered"], summary["skipped"]), (2, 3))
+
+    @unittest.skipUnless(compression.brotli, "Brotli is not installed")
+    def test_bake_writes_brotli_variants(self):
+        bake(self.site, self.output, workers=0)
+
+        with open(os.path.join(self.output, "blog", "first-post", "index.html.br"), "rb") as variant:
+            self.assertIn(b"First post", compression.brotli.decompress(variant.read()))
+
+    def test_failed_page_is_reported_and_retried_next_run(self):
+        with unittest.mock.patch.object(ProjectPage, "get_context", side_effect=RuntimeError("boom")):
+            summary = bake(self.site, self.output, workers=0)
+
+        self.assertEqual(summary["rendered"], 3)
+        self.assertEqual(summary["failed"], [("/portfolio/fintech-portal/", "RuntimeError('boom')")])
+        self.assertNotIn(str(self.project.pk), load_manifest(self.output)["pages"])
+
+        summary = bake(self.site, self.output, workers=0)
+        self.assertEqual((summary["rendered"], summary["failed"]), (1, []))
+
+
+class WarmUpTests(PortfolioTreeMixin, TestCase):
+
+    def test_warm_up_compiles_templates_and_renders_live_pages(self):
+        report, pages = warm_up()
+
+        self.assertEqual(set(report), {"templates", "url resolver", "shared caches", "pages"})
+        self.assertEqual(
+            sorted(url for url, status, seconds in pages if status == 200),
+            ["/", "/blog/", "/blog/first-post/", "/portfolio/", "/portfolio/fintech-portal/"],
+        )
+
+    @override_settings(SECURE_SSL_REDIRECT=True)
+    def test_pages_are_requested_over_https_and_errors_are_failures(self):
+        pages = render_pages([("localhost", "/blog/"), ("localhost", "/missing/")])
+
+        self.assertEqual(failures(pages), [("/missing/", 404)])
+
+
+
+class ApiTests(PortfolioTreeMixin, TestCase):
+
+    def test_sparse_fieldsets(self):
+        response = self.client.get("/api/projects/", {"fields": "id,title"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["results"], [{"id": self.project.pk, "title": "Fintech Portal"}])
+        self.assertEqual(self.client.get("/api/projects/", {"fields": "id,secret"}).status_code, 400)
+
+    def test_keyset_pagination_walks_every_post(self):
+        self.add_post("Second post", "second-post")
+        titles = []
+        url = "/api/blog-posts/?fields=title&page_size=1"
+        while url:
+            data = self.client.get(url).json()
+            titles.extend(item["title"] for item in data["results"])
+            url = data["next"]
+
+        self.assertEqual(titles, ["Second post", "First post"])
+
+    def test_unrelated_query_parameters_share_the_cached_response(self):
+        first = self.client.get("/api/projects/", {"fields": "id,title"})
+        with CaptureQueriesContext(connection) as queries:
+            again = self.client.get("/api/projects/", {"fields": "id,title", "utm_source": "newsletter", "_": "1"})
+
+        self.assertEqual(again.content, first.content)
+        self.assertEqual(len(queries), 0)
+        self.assertNotEqual(self.client.get("/api/projects/", {"fields": "id"}).content, first.content)
+
+    def test_cached_response_with_etag_until_publish(self):
+        first = self.client.get("/api/projects/")
+        with CaptureQueriesContext(connection) as queries:
+            again = self.client.get("/api/projects/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(len(queries), 0)
+
+        self.project.project_title = "Fintech Portal v2"
+        self.project.save_revision().publish()
+
+        response = self.client.get("/api/projects/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["results"][0]["project_title"], "Fintech Portal v2")
+
+
+def jinja2_installed():
+    try:
+        import jinja2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class RenditionWarmingTests(PortfolioTreeMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name))
+        self.image = Image.objects.create(title="Diagram", file=get_test_image_file(size=(1600, 900)))
+        self.post.content = [("image", self.image)]
+        self.post.save_revision().publish()
+
+    def test_template_specs_are_expanded(self):
+        self.assertEqual(renditions.template_specs(BlogPost), {"width-640", "width-960", "width-1280"})
+        self.assertEqual(renditions.source_specs('{{ picture(photo, "format-{avif,jpeg}|fill-100x100") }}'),
+                         {"format-avif|fill-100x100", "format-jpeg|fill-100x100"})
+
+    def test_warm_generates_missing_renditions_once(self):
+        summary = renditions.warm(workers=0)
+        self.assertEqual((summary["images"], summary["generated"], summary["skipped"]), (1, 3, 0))
+        self.assertEqual(
+            sorted(self.image.renditions.values_list("width", flat=True)), [640, 960, 1280],
+        )
+
+        summary = renditions.warm(workers=0)
+        self.assertEqual((summary["generated"], summary["skipped"]), (0, 3))
+        # Pages now render from the existing renditions only
+        with unittest.mock.patch.object(Image, "generate_rendition_instance", side_effect=AssertionError):
+            html = self.client.get("/blog/first-post/").content.decode()
+        image_tag = re.search(r"<img [^>]*srcset=[^>]*>", html).group()
+        self.assertEqual(re.findall(r" (\d+)w\b", image_tag), ["640", "960", "1280"])
+
+    @unittest.skipUnless(jinja2_installed(), "Jinja2 is not installed")
+    def test_jinja2_templates_render_the_warmed_renditions(self):
+        renditions.warm(workers=0)
+        with unittest.mock.patch.object(Image, "generate_rendition_instance", side_effect=AssertionError):
+            html = self.client.get("/blog/first-post/").content.decode()
+            cache.clear()
+            with override_settings(TEMPLATES=[settings.JINJA2_TEMPLATES, *settings.TEMPLATES]):
+                jinja_html = self.client.get("/blog/first-post/").content.decode()
+        self.assertIn(re.search(r"<img [^>]*srcset=[^>]*>", html).group(), jinja_html)
+
+
+class ImagePlaceholderTests(PortfolioTreeMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name))
+        self.image_bytes = get_test_image_file(size=(1200, 800), colour="red").file.getvalue()
+        # Background fetches run inline once the test's save commits
+        self.enterContext(unittest.mock.patch.object(
+            placeholders, "in_background", side_effect=lambda function, *args: function(*args),
+        ))
+
+    def publish_project(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.project.save_revision().publish()
+
+    def test_uploaded_and_url_images_are_measured_once(self):
+        self.post.featured_image = get_test_image_file("card.png", size=(1600, 900), colour="blue")
+        self.post.save_revision().publish()
+        self.project.featured_image_url = "https://images.example.com/card.png"
+        with unittest.mock.patch.object(placeholders, "fetch", return_value=self.image_bytes) as fetch:
+            with self.captureOnCommitCallbacks() as callbacks:
+                self.project.save_revision().publish()
+            # Nothing is fetched while the page is being saved
+            fetch.assert_not_called()
+            for callback in callbacks:
+                callback()
+            self.publish_project()
+        fetch.assert_called_once_with("https://images.example.com/card.png")
+
+        post = BlogPost.objects.get(pk=self.post.pk)
+        self.assertEqual((post.featured_image_width, post.featured_image_height), (1600, 900))
+        self.assertEqual(post.featured_image_color, "#0000ff")
+        self.assertEqual(post.featured_image_source, post.featured_image.name)
+        project = ProjectPage.objects.get(pk=self.project.pk)
+        self.assertEqual((project.featured_image_width, project.featured_image_color), (1200, "#ff0000"))
+        self.assertTrue(project.featured_image_placeholder.startswith("data:image/webp;base64,"))
+
+        for url, instance in [("/blog/", post), ("/portfolio/", project)]:
+            with self.subTest(url=url):
+                html = self.client.get(url).content.decode()
+                self.assertIn('loading="lazy" decoding="async"%s>' % placeholders.image_attrs(instance), html)
+                if not jinja2_installed():
+                    continue
+                cache.clear()
+                with override_settings(TEMPLATES=[settings.JINJA2_TEMPLATES, *settings.TEMPLATES]):
+                    self.assertIn(placeholders.image_attrs(instance), self.client.get(url).content.decode())
+
+    def test_measuring_after_commit_invalidates_the_cached_pages(self):
+        self.project.featured_image_url = "https://images.example.com/card.png"
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.project.save_revision().publish()
+        etag = self.client.get("/portfolio/")["ETag"]
+
+        with PurgeRecorder() as recorder, \
+                unittest.mock.patch.object(placeholders, "fetch", return_value=self.image_bytes):
+            backend = {"BACKEND": "portfolio.cdn.HTTPPurgeBackend", "OPTIONS": {"URL": recorder.url}}
+            with override_settings(PORTFOLIO_PURGE_BACKEND=backend), self.captureOnCommitCallbacks(execute=True):
+                for callback in callbacks:
+                    callback()
+
+        keys = ["page-%s" % self.project.pk, "list-projectpage", "page-%s" % self.portfolio.pk]
+        # Once for the publish, once more for the measured image
+        self.assertEqual(recorder.purged.count(keys), 2)
+        response = self.client.get("/portfolio/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(placeholders.image_attrs(ProjectPage.objects.get(pk=self.project.pk)), response.content.decode())
+
+    def test_unreadable_url_renders_without_placeholder_and_is_retried_by_the_backfill(self):
+        self.project.featured_image_url = "https://images.example.com/missing.png"
+        with unittest.mock.patch.object(placeholders, "fetch", side_effect=OSError("404")) as fetch:
+            self.publish_project()
+            self.publish_project()
+        fetch.assert_called_once()
+        project = ProjectPage.objects.get(pk=self.project.pk)
+        self.assertEqual(
+            (project.featured_image_width, project.featured_image_source), (None, self.project.featured_image_url),
+        )
+        self.assertEqual(placeholders.image_attrs(project), "")
+
+        with unittest.mock.patch.object(placeholders, "fetch", return_value=self.image_bytes):
+            self.assertEqual(placeholders.backfill(), (1, 0))
+        self.assertEqual(ProjectPage.objects.get(pk=self.project.pk).featured_image_height, 800)
+
+    def test_only_http_urls_are_fetched(self):
+        with self.assertRaises(ValueError):
+            placeholders.fetch("file:///etc/passwd")
+
+
+class PrecompressedPageTests(PortfolioTreeMixin, TestCase):
+
+    def test_minify_keeps_rendering_whitespace_and_raw_text(self):
+        html = (
+            "<div>\n    <!-- note -->\n    <a>x</a>   <a>y</a>\n</div>\n"
+            "<pre>  keep\n    this</pre>\n<style>\n  .a {\n    color: red;\n  }\n</style>\n"
+            "<script>\n    let a = `1\n\n    2`\n</script>\n"
+        )
+        self.assertEqual(precompressed.minify(html), (
+            "<div>\n<a>x</a> <a>y</a>\n</div>\n"
+            "<pre>  keep\n    this</pre>\n<style>.a{color: red;}</style>\n"
+            "<script>\n    let a = `1\n\n    2`\n</script>\n"
+        ))
+
+    def test_shared_pages_are_served_precompressed_from_the_cache(self):
+        first = self.client.get("/blog/first-post/", HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual(first["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", first["Vary"])
+        self.assertTrue(first["ETag"].startswith('W/"'))
+        body = gzip.decompress(first.content)
+        self.assertIn(b"First post", body)
+        self.assertNotIn(b">\n    <", body)
+
+        with unittest.mock.patch.object(precompressed, "minify", side_effect=AssertionError), \
+                unittest.mock.patch.object(precompressed.compression, "compress", side_effect=AssertionError):
+            repeat = self.client.get("/blog/first-post/", HTTP_ACCEPT_ENCODING="gzip")
+            identity = self.client.get("/blog/first-post/")
+        self.assertEqual(repeat.templates, [])
+        self.assertEqual(repeat.content, first.content)
+        self.assertEqual(identity.content, body)
+        self.assertFalse(identity.has_header("Content-Encoding"))
+
+        self.post.title = "Renamed post"
+        self.post.save_revision().publish()
+        self.assertIn(b"Renamed post", self.client.get("/blog/first-post/").content)
+
+    @unittest.skipUnless(compression.brotli, "Brotli is not installed")
+    def test_brotli_is_preferred_when_accepted(self):
+        response = self.client.get("/blog/first-post/", HTTP_ACCEPT_ENCODING="gzip, br")
+
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertIn(b"First post", compression.brotli.decompress(response.content))
+
+    def test_only_tracking_query_strings_share_the_cached_page(self):
+        first = self.client.get("/blog/first-post/?utm_source=newsletter")
+        with unittest.mock.patch.object(precompressed, "minify", side_effect=AssertionError):
+            self.assertEqual(self.client.get("/blog/first-post/").templates, [])
+            other = self.client.get("/blog/first-post/?page=2", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertTrue(other.templates)
+        self.assertFalse(other.has_header("Content-Encoding"))
+        self.assertIn(b">\n    <", other.content)
+        self.assertNotIn(b">\n    <", first.content)
+
+    def test_private_pages_are_left_alone(self):
+        response = self.client.get("/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertIn(b"\n    ", response.content)
+
+
+@unittest.skipUnless(jinja2_installed(), "Jinja2 is not installed")
+class Jinja2TemplateTests(PortfolioTreeMixin, TestCase):
+
+    def render_lines(self, url):
+        cache.clear()
+        html = self.client.get(url).content.decode()
+        html = re.sub(r'name="csrfmiddlewaretoken" value="[^"]*"', "", html)
+        return [line.strip() for line in html.splitlines() if line.strip()]
+
+    def test_ported_templates_render_the_same_pages(self):
+        for url in ["/", "/blog/", "/blog/first-post/", "/portfolio/", "/portfolio/fintech-portal/"]:
+            with self.subTest(url=url):
+                expected = self.render_lines(url)
+                with override_settings(TEMPLATES=[settings.JINJA2_TEMPLATES, *settings.TEMPLATES]):
+                    response = self.client.get(url)
+                    template = response.resolve_template(response.template_name)
+                    self.assertEqual(type(template).__module__, "django.template.backends.jinja2")
+                    self.assertEqual(self.render_lines(url), expected)
@@ -1,6 +1,20 @@
-from django.urls import path
-from . import views
+from django.urls import include, path
+from rest_framework.routers import SimpleRouter
+
+from . import api, views
+
+api_router = SimpleRouter()
+api_router.register('projects', api.ProjectViewSet, basename='api-project')
+api_router.register('blog-posts', api.BlogPostViewSet, basename='api-blog-post')
+api_router.register('services', api.ServiceViewSet, basename='api-service')
+api_router.register('team-members', api.TeamMemberViewSet, basename='api-team-member')
 
 urlpatterns = [
     # Removed conflicting contact URL - handled by Wagtail now
+    path('contact-submit/', views.contact_form_view, name='contact_submit'),
+    path('sitemap.xml', views.sitemap_view, name='sitemap'),
+    path('sitemap-<int:shard>.xml', views.sitemap_shard_view, name='sitemap_shard'),
+    path('feeds/<slug:name>.<slug:format_name>', views.feed_view, name='feed'),
+    path('autocomplete/', views.autocomplete_view, name='autocomplete'),
+    path('api/', include(api_router.urls)),
 ]
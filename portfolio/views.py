@@ -1,41 +1,82 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect
 from django.contrib import messages
+from django.core.cache import cache
 from django.views.decorators.csrf import csrf_exempt
-from django.http import JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, url_has_allowed_host_and_scheme
+from wagtail.models import Site
 from .models import ContactSubmission
+from . import autocomplete, feeds, sitemaps
 
 
-def contact_form_view(request):
-    """Handle contact form submissions"""
+async def contact_form_view(request):
+    """Handle contact form submissions natively under ASGI (no thread hop for the insert)"""
     if request.method == 'POST':
         try:
-            name = request.POST.get('name')
-            email = request.POST.get('email')
-            phone = request.POST.get('phone', '')
-            company = request.POST.get('company', '')
-            service = request.POST.get('service')
-            budget = request.POST.get('budget', '')
-            timeline = request.POST.get('timeline', '')
-            message_text = request.POST.get('message')
-            
-            # Create contact submission
-            contact = ContactSubmission.objects.create(
-                name=name,
-                email=email,
-                phone=phone,
-                company=company,
-                service=service,
-                budget=budget,
-                timeline=timeline,
-                message=message_text
-            )
-            
+            await ContactSubmission.objects.acreate(**ContactSubmission.fields_from_post(request.POST))
             messages.success(request, 'Thank you for your message! We will get back to you within 24 hours.')
-            
-        except Exception as e:
+        except Exception:
             messages.error(request, 'There was an error sending your message. Please try again.')
-        
-        # Redirect back to the page they came from or to home
-        return redirect(request.META.get('HTTP_REFERER', '/'))
-    
+
+        # Back to the page named in the form, or the one they came from
+        return redirect(_safe_next_url(request))
+
     return redirect('/')
+
+
+def _safe_next_url(request):
+    for url in (request.POST.get('next'), request.META.get('HTTP_REFERER')):
+        if url and url_has_allowed_host_and_scheme(url, allowed_hosts={request.get_host()}, require_https=request.is_secure()):
+            return url
+    return '/'
+
+
+async def autocomplete_view(request):
+    """Search-as-you-type suggestions served from the in-memory prefix index"""
+    query = request.GET.get('q', '')
+    try:
+        limit = max(1, min(int(request.GET.get('limit', autocomplete.DEFAULT_LIMIT)), 50))
+    except ValueError:
+        limit = autocomplete.DEFAULT_LIMIT
+
+    index = autocomplete.index
+    if not index.is_current(await cache.aget(autocomplete.VERSION_KEY)):
+        # Only the first request of a process, or the first after a change, builds the index from the database
+        index = await sync_to_async(autocomplete.get_index)()
+    results = index.search(query, limit=limit)
+    return JsonResponse({'query': query, 'results': results})
+
+
+def sitemap_view(request):
+    """sitemap.xml for the requested site (a sitemap index once it is sharded)"""
+    site = Site.find_for_request(request)
+    if site is None:
+        raise Http404
+    return sitemaps.sitemap_response(site)
+
+
+def sitemap_shard_view(request, shard):
+    """A single sitemap shard referenced from the sitemap index"""
+    site = Site.find_for_request(request)
+    if site is None:
+        raise Http404
+    return sitemaps.sitemap_shard_response(site, shard)
+
+
+def feed_view(request, name, format_name):
+    """RSS/Atom feed served from its precomputed document, honouring conditional GETs"""
+    if name not in feeds.FEEDS or format_name not in feeds.FORMATS:
+        raise Http404
+
+    document = feeds.get_feed(name, format_name)
+    response = HttpResponse(document['body'], content_type=document['content_type'])
+    response['ETag'] = document['etag']
+    response['Last-Modified'] = http_date(document['last_modified'])
+    return get_conditional_response(
+        request,
+        etag=document['etag'],
+        last_modified=int(document['last_modified']),
+        response=response,
+    )
@@ -0,0 +1,162 @@
+"""
+Warm-up of a freshly started process before it takes traffic
+
+Compiles every portfolio template into the cached loader (and the Jinja2
+environment, when enabled), populates the URL resolver and Wagtail's site
+root paths, builds the in-process autocomplete index and the shared
+navigation/feed caches, and finally requests every live page once so
+fragment caches and page validators are filled. Run it
+from gunicorn's hooks (see gunicorn.conf.py) or with `manage.py warmup`.
+"""
+import logging
+import os
+import time
+from pathlib import Path
+
+from django.db import connections
+from django.template import TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates
+from django.urls import get_resolver
+
+try:
+    from django.template.backends.jinja2 import Jinja2
+except ImportError:
+    Jinja2 = None
+
+
+logger = logging.getLogger(__name__)
+
+def compile_templates():
+    """Load every portfolio template into each configured engine; returns the count
+
+    Django templates come from portfolio/templates and, when the Jinja2
+    engine is enabled, Jinja2 templates from portfolio/jinja2. A template
+    that fails to compile is logged rather than stopping the warm-up, since
+    the worker still has to start.
+    """
+    from django.apps import apps
+
+    app_path = apps.get_app_config("portfolio").path
+    count = 0
+    for engine in engines.all():
+        if isinstance(engine, DjangoTemplates):
+            directory = Path(app_path, "templates")
+        elif Jinja2 is not None and isinstance(engine, Jinja2):
+            directory = Path(app_path, "jinja2")
+        else:
+            continue
+        for path in sorted(directory.rglob("*.html")):
+            name = path.relative_to(directory).as_posix()
+            try:
+                engine.get_template(name)
+            except TemplateSyntaxError:
+                logger.exception("Template %s failed to compile during warm-up", name)
+                continue
+            count += 1
+    return count
+
+
+def populate_url_resolver():
+    """Build the resolver's reverse lookup tables; returns the number of named routes"""
+    resolver = get_resolver()
+    return len(resolver.reverse_dict)
+
+
+def warm_shared_caches():
+    """Site root paths, navigation, feeds and the autocomplete index; returns the site count"""
+    from wagtail.models import Site
+
+    from portfolio import autocomplete, feeds, navigation
+
+    Site.get_site_root_paths()
+    sites = list(Site.objects.values_list("pk", flat=True))
+    for site_id in sites:
+        navigation.get_navigation(site_id)
+    for name in feeds.FEEDS:
+        for format_name in feeds.FORMATS:
+            feeds.get_feed(name, format_name)
+    autocomplete.get_index()
+    return len(sites)
+
+
+def live_page_urls():
+    """(host, url) of every live, public page on every site"""
+    from wagtail.models import Site
+
+    urls = []
+    for site in Site.objects.select_related("root_page"):
+        for page in site.root_page.get_descendants(inclusive=True).live().public():
+            url = page.get_url(current_site=site)
+            if url and url.startswith("/"):
+                urls.append((site.hostname, url))
+    return urls
+
+
+def render_pages(urls):
+    """Request each page once through the full stack; returns [(url, status, seconds)]
+
+    Requests are made over HTTPS so SECURE_SSL_REDIRECT answers with the
+    page rather than a redirect. A page raising an error is logged and
+    reported as a 500; the worker still has to start.
+    """
+    from django.test import Client
+
+    clients = {}
+    results = []
+    for host, url in urls:
+        client = clients.setdefault(host, Client(HTTP_HOST=host))
+        start = time.perf_counter()
+        try:
+            status = client.get(url, secure=True).status_code
+        except Exception:
+            logger.exception("Rendering %s failed during warm-up", url)
+            status = 500
+        results.append((url, status, time.perf_counter() - start))
+    return results
+
+
+def failures(pages):
+    """Pages from render_pages() that did not answer 200, and so were not warmed"""
+    return [(url, status) for url, status, seconds in pages if status != 200]
+
+
+def warm_up(render=True, log=None):
+    """Run every warm-up step; returns ({step: seconds}, [(url, status, seconds)] of rendered pages)"""
+    report = {}
+    pages = []
+
+    def step(name, function, *args):
+        start = time.perf_counter()
+        result = function(*args)
+        report[name] = time.perf_counter() - start
+        if log:
+            count = len(result) if isinstance(result, list) else result
+            log("%s: %s in %.1f ms" % (name, count, report[name] * 1000))
+        return result
+
+    step("templates", compile_templates)
+    step("url resolver", populate_url_resolver)
+    step("shared caches", warm_shared_caches)
+    if render:
+        pages = step("pages", render_pages, live_page_urls())
+        failed = failures(pages)
+        if failed:
+            logger.warning("%d page(s) were not warmed: %s", len(failed), failed)
+    # Never hand connections opened here to forked workers
+    connections.close_all()
+    return report, pages
+
+
+def first_request_latency(urls, warm, cache_dir):
+    """Latency of the first request to each URL in a fresh process, with or without warm-up
+
+    Runs in a spawned child with its own empty shared cache directory.
+    """
+    os.environ["CACHE_DIR"] = cache_dir
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "setting.settings")
+    import django
+
+    django.setup()
+    if warm:
+        warm_up(render=True)
+    return render_pages(urls)
@@ -89,6 +89,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Add WhiteNoise for static files in production
+    'portfolio.precompressed.PrecompressedPageMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -100,23 +101,53 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'setting.urls'
 
+TEMPLATE_CONTEXT_PROCESSORS = [
+    'django.template.context_processors.request',
+    'django.contrib.auth.context_processors.auth',
+    'django.contrib.messages.context_processors.messages',
+]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [
             BASE_DIR / 'portfolio' / 'templates',
         ],
-        'APP_DIRS': True,
         'OPTIONS': {
-            'context_processors': [
-                'django.template.context_processors.request',
-                'django.contrib.auth.context_processors.auth',
-                'django.contrib.messages.context_processors.messages',
+            'context_processors': TEMPLATE_CONTEXT_PROCESSORS,
+            # Always cache compiled templates, whatever DEBUG says; runserver's
+            # autoreloader still resets the cache when a template changes.
+            # gunicorn.conf.py fills it before workers take traffic.
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
             ],
         },
     },
 ]
 
+# Optional Jinja2 engine for the public pages (requires Jinja2). Its templates
+# in portfolio/jinja2/ take precedence; admin and CMS keep Django templates.
+JINJA2_TEMPLATES = {
+    'BACKEND': 'django.template.backends.jinja2.Jinja2',
+    'DIRS': [
+        BASE_DIR / 'portfolio' / 'jinja2',
+    ],
+    'APP_DIRS': False,
+    'OPTIONS': {
+        'environment': 'portfolio.jinja_env.environment',
+        'extensions': ['wagtail.jinja2tags.core', 'wagtail.images.jinja2tags.images'],
+        'context_processors': TEMPLATE_CONTEXT_PROCESSORS,
+        'auto_reload': DEBUG,
+    },
+}
+
+TEMPLATE_ENGINE = os.environ.get('TEMPLATE_ENGINE', 'django')
+if TEMPLATE_ENGINE == 'jinja2':
+    TEMPLATES.insert(0, JINJA2_TEMPLATES)
+
 WSGI_APPLICATION = 'setting.wsgi.application'
 
 
@@ -140,6 +171,48 @@ else:
         }
     }
 
+# Read replicas, e.g. DATABASE_REPLICA_URLS=postgres://replica-1/db,postgres://replica-2/db
+# Anonymous page views read from a replica; writes, admin/CMS traffic and a
+# visitor's requests right after a POST stay on the primary (portfolio/routers.py)
+DATABASE_REPLICAS = []
+for index, replica_url in enumerate(filter(None, os.environ.get('DATABASE_REPLICA_URLS', '').split(','))):
+    alias = 'replica_%d' % (index + 1)
+    DATABASES[alias] = dj_database_url.parse(replica_url.strip(), conn_max_age=600, conn_health_checks=True)
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICAS.append(alias)
+
+if DATABASE_REPLICAS:
+    DATABASE_ROUTERS = ['portfolio.routers.ReplicaRouter']
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index('django.contrib.auth.middleware.AuthenticationMiddleware') + 1,
+        'portfolio.routers.ReplicaRoutingMiddleware',
+    )
+
+# Opt-in SQLite profile for serving from several workers: WAL lets page reads
+# proceed while a contact submission is being written, and IMMEDIATE
+# transactions make writers queue on busy_timeout instead of failing with
+# "database is locked" when upgrading a read lock. Applies to any SQLite
+# database, including one named by DATABASE_URL (bench_contact runs its
+# servers on a copy that way). Compare with `python manage.py bench_sqlite`.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 128 * 1024 * 1024,
+    'cache_size': -20000,  # KiB, i.e. ~20 MB per connection
+    'busy_timeout': 5000,
+    'temp_store': 'MEMORY',
+}
+
+if (
+    DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3'
+    and os.environ.get('SQLITE_TUNING', 'False').lower() == 'true'
+):
+    DATABASES['default'].setdefault('OPTIONS', {}).update({
+        'init_command': ';'.join('PRAGMA %s=%s' % pragma for pragma in SQLITE_PRAGMAS.items()),
+        'transaction_mode': 'IMMEDIATE',
+        'timeout': SQLITE_PRAGMAS['busy_timeout'] / 1000,
+    })
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -199,6 +272,85 @@ MEDIA_ROOT = BASE_DIR / 'media'
 WAGTAIL_SITE_NAME = "Fintaa Software House Portfolio"
 WAGTAILADMIN_BASE_URL = os.environ.get('WAGTAILADMIN_BASE_URL', 'http://localhost:8000')
 
+# Caching: a per-process LRU (portfolio/cache.py) in front of a cache shared by
+# all workers. CACHE_BACKEND picks the shared tier: "redis" (REDIS_URL),
+# "file" (CACHE_DIR) or "locmem" (one process only, e.g. for test runners);
+# it defaults to Redis when REDIS_URL is set and the filesystem otherwise.
+# Version tokens (fragments, autocomplete, sitemaps) are stored without a
+# timeout; losing one only causes misses, but a file cache past MAX_ENTRIES
+# culls a third of its files at random, so keep the limit well above the
+# number of live entries (roughly pages x 3 plus fragments) or use Redis with
+# a volatile-* eviction policy. `manage.py test` always uses LOCMEM_CACHE
+# (see setting/test_runner.py).
+LOCMEM_CACHE = {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    'LOCATION': 'portfolio',
+    'OPTIONS': {'MAX_ENTRIES': 100000},
+}
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'redis' if 'REDIS_URL' in os.environ else 'file')
+if CACHE_BACKEND == 'locmem':
+    SHARED_CACHE = LOCMEM_CACHE
+elif CACHE_BACKEND == 'redis':
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+    }
+else:
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('CACHE_DIR', str(BASE_DIR / '.cache')),
+        'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', '100000'))},
+    }
+
+CACHES = {
+    'default': {
+        'BACKEND': 'portfolio.cache.TieredCache',
+        'OPTIONS': {
+            'SHARED': 'shared',
+            'LOCAL_MAX_ENTRIES': 1000,
+            'LOCAL_MAX_BYTES': 16 * 1024 * 1024,
+            'LOCAL_TIMEOUT': int(os.environ.get('CACHE_LOCAL_TIMEOUT', '5')),
+        },
+    },
+    'shared': SHARED_CACHE,
+}
+
+TEST_RUNNER = 'setting.test_runner.LocMemCacheTestRunner'
+
+# Bump on deploys that change templates so page ETags and cached fragments roll over
+PORTFOLIO_CACHE_VERSION = os.environ.get('PORTFOLIO_CACHE_VERSION', '1')
+
+# Shared cache / CDN purging on publish (see portfolio/cdn.py)
+if 'CDN_PURGE_URL' in os.environ:
+    PORTFOLIO_PURGE_BACKEND = {
+        'BACKEND': 'portfolio.cdn.HTTPPurgeBackend',
+        'OPTIONS': {
+            'URL': os.environ['CDN_PURGE_URL'],
+            'HEADERS': {'Authorization': os.environ.get('CDN_PURGE_TOKEN', '')},
+        },
+    }
+else:
+    PORTFOLIO_PURGE_BACKEND = {'BACKEND': 'portfolio.cdn.NullPurgeBackend'}
+
+# Contact submission retention (see portfolio/retention.py): responded
+# submissions older than this many days move to compressed archive files
+CONTACT_RETENTION_DAYS = int(os.environ.get('CONTACT_RETENTION_DAYS', '365'))
+CONTACT_ARCHIVE_DIR = os.environ.get('CONTACT_ARCHIVE_DIR', str(BASE_DIR / 'archive'))
+
+# Staff digests of new contact submissions (see portfolio/notifications.py),
+# sent by `manage.py send_contact_digests`; recipients default to staff users
+CONTACT_DIGEST_INTERVAL = int(os.environ.get('CONTACT_DIGEST_INTERVAL', '300'))
+CONTACT_DIGEST_RECIPIENTS = [address for address in os.environ.get('CONTACT_DIGEST_RECIPIENTS', '').split(',') if address]
+
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', '25'))
+EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', 'False').lower() == 'true'
+EMAIL_TIMEOUT = 30
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'webmaster@localhost')
+
 # Unfold Admin Configuration
 UNFOLD = {
     "SITE_TITLE": "Fintaa Admin",
@@ -251,6 +403,21 @@ UNFOLD = {
                         "link": reverse_lazy("admin:portfolio_contactsubmission_changelist"),
                         "badge": "portfolio.admin_callbacks.contact_badge_callback",
                     },
+                    {
+                        "title": _("Archived Submissions"),
+                        "icon": "inventory_2",
+                        "link": reverse_lazy("admin:portfolio_archivedcontactsubmission_changelist"),
+                    },
+                    {
+                        "title": _("Pending Notifications"),
+                        "icon": "mark_email_unread",
+                        "link": reverse_lazy("admin:portfolio_pendingcontactnotification_changelist"),
+                    },
+                    {
+                        "title": _("Background Jobs"),
+                        "icon": "pending_actions",
+                        "link": reverse_lazy("admin:portfolio_adminjob_changelist"),
+                    },
                 ],
             },
             {
@@ -0,0 +1,33 @@
+"""
+Settings for public-site workers
+
+    DJANGO_SETTINGS_MODULE=setting.settings_public gunicorn setting.wsgi:application
+
+Identical to setting.settings except that the Django admin (with Unfold) and
+the Wagtail CMS apps (bar wagtail.admin) are not installed and
+setting.urls_public serves only the portfolio routes and pages, so frontend
+workers never load the admin views. Run a separate deployment with
+setting.settings for /cms/ and /django-admin/ against the same database and
+shared cache; compare both profiles with `python manage.py bench_startup`.
+
+wagtail.admin stays installed, without its URLs: the migrations of
+wagtaildocs and wagtailimages depend on its permission migration. Run
+`manage.py migrate` with setting.settings all the same, so the tables of
+the admin-only apps are created too.
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import INSTALLED_APPS
+
+ADMIN_APPS = [
+    "unfold",
+    "unfold.contrib.filters",
+    "unfold.contrib.forms",
+    "unfold.contrib.inlines",
+    "django.contrib.admin",
+    "wagtail.users",
+    "wagtail.snippets",
+]
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in ADMIN_APPS]
+
+ROOT_URLCONF = 'setting.urls_public'
@@ -0,0 +1,19 @@
+"""
+Test runner keeping the tests off the Redis or file cache of the environment
+"""
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class LocMemCacheTestRunner(DiscoverRunner):
+    """DiscoverRunner with the shared cache tier swapped for LOCMEM_CACHE, whatever CACHE_BACKEND says"""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.cache_override = override_settings(CACHES={**settings.CACHES, 'shared': settings.LOCMEM_CACHE})
+        self.cache_override.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.cache_override.disable()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,19 @@
+"""
+URL configuration for public-site workers (setting.settings_public)
+
+The same public routes as setting.urls without the Django admin, the Wagtail
+CMS or document serving, which are served by the admin deployment.
+"""
+from django.conf import settings
+from django.conf.urls.static import static
+from django.urls import include, path
+from wagtail import urls as wagtail_urls
+
+urlpatterns = [
+    path("", include("portfolio.urls")),             # Portfolio app URLs
+    path("", include(wagtail_urls)),                 # Frontend CMS pages
+]
+
+if settings.DEBUG:
+    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)